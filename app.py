@@ -1,107 +1,21 @@
-import streamlit as st
+import os
 
-def feet_to_meters(feet):
-    return feet * 0.3048
-
-def meters_to_feet(meters):
-    return meters / 0.3048
-
-def mph_to_kmh(mph):
-    return mph * 1.60934
-
-def kmh_to_mph(kmh):
-    return kmh / 1.60934
-
-def hectares_to_acres(hectares):
-    return hectares * 2.47105
-
-def acres_to_hectares(acres):
-    return acres / 2.47105
-
-def calculate_coverage(machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day=0, transportation_time_per_trip=0):
-    # Input validation
-    if machine_width <= 0:
-        raise ValueError("Machine width must be greater than 0")
-    if machine_speed <= 0:
-        raise ValueError("Machine speed must be greater than 0")
-    if field_length <= 0:
-        raise ValueError("Field length must be greater than 0")
-    if turn_around_time < 0:
-        raise ValueError("Turn around time cannot be negative")
-    if operational_hours_per_day <= 0:
-        raise ValueError("Operational hours per day must be greater than 0")
-    if operational_days_per_week <= 0:
-        raise ValueError("Operational days per week must be greater than 0")
-    if transportation_trips_per_day < 0:
-        raise ValueError("Transportation trips per day cannot be negative")
-    if transportation_time_per_trip < 0:
-        raise ValueError("Transportation time per trip cannot be negative")
-
-    if not is_metric:
-        # Convert imperial to metric for calculations
-        machine_width = feet_to_meters(machine_width)
-        machine_speed = mph_to_kmh(machine_speed)
-        field_length = feet_to_meters(field_length)
-
-    # Calculate transportation time per day
-    transportation_time_per_day = transportation_trips_per_day * transportation_time_per_trip / 60  # hours
-    
-    # Adjust operational hours by subtracting transportation time
-    effective_operational_hours_per_day = max(0, operational_hours_per_day - transportation_time_per_day)
-    
-    # Calculations in metric units
-    coverage_per_pass = (machine_width * field_length) / 10000  # hectares
-    time_per_pass = field_length / (machine_speed * 1000 / 60)  # minutes
-    total_turnarounds_per_hour = 60 / (time_per_pass + turn_around_time)
-    time_spent_turning_around_per_hour = total_turnarounds_per_hour * turn_around_time
-    coverage_per_hour = (60 / (time_per_pass + turn_around_time)) * coverage_per_pass
-    coverage_per_day = coverage_per_hour * effective_operational_hours_per_day
-    total_turnarounds_per_day = total_turnarounds_per_hour * effective_operational_hours_per_day
-    time_spent_turning_around_per_day = time_spent_turning_around_per_hour * effective_operational_hours_per_day / 60
-    coverage_per_week = coverage_per_day * operational_days_per_week
-    total_turnarounds_per_week = total_turnarounds_per_day * operational_days_per_week
-    time_spent_turning_around_per_week = time_spent_turning_around_per_day * operational_days_per_week
-
-    total_hours_per_day = operational_hours_per_day
-    total_hours_per_week = operational_hours_per_day * operational_days_per_week
-    effective_hours_per_day = effective_operational_hours_per_day
-    effective_hours_per_week = effective_operational_hours_per_day * operational_days_per_week
-    transportation_time_per_week = transportation_time_per_day * operational_days_per_week
-    
-    # Calculate coverage lost due to transportation
-    coverage_lost_per_day = coverage_per_hour * transportation_time_per_day
-    coverage_lost_per_week = coverage_lost_per_day * operational_days_per_week
-
-    if not is_metric:
-        # Convert results back to imperial if necessary
-        coverage_per_hour = hectares_to_acres(coverage_per_hour)
-        coverage_per_day = hectares_to_acres(coverage_per_day)
-        coverage_per_week = hectares_to_acres(coverage_per_week)
-        coverage_lost_per_day = hectares_to_acres(coverage_lost_per_day)
-        coverage_lost_per_week = hectares_to_acres(coverage_lost_per_week)
+import streamlit as st
 
-    return {
-        'coverage_per_hour': round(coverage_per_hour, 2),
-        'total_turnarounds_per_hour': round(total_turnarounds_per_hour, 1),
-        'time_spent_turning_around_per_hour': round(time_spent_turning_around_per_hour, 1),
-        'coverage_per_day': round(coverage_per_day, 2),
-        'total_turnarounds_per_day': round(total_turnarounds_per_day, 1),
-        'time_spent_turning_around_per_day': round(time_spent_turning_around_per_day, 2),
-        'coverage_per_week': round(coverage_per_week, 2),
-        'total_turnarounds_per_week': round(total_turnarounds_per_week, 1),
-        'time_spent_turning_around_per_week': round(time_spent_turning_around_per_week, 2),
-        'total_hours_per_day': round(total_hours_per_day, 2),
-        'total_hours_per_week': round(total_hours_per_week, 2),
-        'effective_hours_per_day': round(effective_hours_per_day, 2),
-        'effective_hours_per_week': round(effective_hours_per_week, 2),
-        'transportation_time_per_day': round(transportation_time_per_day, 2),
-        'transportation_time_per_week': round(transportation_time_per_week, 2),
-        'coverage_lost_per_day': round(coverage_lost_per_day, 2),
-        'coverage_lost_per_week': round(coverage_lost_per_week, 2),
-    }
+from coverage_calc import feet_to_meters, meters_to_feet, mph_to_kmh, kmh_to_mph, CoverageModel, coverage_cache
 
 st.title('Carbon Coverage Calculator')
 
+# Set COVERAGE_STORE_PATH to keep results in a persistent store shared with other app
+# processes and the command-line tools; without it the app only uses the in-memory LRU
+STORE_PATH = os.environ.get('COVERAGE_STORE_PATH')
+
+@st.cache_resource
+def result_store(path):
+    # One store per server process, opened on first use
+    from coverage_calc import PersistentCoverageCache
+    return PersistentCoverageCache(path)
+
 # Add this to the initialization block at the beginning, with the other session state initializations
 if 'results' not in st.session_state:
     st.session_state.results = None
@@ -119,14 +33,12 @@ if 'field_length_imperial' not in st.session_state:
 # Function to handle metric toggle
 def on_metric_toggle():
     st.session_state.is_metric = not st.session_state.is_metric
-    update_results()
 
 # Add toggle for metric/imperial
 is_metric = st.checkbox('Use Metric Units', value=st.session_state.is_metric, on_change=on_metric_toggle)
 
-# Function to update results
-def update_results():
-    # Get the current values based on unit system
+# Current inputs in the selected unit system, keyed like calculate_coverage's arguments
+def current_inputs():
     if st.session_state.is_metric:
         machine_width = st.session_state.machine_width_imperial * 0.3048
         machine_speed = st.session_state.machine_speed_imperial * 1.60934
@@ -136,21 +48,35 @@ def update_results():
         machine_speed = st.session_state.machine_speed_imperial
         field_length = st.session_state.field_length_imperial
 
-    st.session_state.results = calculate_coverage(
-        machine_width,
-        machine_speed,
-        field_length,
-        st.session_state.get('turn_around_time', 2.0),
-        st.session_state.get('operational_hours_per_day', 8.0),
-        st.session_state.get('operational_days_per_week', 5),
-        st.session_state.is_metric,
-        st.session_state.get('transportation_trips_per_day', 0),
-        st.session_state.get('transportation_time_per_trip', 60.0)
-    )
+    return {
+        'machine_width': machine_width,
+        'machine_speed': machine_speed,
+        'field_length': field_length,
+        'turn_around_time': st.session_state.get('turn_around_time', 2.0),
+        'operational_hours_per_day': st.session_state.get('operational_hours_per_day', 8.0),
+        'operational_days_per_week': st.session_state.get('operational_days_per_week', 5),
+        'is_metric': st.session_state.is_metric,
+        'transportation_trips_per_day': st.session_state.get('transportation_trips_per_day', 0),
+        'transportation_time_per_trip': st.session_state.get('transportation_time_per_trip', 60.0),
+    }
+
+# Function to update results; runs once per rerun. The shared LRU cache answers inputs
+# this or any other session has seen before; on a miss the persistent store is tried, if
+# one is configured, and then the session's CoverageModel recomputes only the quantities
+# that depend on the inputs that changed since it last ran
+def update_results():
+    inputs = current_inputs()
+    if 'coverage_model' not in st.session_state:
+        st.session_state.coverage_model = CoverageModel(**inputs)
+    else:
+        st.session_state.coverage_model.update(**inputs)
+    model = st.session_state.coverage_model
+    compute = model.results if STORE_PATH is None else lambda: result_store(STORE_PATH).model_results(model)
+    st.session_state.results = coverage_cache.get_or_compute(inputs, compute)
 
 # Function to handle input changes
 def on_input_change():
-    # Store values in imperial and update results
+    # Store values in imperial; results are recalculated once in the script body
     if st.session_state.is_metric:
         st.session_state.machine_width_imperial = meters_to_feet(st.session_state.machine_width)
         st.session_state.machine_speed_imperial = kmh_to_mph(st.session_state.machine_speed)
@@ -159,37 +85,60 @@ def on_input_change():
         st.session_state.machine_width_imperial = st.session_state.machine_width
         st.session_state.machine_speed_imperial = st.session_state.machine_speed
         st.session_state.field_length_imperial = st.session_state.field_length
-    
-    update_results()
 
-# And modify the display_results function to handle None values more gracefully
+# Build the output text once per distinct set of results and reuse it on reruns where nothing changed
+def render_results(results, is_metric, transportation_trips_per_day, transportation_time_per_trip):
+    area_unit = 'hectares' if is_metric else 'acres'
+    summary = "\n".join([
+        f"- Machine Coverage per Hour: {results['coverage_per_hour']} {area_unit}",
+        f"- Machine Coverage per Day: {results['coverage_per_day']} {area_unit}",
+        f"- Machine Coverage per Week: {results['coverage_per_week']} {area_unit}",
+        f"- Scheduled Hours per Day: {results['total_hours_per_day']} hours",
+        f"- Effective Operating Hours per Day: {results['effective_hours_per_day']} hours",
+        f"- Scheduled Hours per Week: {results['total_hours_per_week']} hours",
+        f"- Effective Operating Hours per Week: {results['effective_hours_per_week']} hours",
+    ])
+    turnaround = "\n".join([
+        f"- Total Turnarounds per Hour: {results['total_turnarounds_per_hour']}",
+        f"- Total Time per Hour Spent Turning Around: {results['time_spent_turning_around_per_hour']} minutes",
+        f"- Total Turnarounds per Day: {results['total_turnarounds_per_day']}",
+        f"- Total Time per Day Spent Turning Around: {results['time_spent_turning_around_per_day']} hours",
+        f"- Total Turnarounds per Week: {results['total_turnarounds_per_week']}",
+        f"- Total Time per Week Spent Turning Around: {results['time_spent_turning_around_per_week']} hours",
+    ])
+    transportation = None
+    if results['transportation_time_per_day'] > 0:
+        transportation = "\n".join([
+            f"- Transportation Time per Day: {results['transportation_time_per_day']} hours",
+            f"- Transportation Time per Week: {results['transportation_time_per_week']} hours",
+            f"- Transportation Trips per Day: {transportation_trips_per_day}",
+            f"- Transportation Time per Trip: {transportation_time_per_trip} minutes",
+            f"- Coverage Lost per Day: {results['coverage_lost_per_day']} {area_unit}",
+            f"- Coverage Lost per Week: {results['coverage_lost_per_week']} {area_unit}",
+        ])
+    return summary, turnaround, transportation
+
 def display_results():
-    if hasattr(st.session_state, 'results') and st.session_state.results is not None:
-        st.header(f"Outputs ({'Metric' if is_metric else 'Imperial'})")
-        st.write(f"- Machine Coverage per Hour: {st.session_state.results['coverage_per_hour']} {'hectares' if is_metric else 'acres'}")
-        st.write(f"- Machine Coverage per Day: {st.session_state.results['coverage_per_day']} {'hectares' if is_metric else 'acres'}")
-        st.write(f"- Machine Coverage per Week: {st.session_state.results['coverage_per_week']} {'hectares' if is_metric else 'acres'}")
-        st.write(f"- Scheduled Hours per Day: {st.session_state.results['total_hours_per_day']} hours")
-        st.write(f"- Effective Operating Hours per Day: {st.session_state.results['effective_hours_per_day']} hours")
-        st.write(f"- Scheduled Hours per Week: {st.session_state.results['total_hours_per_week']} hours")
-        st.write(f"- Effective Operating Hours per Week: {st.session_state.results['effective_hours_per_week']} hours")
-        
-        with st.expander("Show Turnaround Details"):
-            st.write(f"- Total Turnarounds per Hour: {st.session_state.results['total_turnarounds_per_hour']}")
-            st.write(f"- Total Time per Hour Spent Turning Around: {st.session_state.results['time_spent_turning_around_per_hour']} minutes")
-            st.write(f"- Total Turnarounds per Day: {st.session_state.results['total_turnarounds_per_day']}")
-            st.write(f"- Total Time per Day Spent Turning Around: {st.session_state.results['time_spent_turning_around_per_day']} hours")
-            st.write(f"- Total Turnarounds per Week: {st.session_state.results['total_turnarounds_per_week']}")
-            st.write(f"- Total Time per Week Spent Turning Around: {st.session_state.results['time_spent_turning_around_per_week']} hours")
-        
-        if st.session_state.results['transportation_time_per_day'] > 0:
-            with st.expander("Show Transportation Details"):
-                st.write(f"- Transportation Time per Day: {st.session_state.results['transportation_time_per_day']} hours")
-                st.write(f"- Transportation Time per Week: {st.session_state.results['transportation_time_per_week']} hours")
-                st.write(f"- Transportation Trips per Day: {st.session_state.get('transportation_trips_per_day', 0)}")
-                st.write(f"- Transportation Time per Trip: {st.session_state.get('transportation_time_per_trip', 60.0)} minutes")
-                st.write(f"- Coverage Lost per Day: {st.session_state.results['coverage_lost_per_day']} {'hectares' if is_metric else 'acres'}")
-                st.write(f"- Coverage Lost per Week: {st.session_state.results['coverage_lost_per_week']} {'hectares' if is_metric else 'acres'}")
+    if st.session_state.get('results') is None:
+        return
+    render_key = (
+        tuple(st.session_state.results.items()),
+        is_metric,
+        st.session_state.get('transportation_trips_per_day', 0),
+        st.session_state.get('transportation_time_per_trip', 60.0),
+    )
+    if st.session_state.get('rendered_results_key') != render_key:
+        st.session_state.rendered_results = render_results(st.session_state.results, *render_key[1:])
+        st.session_state.rendered_results_key = render_key
+    summary, turnaround, transportation = st.session_state.rendered_results
+
+    st.header(f"Outputs ({'Metric' if is_metric else 'Imperial'})")
+    st.markdown(summary)
+    with st.expander("Show Turnaround Details"):
+        st.markdown(turnaround)
+    if transportation is not None:
+        with st.expander("Show Transportation Details"):
+            st.markdown(transportation)
 
 # Create two columns
 col1, col2 = st.columns(2)
@@ -234,21 +183,15 @@ with col1:
                     step=0.5,
                     min_value=0.0,
                     max_value=24.0,
-                    key='operational_hours_per_day',
-                    on_change=update_results)
+                    key='operational_hours_per_day')
     st.number_input('Operational Days per Week',
                     value=5,
                     step=1,
                     min_value=0,
                     max_value=7,
-                    key='operational_days_per_week',
-                    on_change=update_results)
-
-# Initial calculation to display default values
-if 'results' not in st.session_state:
-    update_results()
+                    key='operational_days_per_week')
 
-# Ensure results are calculated before display
+# Calculate once per rerun, after every widget callback has updated session state
 update_results()
 
 # Outputs in the second column
@@ -258,19 +201,232 @@ with col2:
                     value=2.0,
                     step=0.5,
                     min_value=0.0,
-                    key='turn_around_time',
-                    on_change=update_results)
+                    key='turn_around_time')
     
     st.subheader('Transportation Settings')
     st.number_input('Transportation Trips per Day',
                     value=0,
                     step=1,
                     min_value=0,
-                    key='transportation_trips_per_day',
-                    on_change=update_results)
+                    key='transportation_trips_per_day')
     st.number_input('Transportation Time per Trip (minutes)',
                     value=60.0,
                     step=15.0,
                     min_value=0.0,
-                    key='transportation_time_per_trip',
-                    on_change=update_results)
\ No newline at end of file
+                    key='transportation_time_per_trip')
+
+# Monte Carlo panel: vary speed, turnaround and transport time around the current inputs
+def display_monte_carlo():
+    from coverage_calc.montecarlo import Normal, Triangular, iter_monte_carlo
+
+    with st.expander("Uncertainty (Monte Carlo)"):
+        mc_col1, mc_col2 = st.columns(2)
+        with mc_col1:
+            st.number_input('Machine Speed Variation (std, % of speed)', value=10.0, step=1.0, min_value=0.0, key='mc_speed_cv')
+            st.number_input('Turn Around Time Minimum (minutes)', value=1.0, step=0.5, min_value=0.0, key='mc_turn_min')
+            st.number_input('Turn Around Time Maximum (minutes)', value=4.0, step=0.5, min_value=0.0, key='mc_turn_max')
+        with mc_col2:
+            st.number_input('Transportation Time Variation (± minutes)', value=15.0, step=5.0, min_value=0.0, key='mc_transport_spread')
+            st.selectbox('Samples', [100000, 1000000, 10000000], index=1, key='mc_samples')
+            st.number_input('Random Seed', value=0, step=1, min_value=0, key='mc_seed')
+        if not st.button('Run Monte Carlo', key='mc_run'):
+            return
+
+        inputs = current_inputs()
+        speed = inputs['machine_speed']
+        turn = inputs['turn_around_time']
+        turn_min, turn_max = min(st.session_state.mc_turn_min, turn), max(st.session_state.mc_turn_max, turn)
+        if st.session_state.mc_speed_cv > 0:
+            inputs['machine_speed'] = Normal(speed, speed * st.session_state.mc_speed_cv / 100, minimum=speed * 0.05)
+        if turn_max > turn_min:
+            inputs['turn_around_time'] = Triangular(turn_min, turn, turn_max)
+        transport = inputs['transportation_time_per_trip']
+        spread = st.session_state.mc_transport_spread
+        if spread > 0 and inputs['transportation_trips_per_day'] > 0:
+            inputs['transportation_time_per_trip'] = Triangular(max(0.0, transport - spread), transport, transport + spread)
+
+        area_unit = 'hectares' if inputs['is_metric'] else 'acres'
+        chart = st.empty()
+        summary_text = st.empty()
+        samples = st.session_state.mc_samples
+        for summary in iter_monte_carlo(inputs, samples, chunk_size=max(samples // 20, 10000), seed=st.session_state.mc_seed):
+            counts, edges = summary['sketches']['coverage_per_week'].histogram(40)
+            centres = [round(value, 1) for value in (edges[:-1] + edges[1:]) / 2]
+            chart.bar_chart({f'Coverage per Week ({area_unit})': counts.tolist(), 'bin': centres}, x='bin')
+            coverage = summary['coverage_per_week']
+            hours = summary['effective_hours_per_week']
+            summary_text.markdown("\n".join([
+                f"- Samples: {summary['samples']:,} ({summary['invalid']:,} invalid)",
+                f"- Coverage per Week P10 / P50 / P90: {coverage['p10']:.2f} / {coverage['p50']:.2f} / {coverage['p90']:.2f} {area_unit}",
+                f"- Effective Operating Hours per Week P10 / P50 / P90: {hours['p10']:.2f} / {hours['p50']:.2f} / {hours['p90']:.2f} hours",
+            ]))
+
+display_monte_carlo()
+
+# Solver panel: fix every other input at its current value and solve for one of them
+SOLVER_TARGETS = {
+    'Machine Coverage per Week': 'coverage_per_week',
+    'Machine Coverage per Day': 'coverage_per_day',
+    'Machine Coverage per Hour': 'coverage_per_hour',
+    'Effective Operating Hours per Week': 'effective_hours_per_week',
+}
+
+def solver_inputs(is_metric):
+    return {
+        'Machine Width': ('machine_width', 'meters' if is_metric else 'feet'),
+        'Machine Speed': ('machine_speed', 'km/h' if is_metric else 'mph'),
+        'Field Length': ('field_length', 'meters' if is_metric else 'feet'),
+        'Turn Around Time': ('turn_around_time', 'minutes'),
+        'Operational Hours per Day': ('operational_hours_per_day', 'hours'),
+        'Operational Days per Week': ('operational_days_per_week', 'days'),
+        'Transportation Time per Trip': ('transportation_time_per_trip', 'minutes'),
+    }
+
+def display_solver():
+    from coverage_calc.solver import solve_inputs
+
+    with st.expander("Solve for an Input"):
+        area_unit = 'hectares' if is_metric else 'acres'
+        target_label = st.selectbox('Target Output', list(SOLVER_TARGETS), key='solver_target')
+        target = SOLVER_TARGETS[target_label]
+        current_value = st.session_state.results[target] if st.session_state.results else 0.0
+        target_value = st.number_input(f"Target Value ({'hours' if target == 'effective_hours_per_week' else area_unit})",
+                                       value=float(current_value),
+                                       min_value=0.0,
+                                       step=1.0,
+                                       key='solver_value')
+        unknown_label = st.selectbox('Solve For', list(solver_inputs(is_metric)), key='solver_unknown')
+        unknown, unit = solver_inputs(is_metric)[unknown_label]
+
+        fixed = st.session_state.coverage_model.inputs()
+        del fixed[unknown]
+        try:
+            solution = solve_inputs({target: target_value}, unknown, fixed)
+        except ValueError as error:
+            st.write(f"- {error}")
+            return
+        low, high = (float(value) for value in solution['feasible_range'][target])
+        if solution['feasible']:
+            st.write(f"- Required {unknown_label}: {float(solution[unknown]):.2f} {unit}")
+        else:
+            st.write(f"- The target is not reachable by changing {unknown_label} alone.")
+        st.write(f"- Achievable {target_label} with the other inputs fixed: {low:.2f} to {high:.2f}")
+
+display_solver()
+
+# Surface panel: an output over a grid of two inputs, the rest held at their current values
+SURFACE_OUTPUTS = {
+    'Machine Coverage per Week': 'coverage_per_week',
+    'Machine Coverage per Day': 'coverage_per_day',
+    'Machine Coverage per Hour': 'coverage_per_hour',
+    'Total Turnarounds per Day': 'total_turnarounds_per_day',
+}
+
+# Slider bounds for each axis in the current unit system
+def surface_axes(is_metric):
+    return {
+        'Machine Width': ('machine_width', (0.6, 60.0) if is_metric else (2.0, 200.0)),
+        'Machine Speed': ('machine_speed', (0.4, 32.0) if is_metric else (0.25, 20.0)),
+        'Field Length': ('field_length', (30.0, 3000.0) if is_metric else (100.0, 10000.0)),
+        'Turn Around Time': ('turn_around_time', (0.0, 10.0)),
+        'Operational Hours per Day': ('operational_hours_per_day', (1.0, 24.0)),
+        'Operational Days per Week': ('operational_days_per_week', (1.0, 7.0)),
+        'Transportation Time per Trip': ('transportation_time_per_trip', (0.0, 240.0)),
+    }
+
+def surface_range(label, name, bounds, value):
+    # Range slider per axis and unit system, starting at half to one and a half times the current value
+    low, high = min(bounds[0], value), max(bounds[1], value)
+    default = (max(low, value * 0.5), min(high, max(value * 1.5, low + (high - low) / 10)))
+    return st.slider(label, min_value=float(low), max_value=float(high), value=(float(default[0]), float(default[1])),
+                     key=f"surface_range_{name}_{'metric' if is_metric else 'imperial'}")
+
+def surface_chart(surface, x_label, y_label, value_label, current, banded):
+    # Vega-Lite spec plus cell data; a plain spec skips Altair's schema validation,
+    # which would otherwise dominate the time to redraw a surface
+    import numpy as np
+    import pandas as pd
+
+    # One rect per grid point, reaching halfway to its neighbours
+    x_edges = np.concatenate([[surface.x[0]], (surface.x[1:] + surface.x[:-1]) / 2, [surface.x[-1]]])
+    y_edges = np.concatenate([[surface.y[0]], (surface.y[1:] + surface.y[:-1]) / 2, [surface.y[-1]]])
+    rows, columns = np.indices(surface.values.shape)
+    cells = pd.DataFrame({
+        'x': x_edges[columns.ravel()], 'x2': x_edges[columns.ravel() + 1],
+        'y': y_edges[rows.ravel()], 'y2': y_edges[rows.ravel() + 1],
+        'value': surface.values.ravel(),
+    })
+    axis = {'type': 'quantitative', 'scale': {'zero': False, 'nice': False}}
+    spec = {
+        'height': 420,
+        'layer': [
+            {
+                'mark': 'rect',
+                'encoding': {
+                    'x': {'field': 'x', 'title': x_label, **axis},
+                    'x2': {'field': 'x2'},
+                    'y': {'field': 'y', 'title': y_label, **axis},
+                    'y2': {'field': 'y2'},
+                    'color': {'field': 'value', 'type': 'quantitative', 'title': value_label,
+                              'scale': {'type': 'quantize', 'nice': True} if banded else {'scheme': 'viridis'}},
+                    'tooltip': [
+                        {'field': 'x', 'type': 'quantitative', 'title': x_label, 'format': '.2f'},
+                        {'field': 'y', 'type': 'quantitative', 'title': y_label, 'format': '.2f'},
+                        {'field': 'value', 'type': 'quantitative', 'title': value_label, 'format': '.2f'},
+                    ],
+                },
+            },
+            {
+                # The current inputs
+                'data': {'values': [{'x': float(current[0]), 'y': float(current[1])}]},
+                'mark': {'type': 'point', 'shape': 'cross', 'size': 200, 'color': 'white', 'strokeWidth': 3, 'filled': True},
+                'encoding': {'x': {'field': 'x', 'type': 'quantitative'}, 'y': {'field': 'y', 'type': 'quantitative'}},
+            },
+        ],
+    }
+    return cells, spec
+
+# How often the panel checks whether a denser grid has landed while one is pending
+SURFACE_POLL_SECONDS = 0.25
+
+@st.fragment(run_every=SURFACE_POLL_SECONDS)
+def watch_refinement(futures):
+    # Only drawn while denser grids are pending. Streamlit stops the timer once the
+    # panel reruns without it, so a finished surface is not polled.
+    if any(future.done() for future in futures):
+        st.rerun()
+
+@st.fragment
+def surface_panel():
+    # A fragment, so changing the panel's own widgets reruns only the panel
+    from coverage_calc.surface import surface_cache
+
+    axes = surface_axes(is_metric)
+    surface_col1, surface_col2 = st.columns(2)
+    with surface_col1:
+        x_label = st.selectbox('Horizontal Axis', list(axes), index=0, key='surface_x')
+        y_label = st.selectbox('Vertical Axis', [label for label in axes if label != x_label], index=0, key='surface_y')
+        output_label = st.selectbox('Output', list(SURFACE_OUTPUTS), key='surface_output')
+    inputs = st.session_state.coverage_model.inputs()
+    (x_name, x_bounds), (y_name, y_bounds) = axes[x_label], axes[y_label]
+    with surface_col2:
+        x_range = surface_range(f'{x_label} Range', x_name, x_bounds, inputs[x_name])
+        y_range = surface_range(f'{y_label} Range', y_name, y_bounds, inputs[y_name])
+        banded = st.checkbox('Contour Bands', value=False, key='surface_banded')
+
+    output = SURFACE_OUTPUTS[output_label]
+    unit = ('hectares' if is_metric else 'acres') if output.startswith('coverage') else 'turnarounds'
+    # Draw the best grid available now; denser ones are computed in the background
+    surface, futures = surface_cache.latest(x_name, x_range, y_name, y_range, inputs, output)
+    cells, spec = surface_chart(surface, x_label, y_label, f'{output_label} ({unit})', (inputs[x_name], inputs[y_name]), banded)
+    st.vega_lite_chart(cells, spec, width='stretch')
+    if futures:
+        watch_refinement(futures)
+
+def display_surface():
+    with st.expander("Coverage Surface"):
+        # Hidden by default; no widgets are built and nothing is computed until shown
+        if st.checkbox('Show Surface', value=False, key='surface_show'):
+            surface_panel()
+
+display_surface()
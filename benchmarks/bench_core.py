@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+
+from coverage_calc import calculate_coverage, calculate_coverage_batch
+
+DEFAULT_BATCH_SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+# Every timed measurement is repeated until it has run for at least this long
+MIN_MEASURE_SECONDS = 0.2
+
+def scenario_columns(rows, seed=0):
+    # Reproducible, realistic mix of inputs in both unit systems
+    rng = np.random.default_rng(seed)
+    return {
+        'machine_width': rng.uniform(3, 40, rows),
+        'machine_speed': rng.uniform(2, 20, rows),
+        'field_length': rng.uniform(100, 3000, rows),
+        'turn_around_time': rng.uniform(0.2, 3, rows),
+        'operational_hours_per_day': rng.uniform(6, 14, rows),
+        'operational_days_per_week': rng.integers(4, 8, rows).astype(float),
+        'is_metric': rng.random(rows) < 0.5,
+        'transportation_trips_per_day': rng.integers(0, 4, rows).astype(float),
+        'transportation_time_per_trip': rng.uniform(0, 60, rows),
+    }
+
+def timed_repeats(function, repeats):
+    # Best seconds per call over repeats, each repeat running at least MIN_MEASURE_SECONDS.
+    # The fastest repeat is the one least disturbed by other processes, as with timeit.
+    function()  # warm up caches and lazy imports
+    samples = []
+    for _ in range(repeats):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            function()
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= MIN_MEASURE_SECONDS:
+                break
+        samples.append(elapsed / calls)
+    return min(samples)
+
+REFERENCE_ARRAY = np.linspace(1.0, 2.0, 20000)
+REFERENCE_SMALL_ARRAY = REFERENCE_ARRAY[:1000].copy()
+
+def reference_workload():
+    # Fixed mix of interpreter work, small-array NumPy calls (dominated by per-call
+    # overhead, like a 10**3-row batch) and large-array arithmetic, timed next to each
+    # measurement so results can be expressed relative to how fast the machine is
+    # running at that moment
+    total = 0.0
+    for value in range(2000):
+        total += value * 0.5 / (value + 1.0)
+    for _ in range(100):
+        total += float(np.maximum(0, (REFERENCE_SMALL_ARRAY * 1.5 + 2.0) / (REFERENCE_SMALL_ARRAY + 1.0)).sum())
+    for _ in range(20):
+        total += float(((REFERENCE_ARRAY * 1.5 + 2.0) / (REFERENCE_ARRAY + 1.0)).sum())
+    return total
+
+def relative_repeats(function, repeats):
+    # Best seconds per call as timed_repeats, plus the median over repeats of
+    # reference_workload seconds / function seconds, each repeat timing both back to back.
+    # A slowdown of the whole machine moves both and cancels out of the ratio.
+    function()
+    seconds, ratios = [], []
+    for _ in range(repeats):
+        reference = timed_repeats(reference_workload, 1)
+        elapsed = timed_repeats(function, 1)
+        seconds.append(elapsed)
+        ratios.append(reference / elapsed)
+    return min(seconds), statistics.median(ratios)
+
+def measure_scalar(calls=10000, repeats=5):
+    columns = scenario_columns(calls)
+    arguments = [tuple(column[row].item() for column in columns.values()) for row in range(calls)]
+
+    def run():
+        for row in arguments:
+            calculate_coverage(*row)
+
+    seconds, relative = relative_repeats(run, repeats)
+    return {'calls': calls, 'repeats': repeats, 'scalar_calls_per_second': calls / seconds, 'scalar_calls_per_reference': calls * relative}
+
+def measure_batch(sizes=DEFAULT_BATCH_SIZES, repeats=3):
+    results = {}
+    for rows in sizes:
+        columns = scenario_columns(rows)
+        seconds, relative = relative_repeats(lambda: calculate_coverage_batch(**columns), repeats)
+        results[rows] = {'seconds': seconds, 'rows_per_second': rows / seconds, 'rows_per_reference': rows * relative}
+        del columns
+    return {'repeats': repeats, 'sizes': results}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure scalar and batch throughput of the calculation core.')
+    parser.add_argument('--calls', type=int, default=10000, help='Scalar calls per timed repeat')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES, help='Batch sizes in rows')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args(argv)
+    print(json.dumps({
+        'scalar': measure_scalar(args.calls, args.repeats),
+        'batch': measure_batch(args.sizes, args.repeats),
+    }, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from unittest import mock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import coverage_calc
+import coverage_calc.core
+import coverage_calc.memo
+import coverage_calc.model
+from streamlit.testing.v1 import AppTest
+
+# Widget edits replayed against the app, cycling through each input in turn
+EDITS = [
+    ('machine_width', [20.0, 30.0, 40.0]),
+    ('machine_speed', [0.75, 1.5, 3.0]),
+    ('field_length', [2000.0, 1500.0]),
+    ('operational_hours_per_day', [8.0, 10.0]),
+    ('turn_around_time', [2.0, 1.5]),
+    ('transportation_trips_per_day', [0, 2]),
+]
+
+def count_calculations():
+    # Wrap calculate_coverage wherever the app may look it up, and CoverageModel.results,
+    # so the same script measures the uncached app (which calls calculate_coverage
+    # directly), the cached one and the one that computes misses through a model
+    calls = {'count': 0}
+    original = coverage_calc.core.calculate_coverage
+    original_results = coverage_calc.model.CoverageModel.results
+
+    def counting(*args, **kwargs):
+        calls['count'] += 1
+        return original(*args, **kwargs)
+
+    def counting_results(self):
+        calls['count'] += 1
+        return original_results(self)
+
+    patches = [
+        mock.patch.object(coverage_calc, 'calculate_coverage', counting),
+        mock.patch.object(coverage_calc.memo, 'calculate_coverage', counting),
+        mock.patch.object(coverage_calc.model.CoverageModel, 'results', counting_results),
+    ]
+    return calls, patches
+
+def measure(app_path, rounds):
+    calls, patches = count_calculations()
+    for patch in patches:
+        patch.start()
+    try:
+        coverage_calc.memo.coverage_cache.clear()
+        app = AppTest.from_file(app_path, default_timeout=30)
+        app.run()
+        latencies = []
+        calls_per_rerun = []
+        nodes_per_rerun = []
+        plain_latencies = []
+        for round_index in range(rounds):
+            for key, values in EDITS:
+                value = values[round_index % len(values)]
+                before = calls['count']
+                model = app.session_state['coverage_model'] if 'coverage_model' in app.session_state else None
+                evaluations = model.evaluations if model is not None else 0
+                started = time.perf_counter()
+                app.number_input(key=key).set_value(value).run()
+                latencies.append(time.perf_counter() - started)
+                calls_per_rerun.append(calls['count'] - before)
+                if model is not None:
+                    # Quantities the model evaluated; zero when the shared cache answered
+                    nodes_per_rerun.append(model.evaluations - evaluations)
+            # A rerun with no input change, e.g. another widget on the page or a browser refresh
+            started = time.perf_counter()
+            app.run()
+            plain_latencies.append(time.perf_counter() - started)
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+    finally:
+        for patch in patches:
+            patch.stop()
+    return {
+        'app': app_path,
+        'reruns': len(latencies),
+        'edit_rerun_ms_median': 1000 * statistics.median(latencies),
+        'edit_rerun_ms_p90': 1000 * sorted(latencies)[int(0.9 * (len(latencies) - 1))],
+        'unchanged_rerun_ms_median': 1000 * statistics.median(plain_latencies),
+        'calculations_per_edit': statistics.mean(calls_per_rerun),
+        'model_nodes_per_edit': statistics.mean(nodes_per_rerun) if nodes_per_rerun else None,
+        'cache': coverage_calc.memo.coverage_cache.stats(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure per-rerun latency of the Streamlit app with the headless test harness.')
+    parser.add_argument('--app', default=os.path.join(REPO_ROOT, 'app.py'), help='App script to measure, e.g. a checkout of the previous version')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args(argv)
+    print(json.dumps(measure(args.app, args.rounds), indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Child process: import the target, then report wall time, peak RSS and heavy modules loaded
+CHILD_SCRIPT = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024
+heavy = sorted(name for name in ('streamlit', 'numpy', 'pandas', 'pyarrow') if name in sys.modules)
+print(json.dumps({{'import_seconds': elapsed, 'max_rss_mb': rss_kb / 1024, 'heavy_modules': heavy}}))
+'''
+
+def measure_import(module, repeats):
+    samples = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT.format(module=module)],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        samples.append(json.loads(output))
+    return {
+        'module': module,
+        'repeats': repeats,
+        'import_seconds_median': statistics.median(sample['import_seconds'] for sample in samples),
+        'max_rss_mb': max(sample['max_rss_mb'] for sample in samples),
+        'heavy_modules': samples[-1]['heavy_modules'],
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure cold import time and memory of the calculation core.')
+    parser.add_argument('--module', default='coverage_calc')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float, default=50.0)
+    parser.add_argument('--max-rss-mb', type=float, default=40.0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    result = measure_import(args.module, args.repeats)
+    result['wall_seconds'] = time.perf_counter() - started
+    print(json.dumps(result, indent=2))
+
+    failures = []
+    if result['import_seconds_median'] * 1000 > args.max_import_ms:
+        failures.append(f"import took {result['import_seconds_median'] * 1000:.1f} ms (budget {args.max_import_ms} ms)")
+    if result['max_rss_mb'] > args.max_rss_mb:
+        failures.append(f"peak RSS {result['max_rss_mb']:.1f} MB (budget {args.max_rss_mb} MB)")
+    if result['heavy_modules']:
+        failures.append(f"importing {args.module} loaded {', '.join(result['heavy_modules'])}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def request_bytes(payload):
+    body = json.dumps(payload).encode()
+    return f"POST /coverage HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+def random_payload(rng):
+    return {
+        'machine_width': rng.uniform(3, 40),
+        'machine_speed': rng.uniform(2, 20),
+        'field_length': rng.uniform(100, 3000),
+        'turn_around_time': rng.uniform(0.2, 3),
+        'operational_hours_per_day': rng.uniform(6, 14),
+        'operational_days_per_week': rng.randint(4, 7),
+        'is_metric': rng.random() < 0.5,
+        'transportation_trips_per_day': rng.randint(0, 3),
+        'transportation_time_per_trip': rng.uniform(0, 60),
+    }
+
+async def client(host, port, requests, seed, latencies, statuses):
+    # One keep-alive connection sending requests back to back
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            writer.write(request_bytes(random_payload(rng)))
+            status, _ = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+async def fetch_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    status, body = await read_response(reader)
+    writer.close()
+    return status, json.loads(body)
+
+async def load_test(host, port, connections, requests):
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    await asyncio.gather(*[client(host, port, requests, seed, latencies, statuses) for seed in range(connections)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    _, metrics = await fetch_json(host, port, '/metrics')
+    return {
+        'connections': connections,
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed,
+        'statuses': statuses,
+        'client_latency_ms': {
+            'p50': 1000 * latencies[len(latencies) // 2],
+            'p90': 1000 * latencies[int(0.9 * (len(latencies) - 1))],
+            'p99': 1000 * latencies[int(0.99 * (len(latencies) - 1))],
+        },
+        'server': {name: metrics[name] for name in ('batches', 'mean_batch_rows', 'max_batch_rows', 'rejected', 'latency_ms')},
+    }
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+def start_service(port, max_delay_ms):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'coverage_calc.service', '--port', str(port), '--max-delay-ms', str(max_delay_ms)],
+        cwd=REPO_ROOT,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            status, _ = asyncio.run(fetch_json('127.0.0.1', port, '/health'))
+            if status == 200:
+                return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Service did not become healthy")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the coverage HTTP service with concurrent keep-alive clients.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help='Port of a running service; without it a service is started for the test')
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=100, help='Requests per connection')
+    parser.add_argument('--max-delay-ms', type=float, default=2.0, help='Batching delay of the service started for the test')
+    args = parser.parse_args(argv)
+
+    process = None
+    port = args.port
+    if port is None:
+        port = free_port()
+        process = start_service(port, args.max_delay_ms)
+    try:
+        result = asyncio.run(load_test(args.host, port, args.connections, args.requests))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(json.dumps(result, indent=2))
+    return 0 if set(result['statuses']) <= {200, 503} else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
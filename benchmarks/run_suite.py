@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+# Whether a larger value of each metric is better; used to decide what counts as a regression
+METRIC_DIRECTIONS = {
+    'scalar_calls_per_second': 'higher',
+    'scalar_calls_per_reference': 'higher',
+    **{f'batch_rows_per_second_1e{power}': 'higher' for power in range(3, 8)},
+    **{f'batch_rows_per_reference_1e{power}': 'higher' for power in range(3, 8)},
+    'import_ms': 'lower',
+    'import_rss_mb': 'lower',
+    'edit_rerun_ms_median': 'lower',
+    'unchanged_rerun_ms_median': 'lower',
+    'calculations_per_edit': 'lower',
+    'model_nodes_per_edit': 'lower',
+}
+
+# Absolute differences below these are timer or allocator noise, whatever the relative change
+NOISE_FLOORS = {
+    'import_ms': 5.0,
+    'import_rss_mb': 2.0,
+    'edit_rerun_ms_median': 5.0,
+    'unchanged_rerun_ms_median': 5.0,
+}
+
+# Reported and compared, but never fail the run. Raw throughput swings by half between
+# runs on a shared machine, so the core is gated on the *_per_reference metrics, which
+# divide out a reference workload timed alongside (bench_core.relative_repeats). Whole
+# AppTest reruns of the Streamlit script vary by tens of percent in the same way;
+# model_nodes_per_edit is the deterministic measure of the app's work per edit and is
+# gated instead.
+UNGATED_METRICS = {
+    'scalar_calls_per_second',
+    *(f'batch_rows_per_second_1e{power}' for power in range(3, 8)),
+    'edit_rerun_ms_median',
+    'unchanged_rerun_ms_median',
+}
+
+DEFAULT_THRESHOLD = 0.25
+
+# Metrics that vary more than DEFAULT_THRESHOLD between processes on the recording machine
+# even relative to the reference workload: both are dominated by per-call interpreter
+# overhead, which shifts with memory layout from one process to the next
+METRIC_THRESHOLDS = {
+    'scalar_calls_per_reference': 0.4,
+    'batch_rows_per_reference_1e3': 0.4,
+}
+
+# --update-baseline stores the median of this many runs, so the baseline is a typical run
+# rather than whichever one happened to be recorded
+DEFAULT_BASELINE_RUNS = 3
+
+# A metric that fails is measured again this many times and its best value kept. Another
+# process on the machine can slow a whole run by a third; a real regression fails every time.
+DEFAULT_CONFIRM_ATTEMPTS = 2
+
+# Rounds of widget edits replayed by bench_rerun, the same with --quick so the per-edit
+# counts come from the same sequence of edits as the baseline's
+UI_ROUNDS = 10
+
+def package_version(name):
+    try:
+        return __import__(name).__version__
+    except ImportError:
+        return None
+
+def environment():
+    # Everything a baseline depends on; results are only compared between identical setups
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': package_version('numpy'),
+        'pandas': package_version('pandas'),
+        'streamlit': package_version('streamlit'),
+    }
+
+def run_benchmarks(quick=False, skip_ui=False):
+    # Run every benchmark and flatten the headline numbers into one metrics dict
+    # Startup runs before anything heavy is imported here: the child's peak RSS
+    # starts from this process's peak, which exec does not reset
+    import bench_startup
+    details = {'startup': bench_startup.measure_import('coverage_calc', 3 if quick else 5)}
+
+    import bench_core
+    sizes = bench_core.DEFAULT_BATCH_SIZES[:-1] if quick else bench_core.DEFAULT_BATCH_SIZES
+    repeats = 3 if quick else 5
+    details['scalar'] = bench_core.measure_scalar(repeats=repeats)
+    details['batch'] = bench_core.measure_batch(sizes, repeats)
+    metrics = {
+        'scalar_calls_per_second': details['scalar']['scalar_calls_per_second'],
+        'scalar_calls_per_reference': details['scalar']['scalar_calls_per_reference'],
+        'import_ms': details['startup']['import_seconds_median'] * 1000,
+        'import_rss_mb': details['startup']['max_rss_mb'],
+    }
+    for rows, result in details['batch']['sizes'].items():
+        metrics[f'batch_rows_per_second_1e{len(str(rows)) - 1}'] = result['rows_per_second']
+        metrics[f'batch_rows_per_reference_1e{len(str(rows)) - 1}'] = result['rows_per_reference']
+    if not skip_ui:
+        import bench_rerun
+        details['rerun'] = bench_rerun.measure(os.path.join(REPO_ROOT, 'app.py'), UI_ROUNDS)
+        for name in ('edit_rerun_ms_median', 'unchanged_rerun_ms_median', 'calculations_per_edit', 'model_nodes_per_edit'):
+            metrics[name] = details['rerun'][name]
+    return metrics, details
+
+def run_benchmarks_isolated(quick=False, skip_ui=False):
+    # run_benchmarks in a fresh interpreter. After the 10**7-row batch this process keeps
+    # gigabytes of peak RSS, which bench_startup's child inherits, and runs the scalar
+    # benchmark markedly slower, so every run after the first gets its own process
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'run.json')
+        command = [sys.executable, os.path.abspath(__file__), '--single-run', '--output', path]
+        if quick:
+            command.append('--quick')
+        if skip_ui:
+            command.append('--skip-ui')
+        subprocess.run(command, cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL)
+        with open(path) as file:
+            run = json.load(file)
+    return run['metrics'], run['details']
+
+def compare(metrics, baseline_metrics, threshold):
+    # Relative regression of every metric present in both runs; positive means worse
+    comparison = {}
+    for name, value in metrics.items():
+        baseline = baseline_metrics.get(name)
+        if baseline is None or name not in METRIC_DIRECTIONS:
+            continue
+        if METRIC_DIRECTIONS[name] == 'higher':
+            regression = baseline / value - 1 if value > 0 else float('inf')
+        elif baseline > 0:
+            regression = value / baseline - 1
+        else:
+            regression = 0.0 if value <= baseline else float('inf')
+        gated = name not in UNGATED_METRICS
+        # Both the relative and the absolute change have to be beyond noise to fail
+        failed = gated and regression > max(threshold, METRIC_THRESHOLDS.get(name, 0.0)) and abs(value - baseline) > NOISE_FLOORS.get(name, 0.0)
+        comparison[name] = {'baseline': baseline, 'value': value, 'regression': regression, 'gated': gated, 'failed': failed}
+    return comparison
+
+def best_value(name, first, second):
+    if second is None:
+        return first
+    return max(first, second) if METRIC_DIRECTIONS.get(name) == 'higher' else min(first, second)
+
+def confirm_failures(metrics, baseline_metrics, threshold, quick, attempts):
+    # Re-measure failing metrics; returns the comparison and how many re-runs it took
+    comparison = compare(metrics, baseline_metrics, threshold)
+    for attempt in range(attempts):
+        failed = [name for name, item in comparison.items() if item['failed']]
+        if not failed:
+            return comparison, attempt
+        print(f"Re-measuring {', '.join(failed)} to confirm", file=sys.stderr)
+        # The UI metrics that are gated are counts, which a re-run cannot change
+        retry, _ = run_benchmarks_isolated(quick, skip_ui=True)
+        for name in failed:
+            metrics[name] = best_value(name, metrics[name], retry.get(name))
+        comparison = compare(metrics, baseline_metrics, threshold)
+    return comparison, attempts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run every benchmark, write the results as JSON and compare them against a stored baseline.')
+    parser.add_argument('--output', help='Write the results JSON here (default: stdout)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline results to compare against')
+    parser.add_argument('--update-baseline', action='store_true', help='Store this run as the new baseline instead of comparing')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Fail when a metric is this fraction worse than the baseline')
+    parser.add_argument('--quick', action='store_true', help='Fewer repeats and no 10**7-row batch')
+    parser.add_argument('--skip-ui', action='store_true', help='Skip the Streamlit rerun benchmark')
+    parser.add_argument('--baseline-runs', type=int, default=DEFAULT_BASELINE_RUNS, help='With --update-baseline, store the median of this many runs')
+    parser.add_argument('--confirm', type=int, default=DEFAULT_CONFIRM_ATTEMPTS, help='Times a failing metric is re-measured before the run fails')
+    parser.add_argument('--single-run', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    metrics, details = run_benchmarks(args.quick, args.skip_ui)
+    if args.single_run:
+        # One run for run_benchmarks_isolated: results only, no baseline
+        with open(args.output, 'w') as file:
+            json.dump({'metrics': metrics, 'details': details}, file)
+        return 0
+    runs = [{'metrics': metrics, 'details': details}]
+    if args.update_baseline and args.baseline_runs > 1:
+        for _ in range(args.baseline_runs - 1):
+            run_metrics, run_details = run_benchmarks_isolated(args.quick, args.skip_ui)
+            runs.append({'metrics': run_metrics, 'details': run_details})
+        metrics = {name: statistics.median(run['metrics'][name] for run in runs) for name in metrics}
+    results = {
+        'environment': environment(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'wall_seconds': time.perf_counter() - started,
+        'settings': {'quick': args.quick, 'skip_ui': args.skip_ui, 'threshold': args.threshold, 'runs': args.baseline_runs if args.update_baseline else 1},
+        'metrics': metrics,
+        'details': details,
+    }
+    if len(runs) > 1:
+        # Each stored metric is the median of these; details above are the first run's
+        results['runs'] = runs
+
+    refused = False
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"Stored baseline in {args.baseline}", file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        mismatched = {name: (baseline['environment'].get(name), value) for name, value in results['environment'].items() if baseline['environment'].get(name) != value}
+        if mismatched:
+            # Timings from another machine or library version say nothing about this change
+            for name, (recorded, current) in mismatched.items():
+                print(f"Baseline {name} is {recorded!r}, this run has {current!r}", file=sys.stderr)
+            print("Refusing to compare against a baseline from a different setup; re-record it here with --update-baseline", file=sys.stderr)
+            refused = True
+        else:
+            results['comparison'], results['confirm_runs'] = confirm_failures(metrics, baseline['metrics'], args.threshold, args.quick, args.confirm)
+    else:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to store one", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text)
+    else:
+        print(text)
+
+    failures = {name: item for name, item in results.get('comparison', {}).items() if item['failed']}
+    for name, item in failures.items():
+        threshold = max(args.threshold, METRIC_THRESHOLDS.get(name, 0.0))
+        print(f"FAIL: {name} {item['regression']:+.0%} vs baseline ({item['value']:.4g} vs {item['baseline']:.4g}, threshold {threshold:.0%})", file=sys.stderr)
+    if refused:
+        return 2
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+import importlib
+
+from .units import feet_to_meters, meters_to_feet, mph_to_kmh, kmh_to_mph, hectares_to_acres, acres_to_hectares
+from .core import calculate_coverage
+from .memo import CoverageCache, cached_calculate_coverage, coverage_cache, normalize_coverage_inputs
+from .model import CoverageModel
+
+__all__ = [
+    'feet_to_meters',
+    'meters_to_feet',
+    'mph_to_kmh',
+    'kmh_to_mph',
+    'hectares_to_acres',
+    'acres_to_hectares',
+    'calculate_coverage',
+    'CoverageCache',
+    'cached_calculate_coverage',
+    'coverage_cache',
+    'normalize_coverage_inputs',
+    'CoverageModel',
+    'calculate_coverage_batch',
+    'calculate_field_coverage',
+    'plan_passes',
+    'PersistentCoverageCache',
+]
+
+# The batch engine and geometry mode pull in NumPy, so they are only imported the first
+# time they are used. Scalar callers get the core without paying for it.
+LAZY_EXPORTS = {
+    'calculate_coverage_batch': 'batch',
+    'calculate_field_coverage': 'geometry',
+    'plan_passes': 'geometry',
+    'PersistentCoverageCache': 'store',
+}
+
+def __getattr__(name):
+    if name in LAZY_EXPORTS:
+        module = importlib.import_module(f'.{LAZY_EXPORTS[name]}', __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,133 @@
+import numpy as np
+
+from .core import AREA_RESULT_KEYS, INPUT_VALIDATION_RULES, RESULT_ROUNDING, pass_coverage, pass_time
+from .units import feet_to_meters, mph_to_kmh, hectares_to_acres
+
+# Validation rules in the same order as calculate_coverage, which raises the first that fails
+BATCH_VALIDATION_RULES = INPUT_VALIDATION_RULES
+
+BATCH_INPUT_COLUMNS = [name for name, _, _ in BATCH_VALIDATION_RULES[:6]] + ['is_metric'] + [name for name, _, _ in BATCH_VALIDATION_RULES[6:]]
+
+def round_half_even_like_python(values, ndigits):
+    # np.round scales by 10**ndigits before rounding, which can disagree with the
+    # built-in round() on values sitting right at a tie. Re-round those few with round().
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, ndigits)
+    scaled = values * 10.0 ** ndigits
+    near_tie = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1e-6
+    near_tie &= np.isfinite(values)
+    for index in np.flatnonzero(near_tie):
+        rounded.flat[index] = round(float(values.flat[index]), ndigits)
+    return rounded
+
+def derive_coverage_metric(machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, transportation_trips_per_day, transportation_time_per_trip):
+    # Unrounded derived quantities for metric inputs; works on scalars and arrays alike
+    transportation_time_per_day = transportation_trips_per_day * transportation_time_per_trip / 60  # hours
+    effective_operational_hours_per_day = np.maximum(0, operational_hours_per_day - transportation_time_per_day)
+
+    coverage_per_pass = pass_coverage(machine_width, field_length)
+    time_per_pass = pass_time(field_length, machine_speed)
+    total_turnarounds_per_hour = 60 / (time_per_pass + turn_around_time)
+    time_spent_turning_around_per_hour = total_turnarounds_per_hour * turn_around_time
+    coverage_per_hour = total_turnarounds_per_hour * coverage_per_pass
+    coverage_per_day = coverage_per_hour * effective_operational_hours_per_day
+    total_turnarounds_per_day = total_turnarounds_per_hour * effective_operational_hours_per_day
+    time_spent_turning_around_per_day = time_spent_turning_around_per_hour * effective_operational_hours_per_day / 60
+    coverage_lost_per_day = coverage_per_hour * transportation_time_per_day
+
+    return {
+        'coverage_per_hour': coverage_per_hour,
+        'total_turnarounds_per_hour': total_turnarounds_per_hour,
+        'time_spent_turning_around_per_hour': time_spent_turning_around_per_hour,
+        'coverage_per_day': coverage_per_day,
+        'total_turnarounds_per_day': total_turnarounds_per_day,
+        'time_spent_turning_around_per_day': time_spent_turning_around_per_day,
+        'coverage_per_week': coverage_per_day * operational_days_per_week,
+        'total_turnarounds_per_week': total_turnarounds_per_day * operational_days_per_week,
+        'time_spent_turning_around_per_week': time_spent_turning_around_per_day * operational_days_per_week,
+        'total_hours_per_day': operational_hours_per_day * np.ones_like(coverage_per_hour),
+        'total_hours_per_week': operational_hours_per_day * operational_days_per_week,
+        'effective_hours_per_day': effective_operational_hours_per_day,
+        'effective_hours_per_week': effective_operational_hours_per_day * operational_days_per_week,
+        'transportation_time_per_day': transportation_time_per_day,
+        'transportation_time_per_week': transportation_time_per_day * operational_days_per_week,
+        'coverage_lost_per_day': coverage_lost_per_day,
+        'coverage_lost_per_week': coverage_lost_per_day * operational_days_per_week,
+    }
+
+def batch_input_columns(data, overrides):
+    # Pull input columns out of a DataFrame or columnar dict; explicit arguments win
+    columns = {}
+    for name in BATCH_INPUT_COLUMNS:
+        if overrides.get(name) is not None:
+            columns[name] = overrides[name]
+        elif data is not None and name in data:
+            columns[name] = data[name]
+        elif name.startswith('transportation_'):
+            columns[name] = 0
+        else:
+            raise ValueError(f"Missing input column: {name}")
+    return columns
+
+def validate_batch_inputs(inputs):
+    # Per-row validation of flat input columns: each row reports the first rule it breaks,
+    # like the scalar ValueError. Returns the valid mask and the error messages.
+    row_count = inputs['machine_width'].shape[0]
+    errors = np.full(row_count, None, dtype=object)
+    valid = np.ones(row_count, dtype=bool)
+    for name, comparison, message in BATCH_VALIDATION_RULES:
+        values = inputs[name]
+        failed = values <= 0 if comparison == 'gt' else values < 0
+        failed &= valid
+        errors[failed] = message
+        valid &= ~failed
+    return valid, errors
+
+def calculate_coverage_batch(machine_width=None, machine_speed=None, field_length=None, turn_around_time=None, operational_hours_per_day=None, operational_days_per_week=None, is_metric=None, transportation_trips_per_day=None, transportation_time_per_trip=None, data=None, round_results=True):
+    columns = batch_input_columns(data, {
+        'machine_width': machine_width,
+        'machine_speed': machine_speed,
+        'field_length': field_length,
+        'turn_around_time': turn_around_time,
+        'operational_hours_per_day': operational_hours_per_day,
+        'operational_days_per_week': operational_days_per_week,
+        'is_metric': is_metric,
+        'transportation_trips_per_day': transportation_trips_per_day,
+        'transportation_time_per_trip': transportation_time_per_trip,
+    })
+    names = list(columns)
+    arrays = np.broadcast_arrays(*[np.asarray(columns[name]) for name in names])
+    inputs = {name: np.array(array, dtype=bool if name == 'is_metric' else float).ravel() for name, array in zip(names, arrays)}
+
+    valid, errors = validate_batch_inputs(inputs)
+
+    imperial = ~inputs['is_metric']
+    machine_width = np.where(imperial, feet_to_meters(inputs['machine_width']), inputs['machine_width'])
+    machine_speed = np.where(imperial, mph_to_kmh(inputs['machine_speed']), inputs['machine_speed'])
+    field_length = np.where(imperial, feet_to_meters(inputs['field_length']), inputs['field_length'])
+
+    # Invalid rows are computed on placeholder inputs and masked to NaN afterwards
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived = derive_coverage_metric(
+            np.where(valid, machine_width, 1.0),
+            np.where(valid, machine_speed, 1.0),
+            np.where(valid, field_length, 1.0),
+            np.where(valid, inputs['turn_around_time'], 1.0),
+            inputs['operational_hours_per_day'],
+            inputs['operational_days_per_week'],
+            inputs['transportation_trips_per_day'],
+            inputs['transportation_time_per_trip'],
+        )
+
+    results = {}
+    for key, ndigits in RESULT_ROUNDING.items():
+        values = np.array(derived[key], dtype=float)
+        if key in AREA_RESULT_KEYS:
+            values = np.where(imperial, hectares_to_acres(values), values)
+        if round_results:
+            values = round_half_even_like_python(values, ndigits)
+        values[~valid] = np.nan
+        results[key] = values
+    results['valid'] = valid
+    results['error'] = errors
+    return results
@@ -0,0 +1,171 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from .batch import BATCH_INPUT_COLUMNS, RESULT_ROUNDING, calculate_coverage_batch
+from .store import PersistentCoverageCache
+
+BULK_FORMATS = ['csv', 'jsonl']
+
+DEFAULT_CHUNK_SIZE = 50000
+
+UNIT_FLAGS = {
+    'metric': True, 'imperial': False,
+    'true': True, 'false': False,
+    '1': True, '0': False,
+    'yes': True, 'no': False,
+}
+
+def parse_column_mapping(pairs):
+    # "machine_width=Width (ft)" maps a calculation input to a column of the input file
+    mapping = {}
+    for pair in pairs or []:
+        target, separator, source = pair.partition('=')
+        if not separator or target not in BATCH_INPUT_COLUMNS:
+            raise ValueError(f"Column mapping must be <input>=<column> with <input> one of {', '.join(BATCH_INPUT_COLUMNS)}, got {pair!r}")
+        mapping[target] = source
+    return mapping
+
+def parse_unit_flags(values):
+    flags = [UNIT_FLAGS.get(str(value).strip().lower()) for value in values]
+    return np.array([flag if flag is not None else np.nan for flag in flags], dtype=object)
+
+def read_scenario_chunks(source, input_format, chunk_size):
+    import pandas as pd
+    if input_format == 'csv':
+        return pd.read_csv(source, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    return pd.read_json(source, lines=True, chunksize=chunk_size, dtype=False)
+
+def evaluate_scenarios(frame, mapping=None, units=None, first_row=1, store=None):
+    # Evaluate one chunk of scenario rows. units is 'metric' or 'imperial' for the whole
+    # file, or None to read an is_metric column per row. Returns the input columns with
+    # the results appended, and a boolean mask of the rows that failed.
+    import pandas as pd
+    mapping = mapping or {}
+    inputs = {}
+    errors = np.full(len(frame), None, dtype=object)
+    for name in BATCH_INPUT_COLUMNS:
+        column = mapping.get(name, name)
+        if name == 'is_metric':
+            if units is not None:
+                inputs[name] = np.full(len(frame), units == 'metric')
+                continue
+            if column not in frame:
+                raise ValueError(f"Input has no {column!r} column; pass --units or map is_metric to a column")
+            flags = parse_unit_flags(frame[column])
+            unknown = pd.isna(flags)
+            errors[unknown & pd.isna(errors)] = f"Unrecognized unit system in column {column!r}"
+            inputs[name] = np.where(unknown, True, flags).astype(bool)
+            continue
+        if column not in frame:
+            if name.startswith('transportation_'):
+                inputs[name] = np.zeros(len(frame))
+                continue
+            raise ValueError(f"Input has no {column!r} column for {name}")
+        values = pd.to_numeric(frame[column].replace('', np.nan), errors='coerce').to_numpy(dtype=float)
+        missing = np.isnan(values)
+        errors[missing & pd.isna(errors)] = f"Missing or non-numeric value for {name}"
+        inputs[name] = np.where(missing, 1.0, values)
+
+    # A PersistentCoverageCache answers rows it has seen in any earlier run or process
+    results = (store.calculate_batch if store is not None else calculate_coverage_batch)(**inputs)
+    errors = np.where(pd.isna(errors), results['error'], errors)
+    failed = ~pd.isna(errors)
+
+    output = frame.reset_index(drop=True).copy()
+    for key in RESULT_ROUNDING:
+        output[key] = np.where(failed, np.nan, results[key])
+    output['error'] = errors
+    output.index = np.arange(first_row, first_row + len(frame))
+    return output, failed
+
+def write_chunk(handle, frame, output_format, header):
+    if output_format == 'csv':
+        frame.to_csv(handle, index=False, header=header)
+    else:
+        text = frame.to_json(orient='records', lines=True)
+        handle.write(text if text.endswith('\n') else text + '\n')
+    handle.flush()
+
+def run_bulk(source, destination, input_format='csv', output_format='csv', mapping=None, units=None, skip_invalid=False, error_handle=None, chunk_size=DEFAULT_CHUNK_SIZE, store=None):
+    # Stream scenarios from source to destination one chunk at a time; memory use
+    # depends on chunk_size, not on the size of the input
+    summary = {'rows': 0, 'invalid': 0}
+    header = True
+    for frame in read_scenario_chunks(source, input_format, chunk_size):
+        output, failed = evaluate_scenarios(frame, mapping, units, first_row=summary['rows'] + 1, store=store)
+        summary['rows'] += len(frame)
+        summary['invalid'] += int(failed.sum())
+        if error_handle is not None:
+            for row, message in output.loc[failed, 'error'].items():
+                error_handle.write(f"row {row}: {message}\n")
+        if skip_invalid:
+            output = output.loc[~failed].drop(columns=['error'])
+        write_chunk(destination, output, output_format, header)
+        header = False
+    return summary
+
+def detect_format(path, explicit):
+    if explicit:
+        return explicit
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate scenario rows from a CSV or JSONL file through calculate_coverage.')
+    parser.add_argument('input', nargs='?', default='-', help="Scenario file, or '-' for stdin (default)")
+    parser.add_argument('--output', '-o', default='-', help="Results file, or '-' for stdout (default)")
+    parser.add_argument('--input-format', choices=BULK_FORMATS, help='Defaults to the input extension, CSV for stdin')
+    parser.add_argument('--output-format', choices=BULK_FORMATS, help='Defaults to the output extension, CSV for stdout')
+    parser.add_argument('--units', choices=['metric', 'imperial'], help='Unit system for every row; by default each row has an is_metric column')
+    parser.add_argument('--map', action='append', metavar='INPUT=COLUMN', help='Read a calculation input from a differently named column (repeatable)')
+    parser.add_argument('--skip-invalid', action='store_true', help='Leave invalid rows out of the results instead of reporting them in an error column')
+    parser.add_argument('--errors', default=None, help="Where to write 'row N: message' for invalid rows (default: stderr when --skip-invalid)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--store', metavar='PATH', help='Reuse and record results in a persistent SQLite result store shared with other runs')
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0:
+        parser.error('--chunk-size must be greater than 0')
+    try:
+        mapping = parse_column_mapping(args.map)
+    except ValueError as error:
+        parser.error(str(error))
+
+    source = sys.stdin if args.input == '-' else args.input
+    destination = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    error_handle = None
+    if args.errors:
+        error_handle = open(args.errors, 'w')
+    elif args.skip_invalid:
+        error_handle = sys.stderr
+    try:
+        summary = run_bulk(
+            source,
+            destination,
+            detect_format(args.input, args.input_format),
+            detect_format(args.output, args.output_format),
+            mapping,
+            args.units,
+            args.skip_invalid,
+            error_handle,
+            args.chunk_size,
+            PersistentCoverageCache(args.store) if args.store else None,
+        )
+    except ValueError as error:
+        parser.exit(2, f"error: {error}\n")
+    finally:
+        if destination is not sys.stdout:
+            destination.close()
+        if error_handle is not None and error_handle is not sys.stderr:
+            error_handle.close()
+    if summary['invalid']:
+        print(f"{summary['invalid']} of {summary['rows']} rows were invalid", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
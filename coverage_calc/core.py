@@ -0,0 +1,125 @@
+from .units import feet_to_meters, mph_to_kmh, hectares_to_acres
+
+# Input checks as (input, 'gt' for > 0 or 'ge' for >= 0, message), in calculate_coverage's order
+INPUT_VALIDATION_RULES = [
+    ('machine_width', 'gt', "Machine width must be greater than 0"),
+    ('machine_speed', 'gt', "Machine speed must be greater than 0"),
+    ('field_length', 'gt', "Field length must be greater than 0"),
+    ('turn_around_time', 'ge', "Turn around time cannot be negative"),
+    ('operational_hours_per_day', 'gt', "Operational hours per day must be greater than 0"),
+    ('operational_days_per_week', 'gt', "Operational days per week must be greater than 0"),
+    ('transportation_trips_per_day', 'ge', "Transportation trips per day cannot be negative"),
+    ('transportation_time_per_trip', 'ge', "Transportation time per trip cannot be negative"),
+]
+
+# Output keys and the number of decimals calculate_coverage rounds each one to
+RESULT_ROUNDING = {
+    'coverage_per_hour': 2,
+    'total_turnarounds_per_hour': 1,
+    'time_spent_turning_around_per_hour': 1,
+    'coverage_per_day': 2,
+    'total_turnarounds_per_day': 1,
+    'time_spent_turning_around_per_day': 2,
+    'coverage_per_week': 2,
+    'total_turnarounds_per_week': 1,
+    'time_spent_turning_around_per_week': 2,
+    'total_hours_per_day': 2,
+    'total_hours_per_week': 2,
+    'effective_hours_per_day': 2,
+    'effective_hours_per_week': 2,
+    'transportation_time_per_day': 2,
+    'transportation_time_per_week': 2,
+    'coverage_lost_per_day': 2,
+    'coverage_lost_per_week': 2,
+}
+
+AREA_RESULT_KEYS = ['coverage_per_hour', 'coverage_per_day', 'coverage_per_week', 'coverage_lost_per_day', 'coverage_lost_per_week']
+
+# Per-pass formulas in metric units, shared by every model built on calculate_coverage
+def pass_coverage(machine_width, field_length):
+    return (machine_width * field_length) / 10000  # hectares
+
+def pass_time(field_length, machine_speed):
+    return field_length / (machine_speed * 1000 / 60)  # minutes
+
+def calculate_coverage(machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day=0, transportation_time_per_trip=0):
+    # Input validation
+    if machine_width <= 0:
+        raise ValueError("Machine width must be greater than 0")
+    if machine_speed <= 0:
+        raise ValueError("Machine speed must be greater than 0")
+    if field_length <= 0:
+        raise ValueError("Field length must be greater than 0")
+    if turn_around_time < 0:
+        raise ValueError("Turn around time cannot be negative")
+    if operational_hours_per_day <= 0:
+        raise ValueError("Operational hours per day must be greater than 0")
+    if operational_days_per_week <= 0:
+        raise ValueError("Operational days per week must be greater than 0")
+    if transportation_trips_per_day < 0:
+        raise ValueError("Transportation trips per day cannot be negative")
+    if transportation_time_per_trip < 0:
+        raise ValueError("Transportation time per trip cannot be negative")
+
+    if not is_metric:
+        # Convert imperial to metric for calculations
+        machine_width = feet_to_meters(machine_width)
+        machine_speed = mph_to_kmh(machine_speed)
+        field_length = feet_to_meters(field_length)
+
+    # Calculate transportation time per day
+    transportation_time_per_day = transportation_trips_per_day * transportation_time_per_trip / 60  # hours
+    
+    # Adjust operational hours by subtracting transportation time
+    effective_operational_hours_per_day = max(0, operational_hours_per_day - transportation_time_per_day)
+    
+    # Calculations in metric units
+    coverage_per_pass = pass_coverage(machine_width, field_length)
+    time_per_pass = pass_time(field_length, machine_speed)
+    total_turnarounds_per_hour = 60 / (time_per_pass + turn_around_time)
+    time_spent_turning_around_per_hour = total_turnarounds_per_hour * turn_around_time
+    coverage_per_hour = (60 / (time_per_pass + turn_around_time)) * coverage_per_pass
+    coverage_per_day = coverage_per_hour * effective_operational_hours_per_day
+    total_turnarounds_per_day = total_turnarounds_per_hour * effective_operational_hours_per_day
+    time_spent_turning_around_per_day = time_spent_turning_around_per_hour * effective_operational_hours_per_day / 60
+    coverage_per_week = coverage_per_day * operational_days_per_week
+    total_turnarounds_per_week = total_turnarounds_per_day * operational_days_per_week
+    time_spent_turning_around_per_week = time_spent_turning_around_per_day * operational_days_per_week
+
+    total_hours_per_day = operational_hours_per_day
+    total_hours_per_week = operational_hours_per_day * operational_days_per_week
+    effective_hours_per_day = effective_operational_hours_per_day
+    effective_hours_per_week = effective_operational_hours_per_day * operational_days_per_week
+    transportation_time_per_week = transportation_time_per_day * operational_days_per_week
+    
+    # Calculate coverage lost due to transportation
+    coverage_lost_per_day = coverage_per_hour * transportation_time_per_day
+    coverage_lost_per_week = coverage_lost_per_day * operational_days_per_week
+
+    if not is_metric:
+        # Convert results back to imperial if necessary
+        coverage_per_hour = hectares_to_acres(coverage_per_hour)
+        coverage_per_day = hectares_to_acres(coverage_per_day)
+        coverage_per_week = hectares_to_acres(coverage_per_week)
+        coverage_lost_per_day = hectares_to_acres(coverage_lost_per_day)
+        coverage_lost_per_week = hectares_to_acres(coverage_lost_per_week)
+
+    return {
+        'coverage_per_hour': round(coverage_per_hour, 2),
+        'total_turnarounds_per_hour': round(total_turnarounds_per_hour, 1),
+        'time_spent_turning_around_per_hour': round(time_spent_turning_around_per_hour, 1),
+        'coverage_per_day': round(coverage_per_day, 2),
+        'total_turnarounds_per_day': round(total_turnarounds_per_day, 1),
+        'time_spent_turning_around_per_day': round(time_spent_turning_around_per_day, 2),
+        'coverage_per_week': round(coverage_per_week, 2),
+        'total_turnarounds_per_week': round(total_turnarounds_per_week, 1),
+        'time_spent_turning_around_per_week': round(time_spent_turning_around_per_week, 2),
+        'total_hours_per_day': round(total_hours_per_day, 2),
+        'total_hours_per_week': round(total_hours_per_week, 2),
+        'effective_hours_per_day': round(effective_hours_per_day, 2),
+        'effective_hours_per_week': round(effective_hours_per_week, 2),
+        'transportation_time_per_day': round(transportation_time_per_day, 2),
+        'transportation_time_per_week': round(transportation_time_per_week, 2),
+        'coverage_lost_per_day': round(coverage_lost_per_day, 2),
+        'coverage_lost_per_week': round(coverage_lost_per_week, 2),
+    }
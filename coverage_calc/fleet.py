@@ -0,0 +1,255 @@
+import heapq
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from .core import INPUT_VALIDATION_RULES, pass_coverage, pass_time
+from .units import feet_to_meters, mph_to_kmh, hectares_to_acres
+
+MINUTES_PER_DAY = 24 * 60
+
+DEFAULT_SEASON_DAYS = 182
+
+# Shifts start at 06:00 on each operational day; days 0..operational_days_per_week-1 of every week work
+DEFAULT_SHIFT_START = 6 * 60
+
+# Shifts have to fit in a day and operational days in a week, so on top of the
+# calculator's rules the simulation bounds these from above
+UPPER_LIMITS = {
+    'operational_hours_per_day': (24, "Operational hours per day cannot exceed 24"),
+    'operational_days_per_week': (7, "Operational days per week cannot exceed 7"),
+}
+
+def validate_inputs(**inputs):
+    # The calculator's checks (core.INPUT_VALIDATION_RULES) for the given inputs, in its
+    # order, so a fleet input fails with the same ValueError as calculate_coverage
+    for name, comparison, message in INPUT_VALIDATION_RULES:
+        if name not in inputs:
+            continue
+        value = inputs[name]
+        if value <= 0 if comparison == 'gt' else value < 0:
+            raise ValueError(message)
+        if name in UPPER_LIMITS and value > UPPER_LIMITS[name][0]:
+            raise ValueError(UPPER_LIMITS[name][1])
+
+class Machine:
+    __slots__ = ('name', 'machine_width', 'machine_speed', 'turn_around_time', 'operational_hours_per_day', 'operational_days_per_week', 'transportation_trips_per_day', 'transportation_time_per_trip')
+
+    def __init__(self, machine_width, machine_speed, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day=0, transportation_time_per_trip=0, name=None):
+        validate_inputs(
+            machine_width=machine_width,
+            machine_speed=machine_speed,
+            turn_around_time=turn_around_time,
+            operational_hours_per_day=operational_hours_per_day,
+            operational_days_per_week=operational_days_per_week,
+            transportation_trips_per_day=transportation_trips_per_day,
+            transportation_time_per_trip=transportation_time_per_trip,
+        )
+        if not is_metric:
+            machine_width = feet_to_meters(machine_width)
+            machine_speed = mph_to_kmh(machine_speed)
+        self.name = name
+        self.machine_width = machine_width
+        self.machine_speed = machine_speed
+        self.turn_around_time = turn_around_time
+        self.operational_hours_per_day = operational_hours_per_day
+        self.operational_days_per_week = int(operational_days_per_week)
+        self.transportation_trips_per_day = transportation_trips_per_day
+        self.transportation_time_per_trip = transportation_time_per_trip
+
+class Field:
+    # A field worked in passes of field_length, side by side across field_width
+    __slots__ = ('name', 'field_length', 'field_width')
+
+    def __init__(self, field_length, field_width, is_metric, name=None):
+        validate_inputs(field_length=field_length)
+        if field_width <= 0:
+            raise ValueError("Field width must be greater than 0")
+        if not is_metric:
+            field_length = feet_to_meters(field_length)
+            field_width = feet_to_meters(field_width)
+        self.name = name
+        self.field_length = field_length
+        self.field_width = field_width
+
+class MachineState:
+    __slots__ = ('machine', 'field', 'pass_width', 'shift_start', 'passes', 'area', 'pass_minutes', 'turn_minutes', 'transport_minutes', 'idle_minutes', 'finished_at')
+
+    def __init__(self, machine, field):
+        self.machine = machine
+        self.field = field
+        self.pass_width = 0.0
+        self.shift_start = None
+        self.passes = 0
+        self.area = 0.0
+        self.pass_minutes = 0.0
+        self.turn_minutes = 0.0
+        self.transport_minutes = 0.0
+        self.idle_minutes = 0.0
+        self.finished_at = None
+
+class FieldState:
+    __slots__ = ('field', 'unclaimed_width', 'passes_in_progress', 'area', 'completed_at')
+
+    def __init__(self, field):
+        self.field = field
+        self.unclaimed_width = field.field_width
+        self.passes_in_progress = 0
+        self.area = 0.0
+        self.completed_at = None
+
+def shift_bounds(machine, time, shift_start_offset):
+    # Start and end (minutes from season start) of the shift containing time, or of the next shift
+    day = int(time // MINUTES_PER_DAY)
+    while True:
+        if day % 7 < machine.operational_days_per_week:
+            start = day * MINUTES_PER_DAY + shift_start_offset
+            end = start + machine.operational_hours_per_day * 60
+            if time < end:
+                return start, end
+        day += 1
+
+def next_open_field(field_states, current):
+    count = len(field_states)
+    for step in range(1, count + 1):
+        index = (current + step) % count
+        if field_states[index].unclaimed_width > 1e-9:
+            return index
+    return None
+
+def simulate_fleet(machines, fields, season_days=DEFAULT_SEASON_DAYS, is_metric=True, seed=None, speed_cv=0.0, turn_cv=0.0, shift_start=DEFAULT_SHIFT_START):
+    # Run every machine pass by pass through a season. Machine i starts on field
+    # i % len(fields), claims one swath at a time, and moves to the next field with
+    # unclaimed swaths when its field runs out. Each operational day starts with the
+    # machine's transportation_trips_per_day, a move between fields costs one trip,
+    # and work that would overrun the shift waits for the next one. With speed_cv or
+    # turn_cv set, each pass draws its speed and turn time around the machine's values.
+    # There is one event per pass: the travel, turn and idle wait before it are scheduled
+    # together and only accumulated per machine, and transport is a per-machine delay
+    # rather than a shared resource that machines queue for.
+    if not machines or not fields:
+        raise ValueError("Simulation needs at least one machine and one field")
+    rng = random.Random(seed)
+    gauss = rng.gauss
+    season_end = season_days * MINUTES_PER_DAY
+    field_states = [FieldState(field) for field in fields]
+    machine_states = [MachineState(machine, index % len(fields)) for index, machine in enumerate(machines)]
+
+    events = []
+    for index in range(len(machine_states)):
+        heapq.heappush(events, (0.0, index, True))
+    event_count = 0
+
+    while events:
+        now, index, arriving = heapq.heappop(events)
+        event_count += 1
+        state = machine_states[index]
+        machine = state.machine
+        field_state = field_states[state.field]
+
+        # Credit the swath that just finished
+        if state.pass_width:
+            field_state.passes_in_progress -= 1
+            area = pass_coverage(state.pass_width, field_state.field.field_length)
+            field_state.area += area
+            state.area += area
+            state.passes += 1
+            state.pass_width = 0.0
+            if field_state.unclaimed_width <= 1e-9 and field_state.passes_in_progress == 0:
+                field_state.completed_at = now
+            state.finished_at = now
+
+        # Pick the next swath, travelling if this field has none left
+        travel = 0.0
+        turn = 0.0 if arriving else machine.turn_around_time
+        if field_state.unclaimed_width <= 1e-9:
+            target = next_open_field(field_states, state.field)
+            if target is None:
+                continue
+            state.field = target
+            field_state = field_states[target]
+            travel = machine.transportation_time_per_trip
+            turn = 0.0
+
+        speed = machine.machine_speed
+        if speed_cv:
+            speed *= max(0.2, gauss(1.0, speed_cv))
+        if turn and turn_cv:
+            turn *= max(0.0, gauss(1.0, turn_cv))
+        duration = pass_time(field_state.field.field_length, speed)
+
+        # Fit travel, turn and pass into the machine's shift
+        begin = now
+        while True:
+            start, end = shift_bounds(machine, begin, shift_start)
+            if start != state.shift_start:
+                state.shift_start = start
+                begin = max(begin, start)
+                daily_transport = machine.transportation_trips_per_day * machine.transportation_time_per_trip
+                state.transport_minutes += daily_transport
+                begin += daily_transport
+                fresh_shift = True
+                # A new shift starts from the field edge
+                turn = 0.0
+            else:
+                fresh_shift = begin <= start
+            if begin + travel + turn + duration <= end:
+                break
+            if fresh_shift:
+                raise ValueError("A single pass does not fit in one shift after daily transportation; shorten the field or lengthen the shift")
+            state.idle_minutes += max(0.0, end - begin)
+            begin = end
+        if begin + travel + turn + duration > season_end:
+            continue
+
+        state.transport_minutes += travel
+        state.turn_minutes += turn
+        state.pass_minutes += duration
+        state.pass_width = min(machine.machine_width, field_state.unclaimed_width)
+        field_state.unclaimed_width -= state.pass_width
+        field_state.passes_in_progress += 1
+        heapq.heappush(events, (begin + travel + turn + duration, index, False))
+
+    return simulation_report(machine_states, field_states, event_count, is_metric)
+
+def simulation_report(machine_states, field_states, event_count, is_metric):
+    convert_area = (lambda hectares: hectares) if is_metric else hectares_to_acres
+
+    def hours(minutes):
+        return None if minutes is None else round(minutes / 60, 2)
+
+    machines = [{
+        'name': state.machine.name if state.machine.name is not None else index,
+        'passes': state.passes,
+        'coverage': round(convert_area(state.area), 2),
+        'pass_hours': hours(state.pass_minutes),
+        'turn_hours': hours(state.turn_minutes),
+        'transport_hours': hours(state.transport_minutes),
+        'idle_hours': hours(state.idle_minutes),
+        'finished_at_hours': hours(state.finished_at),
+    } for index, state in enumerate(machine_states)]
+    fields = [{
+        'name': state.field.name if state.field.name is not None else index,
+        'field_area': round(convert_area(pass_coverage(state.field.field_width, state.field.field_length)), 2),
+        'coverage': round(convert_area(state.area), 2),
+        'completed_at_hours': hours(state.completed_at),
+        'completed_on_day': None if state.completed_at is None else int(state.completed_at // MINUTES_PER_DAY),
+    } for index, state in enumerate(field_states)]
+    completed = [state.completed_at for state in field_states]
+    return {
+        'machines': machines,
+        'fields': fields,
+        'completed_at_hours': None if None in completed else hours(max(completed)),
+        'events': event_count,
+    }
+
+def replicate_simulation(arguments):
+    machines, fields, seed, options = arguments
+    return simulate_fleet(machines, fields, seed=seed, **options)
+
+def run_replications(machines, fields, replications, seed=0, workers=None, **options):
+    # Independent runs with seeds seed, seed + 1, ...; workers=1 runs them in-process
+    jobs = [(machines, fields, seed + replication, options) for replication in range(replications)]
+    if workers == 1:
+        return [replicate_simulation(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(replicate_simulation, jobs))
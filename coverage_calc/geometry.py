@@ -0,0 +1,238 @@
+import numpy as np
+
+from .core import calculate_coverage
+from .units import feet_to_meters, mph_to_kmh, hectares_to_acres
+
+# Headings evaluated per vectorized step of the heading search; bounds the size of the
+# heading x swath x edge crossing array for large fields
+HEADING_BATCH = 32
+
+def polygon_area_signed(points):
+    x, y = np.asarray(points, dtype=float).T
+    return (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+
+def polygon_area(boundary):
+    return abs(polygon_area_signed(boundary))
+
+def polygon_perimeter(boundary):
+    points = np.asarray(boundary, dtype=float)
+    return np.hypot(*(np.roll(points, -1, axis=0) - points).T).sum()
+
+def field_boundary(boundary):
+    points = np.asarray(boundary, dtype=float)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError("Field boundary must be a sequence of (x, y) points")
+    if len(points) > 1 and np.array_equal(points[0], points[-1]):
+        points = points[:-1]
+    if len(points) < 3 or polygon_area(points) <= 0:
+        raise ValueError("Field boundary must have at least 3 points and a non-zero area")
+    return points
+
+def headland_lap_lengths(boundary, machine_width, headland_passes):
+    # Length of each lap around the headland, driven on the centreline of the lap.
+    # Offsetting a polygon inwards by d shortens its perimeter by 2*d*sum(tan(a/2))
+    # over the exterior angles a, which is exact for convex fields.
+    points = field_boundary(boundary)
+    if polygon_area_signed(points) < 0:
+        points = points[::-1]
+    edges = np.roll(points, -1, axis=0) - points
+    directions = np.arctan2(edges[:, 1], edges[:, 0])
+    exterior = (directions - np.roll(directions, 1) + np.pi) % (2 * np.pi) - np.pi
+    shrink = 2 * np.tan(exterior / 2).sum()
+    offsets = machine_width * (np.arange(headland_passes) + 0.5)
+    return np.maximum(0, polygon_perimeter(points) - shrink * offsets)
+
+def inset_polygon(boundary, distance):
+    # The boundary moved inwards by distance: every edge shifted along its inward normal,
+    # with consecutive shifted edges meeting at their intersection. Edges the offset
+    # turns inside out are dropped and their neighbours extended to meet instead.
+    # Exact for convex fields. Returns None when nothing of the field is left.
+    points = field_boundary(boundary)
+    if distance == 0:
+        return points
+    if polygon_area_signed(points) < 0:
+        points = points[::-1]
+    edges = np.roll(points, -1, axis=0) - points
+    directions = edges / np.hypot(edges[:, 0], edges[:, 1])[:, None]
+    normals = np.stack([-directions[:, 1], directions[:, 0]], axis=1)
+    anchors = points + distance * normals
+
+    lines = list(range(len(points)))
+    while len(lines) >= 3:
+        vertices = []
+        for previous, current in zip(np.roll(lines, 1), lines):
+            u, v = directions[previous], directions[current]
+            denominator = u[0] * v[1] - u[1] * v[0]
+            if abs(denominator) < 1e-12:
+                vertices.append(anchors[current])  # collinear edges: no corner to miter
+                continue
+            offset = anchors[current] - anchors[previous]
+            s = (offset[0] * v[1] - offset[1] * v[0]) / denominator
+            vertices.append(anchors[previous] + s * u)
+        vertices = np.array(vertices)
+        new_edges = np.roll(vertices, -1, axis=0) - vertices
+        reversed_edges = (new_edges * directions[lines]).sum(axis=1) <= 1e-9
+        if not reversed_edges.any():
+            return vertices if polygon_area_signed(vertices) > 1e-9 else None
+        lines = [line for line, gone in zip(lines, reversed_edges) if not gone]
+    return None
+
+def rotated_swaths(boundary, machine_width, headings):
+    # Boundary rotated so each heading's travel direction is +x, and the swath
+    # centreline offsets across it, NaN-padded to the longest swath count
+    points = field_boundary(boundary)
+    radians = np.deg2rad(np.atleast_1d(np.asarray(headings, dtype=float)))[:, None]
+    cos, sin = np.cos(radians), np.sin(radians)
+    along = points[:, 0] * cos + points[:, 1] * sin
+    across = -points[:, 0] * sin + points[:, 1] * cos
+
+    low = across.min(axis=1)
+    swath_counts = np.ceil((across.max(axis=1) - low) / machine_width - 1e-9).astype(int)
+    offsets = low[:, None] + machine_width * (np.arange(swath_counts.max()) + 0.5)
+    offsets[np.arange(swath_counts.max()) >= swath_counts[:, None]] = np.nan
+    return along, across, offsets
+
+def swath_crossing_counts(boundary, machine_width, headings):
+    _, across, offsets = rotated_swaths(boundary, machine_width, headings)
+    y1 = across[:, None, :]
+    y2 = np.roll(y1, -1, axis=2)
+    lines = offsets[:, :, None]
+    return ((y1 <= lines) != (y2 <= lines)).sum(axis=2)
+
+def clip_swaths(boundary, machine_width, headings):
+    # Clip evenly spaced swath centrelines against the boundary for every heading at once.
+    # Headings are degrees counterclockwise from the +x axis. Returns, per heading, the
+    # swath positions across the field and the start/end of every segment along it as
+    # (headings, swaths, segments) arrays, NaN where a swath has fewer segments.
+    along, across, offsets = rotated_swaths(boundary, machine_width, headings)
+    x1, y1 = along[:, None, :], across[:, None, :]
+    x2, y2 = np.roll(x1, -1, axis=2), np.roll(y1, -1, axis=2)
+    lines = offsets[:, :, None]
+    crosses = (y1 <= lines) != (y2 <= lines)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossings = np.where(crosses, x1 + (lines - y1) * (x2 - x1) / (y2 - y1), np.nan)
+    crossings.sort(axis=2)
+    pair_count = (crossings.shape[2] + 1) // 2
+    crossings = np.pad(crossings, ((0, 0), (0, 0), (0, 2 * pair_count - crossings.shape[2])), constant_values=np.nan)
+    starts = crossings[:, :, 0::2]
+    ends = crossings[:, :, 1::2]
+    keep = ends - starts > 1e-9
+    return offsets, np.where(keep, starts, np.nan), np.where(keep, ends, np.nan)
+
+def count_turns(boundary, machine_width, headings):
+    # Every pair of crossings is a pass, so only the crossing counts are needed, not
+    # where the crossings are
+    headings = np.atleast_1d(np.asarray(headings, dtype=float))
+    turns = np.empty(len(headings), dtype=int)
+    for start in range(0, len(headings), HEADING_BATCH):
+        batch = headings[start:start + HEADING_BATCH]
+        passes = swath_crossing_counts(boundary, machine_width, batch).sum(axis=1) // 2
+        turns[start:start + HEADING_BATCH] = np.maximum(0, passes - 1)
+    return turns
+
+def best_heading(boundary, machine_width, step=1.0):
+    # Heading in [0, 180) with the fewest turns. The boundary's own edge directions are
+    # tried first, longest edge first, so ties go to passes parallel to a field edge.
+    points = field_boundary(boundary)
+    edges = np.roll(points, -1, axis=0) - points
+    edge_order = np.argsort(-np.hypot(edges[:, 0], edges[:, 1]), kind='stable')
+    edge_headings = np.degrees(np.arctan2(edges[edge_order, 1], edges[edge_order, 0])) % 180
+    headings = np.concatenate([np.round(edge_headings, 6) % 180, np.arange(0, 180, step)])
+    turns = count_turns(points, machine_width, headings)
+    return float(headings[np.argmin(turns)])
+
+def plan_passes(boundary, machine_width, heading=None, headland_passes=0, heading_step=1.0):
+    # Swath plan for a field boundary: pass lengths in travel order (alternating
+    # direction), the swath lines themselves, and the headland laps around them.
+    # Swaths cover what the headland laps leave: the boundary inset by their width.
+    # Coordinates and widths share one length unit (feet or meters).
+    if machine_width <= 0:
+        raise ValueError("Machine width must be greater than 0")
+    if headland_passes < 0:
+        raise ValueError("Headland passes cannot be negative")
+    points = field_boundary(boundary)
+    inner = inset_polygon(points, headland_passes * machine_width)
+    if heading is None:
+        heading = best_heading(points if inner is None else inner, machine_width, heading_step)
+
+    if inner is None:
+        offsets, starts, ends = np.empty(0), np.empty((0, 1)), np.empty((0, 1))
+    else:
+        offsets, starts, ends = clip_swaths(inner, machine_width, heading)
+        offsets, starts, ends = offsets[0], starts[0], ends[0]
+    # Boustrophedon order: every other swath is driven back the other way
+    reverse = (np.arange(len(offsets)) % 2 == 1)[:, None]
+    pass_starts = np.where(reverse, ends[:, ::-1], starts)
+    pass_ends = np.where(reverse, starts[:, ::-1], ends)
+    present = ~np.isnan(pass_starts)
+    pass_starts, pass_ends = pass_starts[present], pass_ends[present]
+    pass_offsets = np.broadcast_to(offsets[:, None], present.shape)[present]
+
+    radians = np.deg2rad(heading)
+    cos, sin = np.cos(radians), np.sin(radians)
+    swath_lines = np.stack([
+        np.stack([pass_starts * cos - pass_offsets * sin, pass_starts * sin + pass_offsets * cos], axis=-1),
+        np.stack([pass_ends * cos - pass_offsets * sin, pass_ends * sin + pass_offsets * cos], axis=-1),
+    ], axis=1)
+    pass_lengths = np.abs(pass_ends - pass_starts)
+    headland_lengths = headland_lap_lengths(points, machine_width, headland_passes)
+
+    return {
+        'heading': float(heading),
+        'pass_lengths': pass_lengths,
+        'swath_lines': swath_lines,
+        'headland_lengths': headland_lengths,
+        'pass_count': len(pass_lengths) + int((headland_lengths > 0).sum()),
+        'turn_count': max(0, len(pass_lengths) + int((headland_lengths > 0).sum()) - 1),
+        'field_area': float(polygon_area(points)),
+        'worked_area': float((pass_lengths.sum() + headland_lengths.sum()) * machine_width),
+    }
+
+def plan_fields(boundaries, machine_width, heading=None, headland_passes=0, heading_step=1.0):
+    return [plan_passes(boundary, machine_width, heading, headland_passes, heading_step) for boundary in boundaries]
+
+def calculate_field_coverage(boundary, machine_width, machine_speed, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day=0, transportation_time_per_trip=0, heading=None, headland_passes=0, heading_step=1.0):
+    # calculate_coverage for a real field. The field's passes and turns are folded into
+    # the equivalent inputs of the existing model: the mean pass length as field_length,
+    # and the turns spread over the passes as turn_around_time. Boundary coordinates
+    # are in feet or meters to match the unit system.
+    plan = plan_passes(boundary, machine_width, heading, headland_passes, heading_step)
+    lengths = np.concatenate([plan['pass_lengths'], plan['headland_lengths'][plan['headland_lengths'] > 0]])
+    if len(lengths) == 0:
+        raise ValueError("Field is too small for a single pass at this machine width and headland")
+
+    mean_pass_length = float(lengths.mean())
+    turn_time_per_pass = turn_around_time * plan['turn_count'] / plan['pass_count']
+    results = calculate_coverage(
+        machine_width,
+        machine_speed,
+        mean_pass_length,
+        turn_time_per_pass,
+        operational_hours_per_day,
+        operational_days_per_week,
+        is_metric,
+        transportation_trips_per_day,
+        transportation_time_per_trip,
+    )
+
+    total_length, field_area, worked_area = lengths.sum(), plan['field_area'] / 10000, plan['worked_area'] / 10000  # hectares
+    speed = machine_speed
+    if not is_metric:
+        total_length = feet_to_meters(total_length)
+        field_area = hectares_to_acres(feet_to_meters(feet_to_meters(field_area)))
+        worked_area = hectares_to_acres(feet_to_meters(feet_to_meters(worked_area)))
+        speed = mph_to_kmh(speed)
+    field_hours = float(total_length / (speed * 1000 / 60) + plan['turn_count'] * turn_around_time) / 60
+    effective_hours_per_day = results['effective_hours_per_day']
+
+    results.update({
+        'heading': round(plan['heading'], 1),
+        'pass_count': plan['pass_count'],
+        'turn_count': plan['turn_count'],
+        'mean_pass_length': round(mean_pass_length, 2),
+        'field_area': round(float(field_area), 2),
+        'worked_area': round(float(worked_area), 2),
+        'field_hours': round(field_hours, 2),
+        'field_days': round(field_hours / effective_hours_per_day, 2) if effective_hours_per_day > 0 else float('inf'),
+    })
+    return results, plan
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+from .core import calculate_coverage
+from .units import feet_to_meters, mph_to_kmh
+
+COVERAGE_CACHE_SIZE = 4096
+
+COVERAGE_ARGUMENTS = ('machine_width', 'machine_speed', 'field_length', 'turn_around_time', 'operational_hours_per_day', 'operational_days_per_week', 'is_metric', 'transportation_trips_per_day', 'transportation_time_per_trip')
+
+# Inputs are compared after conversion to metric and rounding to this many decimals
+INPUT_PRECISION = 6
+
+def normalize_coverage_inputs(machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day=0, transportation_time_per_trip=0):
+    if not is_metric:
+        machine_width = feet_to_meters(machine_width)
+        machine_speed = mph_to_kmh(machine_speed)
+        field_length = feet_to_meters(field_length)
+    return tuple(round(float(value), INPUT_PRECISION) for value in (
+        machine_width,
+        machine_speed,
+        field_length,
+        turn_around_time,
+        operational_hours_per_day,
+        operational_days_per_week,
+        transportation_trips_per_day,
+        transportation_time_per_trip,
+    ))
+
+class CoverageCache:
+    # Bounded LRU of calculate_coverage results, safe to share between Streamlit sessions.
+    # Results depend on the unit system they are reported in, so it is part of the key.
+    def __init__(self, maxsize=COVERAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def calculate(self, machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day=0, transportation_time_per_trip=0):
+        arguments = (machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day, transportation_time_per_trip)
+        return self.get_or_compute(arguments, lambda: calculate_coverage(*arguments))
+
+    def get_or_compute(self, arguments, compute):
+        # The cached result for calculate_coverage's arguments (a tuple in its order or a
+        # dict of them), or compute() stored under them on a miss. compute must return
+        # what calculate_coverage would for the same arguments.
+        if isinstance(arguments, dict):
+            arguments = tuple(arguments[name] for name in COVERAGE_ARGUMENTS)
+        key = (normalize_coverage_inputs(*arguments), bool(arguments[6]))
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return dict(result)
+            self.misses += 1
+
+        result = compute()
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return dict(result)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._results), 'maxsize': self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+coverage_cache = CoverageCache()
+
+def cached_calculate_coverage(machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day=0, transportation_time_per_trip=0):
+    return coverage_cache.calculate(machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day, transportation_time_per_trip)
@@ -0,0 +1,140 @@
+from .core import AREA_RESULT_KEYS, INPUT_VALIDATION_RULES, RESULT_ROUNDING, pass_coverage, pass_time
+from .units import feet_to_meters, mph_to_kmh, hectares_to_acres
+
+MODEL_INPUTS = [name for name, _, _ in INPUT_VALIDATION_RULES[:6]] + ['is_metric'] + [name for name, _, _ in INPUT_VALIDATION_RULES[6:]]
+
+# Derived quantities as (name, dependencies, formula of the dependency values), in
+# dependency order. The formulas are calculate_coverage's, step for step, so results
+# match it exactly; lengths in meters, speeds in km/h, areas in hectares.
+MODEL_NODES = [
+    ('metric_machine_width', ('machine_width', 'is_metric'), lambda width, is_metric: width if is_metric else feet_to_meters(width)),
+    ('metric_machine_speed', ('machine_speed', 'is_metric'), lambda speed, is_metric: speed if is_metric else mph_to_kmh(speed)),
+    ('metric_field_length', ('field_length', 'is_metric'), lambda length, is_metric: length if is_metric else feet_to_meters(length)),
+    ('transportation_time_per_day', ('transportation_trips_per_day', 'transportation_time_per_trip'), lambda trips, minutes: trips * minutes / 60),
+    ('effective_hours_per_day', ('operational_hours_per_day', 'transportation_time_per_day'), lambda hours, transport: max(0, hours - transport)),
+    ('coverage_per_pass', ('metric_machine_width', 'metric_field_length'), pass_coverage),
+    ('time_per_pass', ('metric_field_length', 'metric_machine_speed'), pass_time),
+    ('total_turnarounds_per_hour', ('time_per_pass', 'turn_around_time'), lambda minutes, turn: 60 / (minutes + turn)),
+    ('time_spent_turning_around_per_hour', ('total_turnarounds_per_hour', 'turn_around_time'), lambda turnarounds, turn: turnarounds * turn),
+    ('coverage_per_hour', ('total_turnarounds_per_hour', 'coverage_per_pass'), lambda turnarounds, area: turnarounds * area),
+    ('coverage_per_day', ('coverage_per_hour', 'effective_hours_per_day'), lambda area, hours: area * hours),
+    ('total_turnarounds_per_day', ('total_turnarounds_per_hour', 'effective_hours_per_day'), lambda turnarounds, hours: turnarounds * hours),
+    ('time_spent_turning_around_per_day', ('time_spent_turning_around_per_hour', 'effective_hours_per_day'), lambda minutes, hours: minutes * hours / 60),
+    ('coverage_per_week', ('coverage_per_day', 'operational_days_per_week'), lambda area, days: area * days),
+    ('total_turnarounds_per_week', ('total_turnarounds_per_day', 'operational_days_per_week'), lambda turnarounds, days: turnarounds * days),
+    ('time_spent_turning_around_per_week', ('time_spent_turning_around_per_day', 'operational_days_per_week'), lambda hours, days: hours * days),
+    ('total_hours_per_day', ('operational_hours_per_day',), lambda hours: hours),
+    ('total_hours_per_week', ('operational_hours_per_day', 'operational_days_per_week'), lambda hours, days: hours * days),
+    ('effective_hours_per_week', ('effective_hours_per_day', 'operational_days_per_week'), lambda hours, days: hours * days),
+    ('transportation_time_per_week', ('transportation_time_per_day', 'operational_days_per_week'), lambda hours, days: hours * days),
+    ('coverage_lost_per_day', ('coverage_per_hour', 'transportation_time_per_day'), lambda area, hours: area * hours),
+    ('coverage_lost_per_week', ('coverage_lost_per_day', 'operational_days_per_week'), lambda area, days: area * days),
+]
+
+MODEL_NODE_NAMES = [name for name, _, _ in MODEL_NODES]
+
+# Flat tables of the graph: inputs take the first indices, then the nodes in order
+NODE_INDEX = {name: index for index, name in enumerate(MODEL_INPUTS + MODEL_NODE_NAMES)}
+NODE_DEPENDENCIES = [()] * len(MODEL_INPUTS) + [tuple(NODE_INDEX[dependency] for dependency in dependencies) for _, dependencies, _ in MODEL_NODES]
+NODE_FORMULAS = [None] * len(MODEL_INPUTS) + [formula for _, _, formula in MODEL_NODES]
+
+INPUT_RULES = {name: (comparison, message) for name, comparison, message in INPUT_VALIDATION_RULES}
+
+def downstream_nodes(name):
+    # Indices of every node that depends on name, directly or through other nodes
+    reached = {NODE_INDEX[name]}
+    for node in range(len(MODEL_INPUTS), len(NODE_INDEX)):
+        if reached.intersection(NODE_DEPENDENCIES[node]):
+            reached.add(node)
+    return sorted(reached - {NODE_INDEX[name]})
+
+DOWNSTREAM = {name: downstream_nodes(name) for name in MODEL_INPUTS}
+
+RESULT_NODES = [(key, NODE_INDEX[key], ndigits, key in AREA_RESULT_KEYS) for key, ndigits in RESULT_ROUNDING.items()]
+
+class CoverageModel:
+    # calculate_coverage as a graph of its derived quantities. Setting an input marks only
+    # the nodes downstream of it dirty, and dirty nodes are recomputed lazily when a
+    # result needs them. recomputed lists the nodes the last results() call evaluated.
+    # Values and dirty flags live in flat lists indexed by node, so a model is a few
+    # slots regardless of how many quantities it tracks.
+    __slots__ = ('_values', '_dirty', '_results', '_unrounded', 'recomputed', 'evaluations')
+
+    def __init__(self, machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day=0, transportation_time_per_trip=0):
+        self._values = [None] * len(NODE_INDEX)
+        self._dirty = [True] * len(NODE_INDEX)
+        self._results = {key: None for key in RESULT_ROUNDING}
+        self._unrounded = set()  # nodes evaluated since their result was last rounded
+        self.recomputed = []
+        self.evaluations = 0
+        self.update(
+            machine_width=machine_width,
+            machine_speed=machine_speed,
+            field_length=field_length,
+            turn_around_time=turn_around_time,
+            operational_hours_per_day=operational_hours_per_day,
+            operational_days_per_week=operational_days_per_week,
+            is_metric=is_metric,
+            transportation_trips_per_day=transportation_trips_per_day,
+            transportation_time_per_trip=transportation_time_per_trip,
+        )
+
+    def update(self, **inputs):
+        # Set any inputs at once; all are checked before any is applied, so a
+        # ValueError leaves the model as it was. Unchanged values invalidate nothing.
+        for name in inputs:
+            if name not in DOWNSTREAM:
+                raise TypeError(f"Unknown input: {name}")
+        for name, value in inputs.items():
+            if name in INPUT_RULES:
+                comparison, message = INPUT_RULES[name]
+                if value <= 0 if comparison == 'gt' else value < 0:
+                    raise ValueError(message)
+        values, dirty = self._values, self._dirty
+        for name, value in inputs.items():
+            index = NODE_INDEX[name]
+            # 5 and 5.0 compare equal but give int and float results, so the type counts too
+            if values[index] == value and type(values[index]) is type(value) and not dirty[index]:
+                continue
+            values[index] = value
+            dirty[index] = False
+            for node in DOWNSTREAM[name]:
+                dirty[node] = True
+
+    def inputs(self):
+        return {name: self._values[NODE_INDEX[name]] for name in MODEL_INPUTS}
+
+    def get(self, name):
+        # Unrounded value of an input or derived quantity, recomputing it and any dirty
+        # dependencies first
+        index = NODE_INDEX[name]
+        if self._dirty[index]:
+            self._evaluate(index)
+        return self._values[index]
+
+    def _evaluate(self, index):
+        values, dirty = self._values, self._dirty
+        for dependency in NODE_DEPENDENCIES[index]:
+            if dirty[dependency]:
+                self._evaluate(dependency)
+        values[index] = NODE_FORMULAS[index](*[values[dependency] for dependency in NODE_DEPENDENCIES[index]])
+        dirty[index] = False
+        self._unrounded.add(index)
+        self.evaluations += 1
+        self.recomputed.append(MODEL_NODE_NAMES[index - len(MODEL_INPUTS)])
+
+    def results(self):
+        # The same dict as calculate_coverage for the current inputs. Outputs are only
+        # rounded again when their node was evaluated since the last rounding, whether
+        # here or through get().
+        self.recomputed = []
+        values, dirty, results, unrounded = self._values, self._dirty, self._results, self._unrounded
+        is_metric = values[NODE_INDEX['is_metric']]
+        for key, index, ndigits, is_area in RESULT_NODES:
+            if dirty[index]:
+                self._evaluate(index)
+            if index in unrounded:
+                value = values[index]
+                results[key] = round(hectares_to_acres(value) if is_area and not is_metric else value, ndigits)
+        unrounded.clear()
+        return dict(results)
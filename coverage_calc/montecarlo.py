@@ -0,0 +1,221 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import BATCH_INPUT_COLUMNS, calculate_coverage_batch
+
+DEFAULT_CHUNK_SIZE = 1000000
+
+MONTE_CARLO_OUTPUTS = ['coverage_per_week', 'effective_hours_per_week']
+
+REPORTED_QUANTILES = {'p10': 0.1, 'p50': 0.5, 'p90': 0.9}
+
+class Normal:
+    # Normal distribution, optionally clipped at minimum so draws stay physically valid
+    def __init__(self, mean, std, minimum=None):
+        if std < 0:
+            raise ValueError("Standard deviation cannot be negative")
+        self.mean = mean
+        self.std = std
+        self.minimum = minimum
+
+    def sample(self, rng, size):
+        values = rng.normal(self.mean, self.std, size)
+        return values if self.minimum is None else np.maximum(values, self.minimum)
+
+class Triangular:
+    def __init__(self, low, mode, high):
+        if not low <= mode <= high or low == high:
+            raise ValueError("Triangular distribution needs low <= mode <= high with low < high")
+        self.low = low
+        self.mode = mode
+        self.high = high
+
+    def sample(self, rng, size):
+        return rng.triangular(self.low, self.mode, self.high, size)
+
+class Uniform:
+    def __init__(self, low, high):
+        if not low < high:
+            raise ValueError("Uniform distribution needs low < high")
+        self.low = low
+        self.high = high
+
+    def sample(self, rng, size):
+        return rng.uniform(self.low, self.high, size)
+
+class Empirical:
+    # Resamples observed values, e.g. turn durations measured in the field
+    def __init__(self, samples):
+        self.samples = np.asarray(samples, dtype=float).ravel()
+        if self.samples.size == 0:
+            raise ValueError("Empirical distribution needs at least one sample")
+
+    def sample(self, rng, size):
+        return rng.choice(self.samples, size)
+
+class QuantileSketch:
+    # Log-bucketed quantile sketch (DDSketch): every value lands in a bucket whose bounds
+    # are within relative_accuracy of each other, so any quantile is reported within that
+    # relative error in memory that depends only on the value range, never on the count.
+    # Sketches from separate chunks merge exactly by adding their bucket counts.
+    def __init__(self, relative_accuracy=0.005):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("Relative accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.offset = 0
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float('inf')
+        self.maximum = float('-inf')
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if np.any(values < 0):
+            raise ValueError("Quantile sketch only accepts non-negative values")
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.total += float(values.sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        positive = values[values > 0]
+        self.zero_count += values.size - positive.size
+        if positive.size:
+            indices = np.ceil(np.log(positive) / self.log_gamma).astype(np.int64)
+            low, high = int(indices.min()), int(indices.max())
+            self._cover(low, high)
+            self.counts += np.bincount(indices - self.offset, minlength=self.counts.size)
+
+    def _cover(self, low, high):
+        if self.counts.size == 0:
+            self.offset = low
+            self.counts = np.zeros(high - low + 1, dtype=np.int64)
+            return
+        new_low = min(low, self.offset)
+        new_high = max(high, self.offset + self.counts.size - 1)
+        if new_low == self.offset and new_high == self.offset + self.counts.size - 1:
+            return
+        counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+        counts[self.offset - new_low:self.offset - new_low + self.counts.size] = self.counts
+        self.counts = counts
+        self.offset = new_low
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        if other.counts.size:
+            self._cover(other.offset, other.offset + other.counts.size - 1)
+            start = other.offset - self.offset
+            self.counts[start:start + other.counts.size] += other.counts
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    def bucket_values(self):
+        # Representative value of every bucket, within relative_accuracy of anything in it
+        return 2 * self.gamma ** (np.arange(self.counts.size) + self.offset) / (self.gamma + 1)
+
+    def quantile(self, q):
+        if self.count == 0:
+            return float('nan')
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        position = np.searchsorted(np.cumsum(self.counts), rank - self.zero_count, side='right')
+        value = float(self.bucket_values()[min(position, self.counts.size - 1)])
+        # The exact extremes are known, so never report a value outside them
+        return min(max(value, self.minimum), self.maximum)
+
+    def mean(self):
+        return self.total / self.count if self.count else float('nan')
+
+    def histogram(self, bins=40):
+        values = np.concatenate([[0.0], self.bucket_values()])
+        weights = np.concatenate([[self.zero_count], self.counts])
+        values = np.clip(values, self.minimum, self.maximum)
+        low = 0.0 if self.zero_count else self.minimum
+        return np.histogram(values, bins=bins, range=(low, max(self.maximum, low + 1e-9)), weights=weights)
+
+def monte_carlo_inputs(inputs):
+    unknown = set(inputs) - set(BATCH_INPUT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown Monte Carlo inputs: {', '.join(sorted(unknown))}")
+    missing = [name for name in BATCH_INPUT_COLUMNS if name not in inputs and not name.startswith('transportation_')]
+    if missing:
+        raise ValueError(f"Missing Monte Carlo inputs: {', '.join(missing)}")
+    if hasattr(inputs['is_metric'], 'sample'):
+        raise ValueError("is_metric must be fixed, not a distribution")
+    return inputs
+
+def simulate_chunk(inputs, size, seed_sequence, relative_accuracy):
+    # Draw and evaluate one chunk; the result depends only on its seed, not on which
+    # worker ran it, so a run is reproducible for any number of workers
+    rng = np.random.default_rng(seed_sequence)
+    columns = {name: value.sample(rng, size) if hasattr(value, 'sample') else value for name, value in inputs.items()}
+    results = calculate_coverage_batch(**columns, round_results=False)
+    sketches = {}
+    for output in MONTE_CARLO_OUTPUTS:
+        sketch = QuantileSketch(relative_accuracy)
+        sketch.add(results[output][results['valid']])
+        sketches[output] = sketch
+    return sketches, int(size - results['valid'].sum())
+
+def chunk_sizes(samples, chunk_size):
+    return [min(chunk_size, samples - start) for start in range(0, samples, chunk_size)]
+
+def monte_carlo_summary(sketches, samples, invalid):
+    summary = {'samples': samples, 'invalid': invalid}
+    for output, sketch in sketches.items():
+        summary[output] = {name: sketch.quantile(q) for name, q in REPORTED_QUANTILES.items()}
+        summary[output]['mean'] = sketch.mean()
+    summary['sketches'] = sketches
+    return summary
+
+def iter_monte_carlo(inputs, samples, chunk_size=DEFAULT_CHUNK_SIZE, seed=0, relative_accuracy=0.005):
+    # In-process run that yields the running summary after every chunk, for live displays
+    inputs = monte_carlo_inputs(inputs)
+    sizes = chunk_sizes(samples, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    merged = {output: QuantileSketch(relative_accuracy) for output in MONTE_CARLO_OUTPUTS}
+    done = invalid = 0
+    for size, seed_sequence in zip(sizes, seeds):
+        sketches, chunk_invalid = simulate_chunk(inputs, size, seed_sequence, relative_accuracy)
+        for output, sketch in sketches.items():
+            merged[output].merge(sketch)
+        done += size
+        invalid += chunk_invalid
+        yield monte_carlo_summary(merged, done, invalid)
+
+def run_monte_carlo(inputs, samples, chunk_size=DEFAULT_CHUNK_SIZE, seed=0, workers=1, relative_accuracy=0.005):
+    # P10/P50/P90 and mean of the weekly outputs over samples draws. inputs maps every
+    # calculate_coverage argument to a fixed value or a distribution. Memory is bounded by
+    # chunk_size and the sketch size, so 10**8 samples need no more memory than 10**6.
+    if samples <= 0:
+        raise ValueError("Samples must be greater than 0")
+    if workers == 1:
+        summary = None
+        for summary in iter_monte_carlo(inputs, samples, chunk_size, seed, relative_accuracy):
+            pass
+        return summary
+
+    inputs = monte_carlo_inputs(inputs)
+    sizes = chunk_sizes(samples, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    merged = {output: QuantileSketch(relative_accuracy) for output in MONTE_CARLO_OUTPUTS}
+    invalid = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for sketches, chunk_invalid in executor.map(simulate_chunk, [inputs] * len(sizes), sizes, seeds, [relative_accuracy] * len(sizes)):
+            for output, sketch in sketches.items():
+                merged[output].merge(sketch)
+            invalid += chunk_invalid
+    return monte_carlo_summary(merged, samples, invalid)
@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from .batch import BATCH_INPUT_COLUMNS, RESULT_ROUNDING, calculate_coverage_batch
+from .store import PersistentCoverageCache
+
+DEFAULT_PORT = 8765
+
+# Requests arriving within this many seconds of the first queued one share one evaluation
+DEFAULT_MAX_DELAY = 0.002
+
+DEFAULT_MAX_BATCH = 4096
+
+# Requests waiting beyond this are refused with 503 instead of queueing without bound
+DEFAULT_MAX_QUEUE = 10000
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADER_LINES = 100
+
+# Recent latencies kept for the /metrics percentiles
+LATENCY_WINDOW = 10000
+
+REQUIRED_INPUTS = [name for name in BATCH_INPUT_COLUMNS if not name.startswith('transportation_')]
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+class ServiceOverloaded(Exception):
+    pass
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def parse_coverage_request(payload):
+    # One request body as a row of BATCH_INPUT_COLUMNS values, with the same
+    # argument names and defaults as calculate_coverage
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Request body must be a JSON object of calculate_coverage inputs")
+    unknown = set(payload) - set(BATCH_INPUT_COLUMNS)
+    if unknown:
+        raise HTTPError(400, f"Unknown inputs: {', '.join(sorted(unknown))}")
+    missing = [name for name in REQUIRED_INPUTS if name not in payload]
+    if missing:
+        raise HTTPError(400, f"Missing inputs: {', '.join(missing)}")
+    row = []
+    for name in BATCH_INPUT_COLUMNS:
+        value = payload.get(name, 0)
+        if name == 'is_metric':
+            if not isinstance(value, (bool, int)):
+                raise HTTPError(400, "is_metric must be true or false")
+            row.append(float(bool(value)))
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise HTTPError(400, f"{name} must be a finite number")
+        row.append(float(value))
+    return tuple(row)
+
+def evaluate_rows(rows, store=None):
+    # Evaluate queued rows in one vectorized call, through store when one is given.
+    # Returns a result dict, keyed like calculate_coverage's, or the ValueError message
+    # for each row.
+    values = np.array(rows, dtype=float)
+    columns = {name: values[:, index] for index, name in enumerate(BATCH_INPUT_COLUMNS)}
+    columns['is_metric'] = columns['is_metric'] > 0
+    results = (store.calculate_batch if store is not None else calculate_coverage_batch)(**columns)
+    keys = list(RESULT_ROUNDING)
+    outputs = [dict(zip(keys, row)) for row in zip(*(results[key].tolist() for key in keys))]
+    return [output if valid else error for output, valid, error in zip(outputs, results['valid'].tolist(), results['error'])]
+
+def latency_summary(latencies):
+    # Percentiles in milliseconds of the recent latency window
+    ordered = sorted(latencies)
+    summary = {'window': len(ordered)}
+    for name, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+        summary[name] = 1000 * ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+    summary['max'] = 1000 * ordered[-1] if ordered else None
+    return summary
+
+class CoverageService:
+    # HTTP/JSON front end to the batch engine. Each POST /coverage is queued; a single
+    # batching task takes whatever has arrived within max_delay of the first request
+    # (up to max_batch) and evaluates it as one calculate_coverage_batch call. The queue
+    # is bounded: when it is full new requests get 503 with Retry-After, so clients back
+    # off instead of the service buffering without limit.
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, max_delay=DEFAULT_MAX_DELAY, max_batch=DEFAULT_MAX_BATCH, max_queue=DEFAULT_MAX_QUEUE, store=None):
+        if max_batch < 1 or max_queue < 1:
+            raise ValueError("max_batch and max_queue must be at least 1")
+        self.host = host
+        self.port = port
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.store = store
+        self.queue = None
+        self.server = None
+        self.batcher = None
+        self.started = None
+        self.counts = {'requests': 0, 'rejected': 0, 'errors': 0, 'batches': 0, 'rows': 0, 'max_batch_rows': 0}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self):
+        self.queue = asyncio.Queue(self.max_queue)
+        self.batcher = asyncio.create_task(self.run_batches())
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started = time.monotonic()
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        try:
+            await self.batcher
+        except asyncio.CancelledError:
+            pass
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def calculate(self, row):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((row, future))
+        except asyncio.QueueFull:
+            raise ServiceOverloaded() from None
+        return await future
+
+    async def run_batches(self):
+        queue = self.queue
+        while True:
+            batch = [await queue.get()]
+            if self.max_delay > 0 and queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            # Clients that disconnected while queued have cancelled futures; skip them
+            batch = [(row, future) for row, future in batch if not future.done()]
+            if not batch:
+                continue
+            rows = [row for row, _ in batch]
+            try:
+                if self.store is None:
+                    outputs = evaluate_rows(rows)
+                else:
+                    # The store may wait on other processes' locks; keep that off the event loop
+                    outputs = await asyncio.get_running_loop().run_in_executor(None, evaluate_rows, rows, self.store)
+            except Exception as error:
+                # Every request in the batch gets a 500 rather than a dropped connection
+                failure = HTTPError(500, f"Evaluation failed: {type(error).__name__}: {error}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(failure)
+                continue
+            self.counts['batches'] += 1
+            self.counts['rows'] += len(batch)
+            self.counts['max_batch_rows'] = max(self.counts['max_batch_rows'], len(batch))
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+    async def metrics(self):
+        batches = self.counts['batches']
+        metrics = {
+            **self.counts,
+            'mean_batch_rows': self.counts['rows'] / batches if batches else None,
+            'queue_depth': self.queue.qsize(),
+            'latency_ms': latency_summary(self.latencies),
+            'uptime_seconds': time.monotonic() - self.started,
+        }
+        if self.store is not None:
+            # stats() waits for the store's lock, which a batch can hold through SQLite's
+            # busy timeout, so it runs off the event loop like the batches do
+            metrics['store'] = await asyncio.get_running_loop().run_in_executor(None, self.store.stats)
+        return metrics
+
+    async def respond(self, method, path, body):
+        if path == '/health':
+            if method != 'GET':
+                raise HTTPError(405, "Use GET")
+            overloaded = self.queue.full()
+            return (503 if overloaded else 200), {'status': 'overloaded' if overloaded else 'ok', 'queue_depth': self.queue.qsize(), 'max_queue': self.max_queue}
+        if path == '/metrics':
+            if method != 'GET':
+                raise HTTPError(405, "Use GET")
+            return 200, await self.metrics()
+        if path != '/coverage':
+            raise HTTPError(404, f"No such endpoint: {path}")
+        if method != 'POST':
+            raise HTTPError(405, "Use POST")
+
+        started = time.perf_counter()
+        self.counts['requests'] += 1
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON") from None
+        try:
+            output = await self.calculate(parse_coverage_request(payload))
+        except ServiceOverloaded:
+            self.counts['rejected'] += 1
+            raise HTTPError(503, "Service overloaded; retry later") from None
+        if isinstance(output, str):
+            raise HTTPError(400, output)
+        self.latencies.append(time.perf_counter() - started)
+        return 200, output
+
+    async def handle_connection(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive; each connection's requests are answered in order
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.write_response(writer, 400, {'error': "Malformed request line"}, close=True)
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    await self.write_response(writer, 400, {'error': "Malformed Content-Length"}, close=True)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.write_response(writer, 413, {'error': f"Request body larger than {MAX_BODY_BYTES} bytes"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                extra_headers = {}
+                try:
+                    status, response = await self.respond(method, path.split('?', 1)[0], body)
+                except HTTPError as error:
+                    status, response = error.status, {'error': str(error)}
+                    if error.status == 503:
+                        extra_headers['Retry-After'] = '1'
+                    else:
+                        self.counts['errors'] += 1
+                await self.write_response(writer, status, response, extra_headers, close=not keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def write_response(self, writer, status, payload, extra_headers=None, close=False):
+        body = json.dumps(payload).encode()
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body)), **(extra_headers or {})}
+        if close:
+            headers['Connection'] = 'close'
+        head = f"HTTP/1.1 {status} {REASONS[status]}\r\n" + ''.join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve calculate_coverage over HTTP/JSON, batching concurrent requests.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-delay-ms', type=float, default=DEFAULT_MAX_DELAY * 1000, help='How long the first queued request waits for others to join its batch')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE, help='Queued requests beyond this get 503')
+    parser.add_argument('--store', metavar='PATH', help='Answer repeated scenarios from a persistent SQLite result store shared with other processes')
+    args = parser.parse_args(argv)
+
+    store = PersistentCoverageCache(args.store) if args.store else None
+    service = CoverageService(args.host, args.port, args.max_delay_ms / 1000, args.max_batch, args.max_queue, store)
+    print(f"Serving on http://{args.host}:{args.port}", file=sys.stderr, flush=True)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
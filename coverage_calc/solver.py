@@ -0,0 +1,223 @@
+import numpy as np
+
+from .batch import AREA_RESULT_KEYS, derive_coverage_metric
+from .units import feet_to_meters, meters_to_feet, mph_to_kmh, kmh_to_mph, acres_to_hectares, hectares_to_acres
+
+# Metric search bounds for every input the solver can solve for
+SOLVABLE_INPUTS = {
+    'machine_width': (1e-6, 1000.0),
+    'machine_speed': (1e-6, 200.0),
+    'field_length': (1e-6, 100000.0),
+    'turn_around_time': (0.0, 600.0),
+    'operational_hours_per_day': (1e-6, 24.0),
+    'operational_days_per_week': (1e-6, 7.0),
+    'transportation_trips_per_day': (0.0, 100.0),
+    'transportation_time_per_trip': (0.0, 1440.0),
+}
+
+# Counts that only make sense as whole numbers; solutions are rounded to one that reaches the target
+INTEGER_INPUTS = {'operational_days_per_week', 'transportation_trips_per_day'}
+
+RATE_INPUTS = {'machine_width', 'machine_speed', 'field_length', 'turn_around_time'}
+TURN_RATE_INPUTS = {'machine_speed', 'field_length', 'turn_around_time'}
+EFFECTIVE_HOURS_INPUTS = {'operational_hours_per_day', 'transportation_trips_per_day', 'transportation_time_per_trip'}
+TRANSPORT_INPUTS = {'transportation_trips_per_day', 'transportation_time_per_trip'}
+WEEK_INPUTS = {'operational_days_per_week'}
+
+# Which inputs each solvable output depends on; used to order two-unknown solves
+OUTPUT_INPUTS = {
+    'coverage_per_hour': RATE_INPUTS,
+    'coverage_per_day': RATE_INPUTS | EFFECTIVE_HOURS_INPUTS,
+    'coverage_per_week': RATE_INPUTS | EFFECTIVE_HOURS_INPUTS | WEEK_INPUTS,
+    'total_turnarounds_per_hour': TURN_RATE_INPUTS,
+    'total_turnarounds_per_day': TURN_RATE_INPUTS | EFFECTIVE_HOURS_INPUTS,
+    'total_turnarounds_per_week': TURN_RATE_INPUTS | EFFECTIVE_HOURS_INPUTS | WEEK_INPUTS,
+    'effective_hours_per_day': EFFECTIVE_HOURS_INPUTS,
+    'effective_hours_per_week': EFFECTIVE_HOURS_INPUTS | WEEK_INPUTS,
+    'transportation_time_per_day': TRANSPORT_INPUTS,
+    'transportation_time_per_week': TRANSPORT_INPUTS | WEEK_INPUTS,
+    'coverage_lost_per_day': RATE_INPUTS | TRANSPORT_INPUTS,
+    'coverage_lost_per_week': RATE_INPUTS | TRANSPORT_INPUTS | WEEK_INPUTS,
+}
+
+COVERAGE_OUTPUTS = {'coverage_per_hour': 'hour', 'coverage_per_day': 'day', 'coverage_per_week': 'week'}
+
+BISECTION_STEPS = 80
+
+def evaluate_output(output, inputs):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.asarray(derive_coverage_metric(
+            inputs['machine_width'],
+            inputs['machine_speed'],
+            inputs['field_length'],
+            inputs['turn_around_time'],
+            inputs['operational_hours_per_day'],
+            inputs['operational_days_per_week'],
+            inputs['transportation_trips_per_day'],
+            inputs['transportation_time_per_trip'],
+        )[output], dtype=float)
+
+def coverage_closed_form(output, unknown, target, inputs):
+    # Invert coverage_per_{hour,day,week} = 60 / (L / v + t) * w * L / 10000 * E * D.
+    # Returns None when the pair has no closed form.
+    period = COVERAGE_OUTPUTS.get(output)
+    if period is None:
+        return None
+    width, length, turn = inputs['machine_width'], inputs['field_length'], inputs['turn_around_time']
+    velocity = inputs['machine_speed'] * 1000 / 60  # m/min
+    transport = inputs['transportation_trips_per_day'] * inputs['transportation_time_per_trip'] / 60
+    effective = np.maximum(0, inputs['operational_hours_per_day'] - transport)
+    multiplier = {'hour': 1.0, 'day': effective, 'week': effective * inputs['operational_days_per_week']}[period]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if unknown in RATE_INPUTS:
+            rate = target / multiplier  # hectares per hour
+            if unknown == 'machine_width':
+                return rate * 10000 * (length / velocity + turn) / (60 * length)
+            if unknown == 'machine_speed':
+                time_per_pass = 60 * width * length / (10000 * rate) - turn
+                return np.where(time_per_pass > 0, length / time_per_pass * 60 / 1000, np.nan)
+            if unknown == 'field_length':
+                per_minute = rate * 10000 / (60 * width)
+                return np.where((per_minute < velocity) & (turn > 0), per_minute * turn / (1 - per_minute / velocity), np.nan)
+            return 60 * width * length / (10000 * rate) - length / velocity
+
+        if period == 'hour':
+            return None
+        rate = 60 / (length / velocity + turn) * width * length / 10000
+        if unknown == 'operational_days_per_week':
+            return target / (rate * effective) if period == 'week' else None
+        required = target / rate / (inputs['operational_days_per_week'] if period == 'week' else 1)
+        if unknown == 'operational_hours_per_day':
+            return required + transport
+        spare = (inputs['operational_hours_per_day'] - required) * 60  # transport minutes per day
+        if unknown == 'transportation_trips_per_day':
+            return spare / inputs['transportation_time_per_trip']
+        return spare / inputs['transportation_trips_per_day']
+
+def bisect_input(output, unknown, target, inputs, low, high):
+    # Vectorized bisection; every output is monotonic in each input, so one bracket suffices
+    low = np.broadcast_to(np.asarray(low, dtype=float), target.shape).copy()
+    high = np.broadcast_to(np.asarray(high, dtype=float), target.shape).copy()
+    increasing = evaluate_output(output, {**inputs, unknown: high}) >= evaluate_output(output, {**inputs, unknown: low})
+    for _ in range(BISECTION_STEPS):
+        middle = (low + high) / 2
+        below = evaluate_output(output, {**inputs, unknown: middle}) < target
+        raise_low = below == increasing
+        low = np.where(raise_low, middle, low)
+        high = np.where(raise_low, high, middle)
+    return (low + high) / 2
+
+def round_to_count(output, unknown, target, inputs, values, low, high):
+    # Whole-number neighbours of a continuous solution, clipped to the input's bounds. The
+    # one whose output reaches the target (meets or exceeds it) is kept, the closer one if
+    # both do; rows where neither does are infeasible.
+    candidates = [np.clip(np.floor(values), np.ceil(low), np.floor(high)), np.clip(np.ceil(values), np.ceil(low), np.floor(high))]
+    with np.errstate(invalid='ignore'):
+        achieved = [evaluate_output(output, {**inputs, unknown: candidate}) for candidate in candidates]
+        reaches = [value >= target * (1 - 1e-9) - 1e-9 for value in achieved]
+        floor_better = reaches[0] & (~reaches[1] | (np.abs(achieved[0] - target) <= np.abs(achieved[1] - target)))
+    rounded = np.where(floor_better, candidates[0], candidates[1])
+    return np.where(reaches[0] | reaches[1], rounded, np.nan)
+
+def solve_one(output, unknown, target, inputs):
+    low, high = SOLVABLE_INPUTS[unknown]
+    at_low = evaluate_output(output, {**inputs, unknown: np.full(target.shape, max(low, 1e-9))})
+    at_high = evaluate_output(output, {**inputs, unknown: np.full(target.shape, high)})
+    range_low, range_high = np.minimum(at_low, at_high), np.maximum(at_low, at_high)
+
+    values = coverage_closed_form(output, unknown, target, inputs)
+    if values is None:
+        values = bisect_input(output, unknown, target, inputs, low, high)
+    values = np.broadcast_to(np.asarray(values, dtype=float), target.shape).copy()
+
+    # Accept a solution only if it is inside the input's bounds and reproduces the target
+    with np.errstate(invalid='ignore'):
+        achieved = evaluate_output(output, {**inputs, unknown: values})
+        feasible = np.isfinite(values) & (values >= low) & (values <= high)
+        feasible &= np.isclose(achieved, target, rtol=1e-6, atol=1e-9)
+    values[~feasible] = np.nan
+    if unknown in INTEGER_INPUTS:
+        values = round_to_count(output, unknown, target, inputs, values, low, high)
+        feasible &= np.isfinite(values)
+    return values, feasible, (range_low, range_high)
+
+def solve_inputs(targets, unknowns, fixed):
+    # Solve for one or two calculate_coverage inputs so that the outputs hit their targets.
+    # targets maps output names to target values, unknowns names the inputs to solve for
+    # (one per target) and fixed holds every other input, all in fixed['is_metric'] units.
+    # Targets and fixed inputs may be arrays; every row is solved independently.
+    unknowns = [unknowns] if isinstance(unknowns, str) else list(unknowns)
+    if len(unknowns) not in (1, 2) or len(targets) != len(unknowns):
+        raise ValueError("Solve for one or two inputs, with one target output per input")
+    for unknown in unknowns:
+        if unknown not in SOLVABLE_INPUTS:
+            raise ValueError(f"Cannot solve for {unknown}; choose from {', '.join(SOLVABLE_INPUTS)}")
+        if unknown in fixed:
+            raise ValueError(f"{unknown} is both fixed and unknown")
+    for output in targets:
+        if output not in OUTPUT_INPUTS:
+            raise ValueError(f"Cannot target {output}; choose from {', '.join(OUTPUT_INPUTS)}")
+
+    is_metric = np.asarray(fixed.get('is_metric', True), dtype=bool)
+    imperial = ~is_metric
+    arrays = [np.asarray(value, dtype=float) for value in list(targets.values()) + [value for name, value in fixed.items() if name != 'is_metric']]
+    shape = np.broadcast_shapes(is_metric.shape, *[array.shape for array in arrays])
+
+    inputs = {}
+    for name in SOLVABLE_INPUTS:
+        if name in unknowns:
+            continue
+        if name not in fixed and not name.startswith('transportation_'):
+            raise ValueError(f"Missing fixed input: {name}")
+        value = np.broadcast_to(np.asarray(fixed.get(name, 0), dtype=float), shape)
+        if name in ('machine_width', 'field_length'):
+            value = np.where(imperial, feet_to_meters(value), value)
+        elif name == 'machine_speed':
+            value = np.where(imperial, mph_to_kmh(value), value)
+        inputs[name] = value
+    metric_targets = {}
+    for output, value in targets.items():
+        value = np.broadcast_to(np.asarray(value, dtype=float), shape)
+        metric_targets[output] = np.where(imperial, acres_to_hectares(value), value) if output in AREA_RESULT_KEYS else value
+
+    order = solve_order(list(targets), unknowns)
+    feasible = np.ones(shape, dtype=bool)
+    solution = {'feasible_range': {}}
+    for output, unknown in order:
+        # Inputs solved later do not affect this output; give them any valid placeholder
+        placeholders = {name: np.full(shape, SOLVABLE_INPUTS[name][1]) for name in unknowns if name not in inputs}
+        values, row_feasible, (range_low, range_high) = solve_one(output, unknown, metric_targets[output], {**inputs, **placeholders})
+        inputs[unknown] = np.where(row_feasible, values, SOLVABLE_INPUTS[unknown][1])
+        feasible &= row_feasible
+        if output in AREA_RESULT_KEYS:
+            range_low = np.where(imperial, hectares_to_acres(range_low), range_low)
+            range_high = np.where(imperial, hectares_to_acres(range_high), range_high)
+        solution['feasible_range'][output] = (range_low, range_high)
+        if unknown in ('machine_width', 'field_length'):
+            values = np.where(imperial, meters_to_feet(values), values)
+        elif unknown == 'machine_speed':
+            values = np.where(imperial, kmh_to_mph(values), values)
+        solution[unknown] = values
+    for unknown in unknowns:
+        solution[unknown] = np.where(feasible, solution[unknown], np.nan)
+    solution['feasible'] = feasible
+    return solution
+
+def solve_order(outputs, unknowns):
+    # Pair each target with the unknown it determines. With two unknowns, one target must
+    # depend on only one of them so the pair can be solved one after the other.
+    dependencies = {output: OUTPUT_INPUTS[output] & set(unknowns) for output in outputs}
+    for output in outputs:
+        if not dependencies[output]:
+            raise ValueError(f"{output} does not depend on {' or '.join(unknowns)}")
+    if len(unknowns) == 1:
+        return [(outputs[0], unknowns[0])]
+    for first in outputs:
+        if len(dependencies[first]) == 1:
+            (first_unknown,) = dependencies[first]
+            second = outputs[1] if first == outputs[0] else outputs[0]
+            second_unknown = unknowns[1] if first_unknown == unknowns[0] else unknowns[0]
+            if second_unknown in dependencies[second]:
+                return [(first, first_unknown), (second, second_unknown)]
+    raise ValueError(f"{' and '.join(outputs)} do not determine {' and '.join(unknowns)} separately; fix one more input")
@@ -0,0 +1,334 @@
+import hashlib
+import inspect
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import deque
+from urllib.request import pathname2url
+
+import numpy as np
+
+from . import batch, core, memo, model, units
+from .batch import AREA_RESULT_KEYS, BATCH_INPUT_COLUMNS, RESULT_ROUNDING, batch_input_columns, calculate_coverage_batch, round_half_even_like_python, validate_batch_inputs
+from .memo import INPUT_PRECISION, normalize_coverage_inputs
+from .model import CoverageModel
+from .units import feet_to_meters, mph_to_kmh, hectares_to_acres
+
+DEFAULT_STORE_PATH = os.environ.get('COVERAGE_STORE_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'coverage_calc', 'results.sqlite'))
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+# Bump when a formula changes in a way the source hash below would not catch
+FORMULA_VERSION = 1
+
+# When over max_entries, evict the least recently used rows down to this fraction of it
+EVICTION_TARGET = 0.9
+
+# A hit only rewrites its last_used time when the stored one is older than this, so
+# reads mostly stay reads
+TOUCH_INTERVAL = 60.0
+
+# Rows looked up per SELECT, below SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+# Recent get/put latencies kept for stats()
+LATENCY_WINDOW = 10000
+
+# Stored keys are the normalized inputs without is_metric: results are kept in metric
+# units, so a scenario and its imperial equivalent share a row
+KEY_INPUTS = [name for name in BATCH_INPUT_COLUMNS if name != 'is_metric']
+KEY_FORMAT = f"<{len(KEY_INPUTS)}d"
+VALUE_FORMAT = f"<{len(RESULT_ROUNDING)}d"
+
+RESULT_KEYS = list(RESULT_ROUNDING)
+AREA_COLUMNS = np.array([key in AREA_RESULT_KEYS for key in RESULT_KEYS])
+RESULT_DIGITS = list(RESULT_ROUNDING.values())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, version TEXT NOT NULL, value BLOB NOT NULL, last_used REAL NOT NULL) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+def formula_version():
+    # FORMULA_VERSION plus a hash of the modules the results are computed by, so editing
+    # a formula invalidates stored results without anyone remembering to bump the number
+    digest = hashlib.sha1()
+    for module in (units, core, batch, model, memo):
+        try:
+            digest.update(inspect.getsource(module).encode())
+        except (OSError, TypeError):
+            pass  # no source shipped; FORMULA_VERSION alone decides
+    return f"{FORMULA_VERSION}-{digest.hexdigest()[:12]}"
+
+def store_key(normalized):
+    # + 0.0 folds -0.0 into 0.0, which would otherwise pack to different bytes
+    return struct.pack(KEY_FORMAT, *(value + 0.0 for value in normalized))
+
+def store_keys(columns):
+    # Keys for every row of broadcast batch columns; the vectorized normalize_coverage_inputs
+    imperial = ~columns['is_metric']
+    values = np.column_stack([columns[name] for name in KEY_INPUTS])
+    for name, convert in (('machine_width', feet_to_meters), ('machine_speed', mph_to_kmh), ('field_length', feet_to_meters)):
+        index = KEY_INPUTS.index(name)
+        values[:, index] = np.where(imperial, convert(values[:, index]), values[:, index])
+    values = np.ascontiguousarray(round_half_even_like_python(values, INPUT_PRECISION) + 0.0, dtype='<f8')
+    return [row.tobytes() for row in values]
+
+def reported_results(metric_values, is_metric, round_results=True):
+    # One stored row of metric results as the dict calculate_coverage returns
+    results = {}
+    for key, value, is_area, ndigits in zip(RESULT_KEYS, metric_values, AREA_COLUMNS, RESULT_DIGITS):
+        if is_area and not is_metric:
+            value = hectares_to_acres(value)
+        results[key] = round(value, ndigits) if round_results else value
+    return results
+
+class PersistentCoverageCache:
+    # calculate_coverage results in an SQLite file that any number of processes can share.
+    # Rows are keyed by the inputs converted to metric and rounded to INPUT_PRECISION, and
+    # hold the unrounded metric results; the requested unit system is applied on the way
+    # out, so imperial and metric callers hit the same rows. WAL mode lets readers carry
+    # on while one process writes, and busy_timeout makes writers queue instead of failing.
+    # Rows written by other formula versions are never returned and are dropped when the
+    # file is opened; beyond max_entries the least recently used rows are evicted.
+    def __init__(self, path=DEFAULT_STORE_PATH, max_entries=DEFAULT_MAX_ENTRIES, version=None, timeout=30.0):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.path = path
+        self.max_entries = max_entries
+        self.version = version or formula_version()
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.latencies = {'get': deque(maxlen=LATENCY_WINDOW), 'put': deque(maxlen=LATENCY_WINDOW)}
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._puts_since_check = 0
+
+    def _connect(self):
+        # One connection per process: SQLite connections must not cross a fork
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(SCHEMA)
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            stored = connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if stored is None or stored[0] != self.version:
+                connection.execute('DELETE FROM results WHERE version != ?', (self.version,))
+                connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (self.version,))
+        self._connection = connection
+        self._pid = os.getpid()
+        self._puts_since_check = 0
+        self._evict(connection)
+        return connection
+
+    def get_many(self, keys):
+        # Stored metric result tuples for keys from store_key/store_keys; None for misses
+        started = time.perf_counter()
+        found = {}
+        with self._lock:
+            connection = self._connect()
+            now = time.time()
+            stale = []
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), LOOKUP_CHUNK):
+                chunk = unique[start:start + LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                query = f'SELECT key, value, last_used FROM results WHERE version = ? AND key IN ({placeholders})'
+                for key, value, last_used in connection.execute(query, (self.version, *chunk)):
+                    found[key] = struct.unpack(VALUE_FORMAT, value)
+                    if now - last_used > TOUCH_INTERVAL:
+                        stale.append(key)
+            if stale:
+                with connection:
+                    connection.execute('BEGIN IMMEDIATE')
+                    connection.executemany('UPDATE results SET last_used = ? WHERE key = ?', [(now, key) for key in stale])
+            values = [found.get(key) for key in keys]
+            hits = sum(value is not None for value in values)
+            self.hits += hits
+            self.misses += len(values) - hits
+            self.latencies['get'].append((time.perf_counter() - started, len(keys)))
+        return values
+
+    def put_many(self, keys, metric_values):
+        # Store unrounded metric results (sequences in RESULT_ROUNDING order) under keys
+        started = time.perf_counter()
+        now = time.time()
+        rows = [(key, self.version, struct.pack(VALUE_FORMAT, *values), now) for key, values in zip(keys, metric_values)]
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.executemany('INSERT OR REPLACE INTO results (key, version, value, last_used) VALUES (?, ?, ?, ?)', rows)
+            # Counting rows scans the table, so it only happens every tenth of max_entries
+            self._puts_since_check += len(rows)
+            if self._puts_since_check * 10 >= self.max_entries:
+                self._evict(connection)
+            self.latencies['put'].append((time.perf_counter() - started, len(rows)))
+
+    def _evict(self, connection):
+        self._puts_since_check = 0
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            count = connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            if count <= self.max_entries:
+                return
+            excess = count - int(self.max_entries * EVICTION_TARGET)
+            connection.execute('DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)', (excess,))
+        self.evicted += excess
+
+    def calculate(self, machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day=0, transportation_time_per_trip=0):
+        # calculate_coverage through the store. The model validates like calculate_coverage,
+        # so invalid inputs raise the same ValueError, and exposes the unrounded metric values.
+        return self.model_results(CoverageModel(machine_width, machine_speed, field_length, turn_around_time, operational_hours_per_day, operational_days_per_week, is_metric, transportation_trips_per_day, transportation_time_per_trip))
+
+    def model_results(self, model):
+        # CoverageModel.results() through the store. The model is only evaluated on a
+        # miss, and then only in the quantities its updates invalidated.
+        inputs = model.inputs()
+        key = store_key(normalize_coverage_inputs(**inputs))
+        stored = self.get_many([key])[0]
+        if stored is None:
+            stored = tuple(model.get(name) for name in RESULT_KEYS)
+            self.put_many([key], [stored])
+        return reported_results(stored, inputs['is_metric'])
+
+    def calculate_batch(self, machine_width=None, machine_speed=None, field_length=None, turn_around_time=None, operational_hours_per_day=None, operational_days_per_week=None, is_metric=None, transportation_trips_per_day=None, transportation_time_per_trip=None, data=None, round_results=True):
+        # calculate_coverage_batch through the store: stored rows are looked up in bulk,
+        # only the misses are evaluated, and their valid results are written back
+        columns = batch_input_columns(data, {
+            'machine_width': machine_width,
+            'machine_speed': machine_speed,
+            'field_length': field_length,
+            'turn_around_time': turn_around_time,
+            'operational_hours_per_day': operational_hours_per_day,
+            'operational_days_per_week': operational_days_per_week,
+            'is_metric': is_metric,
+            'transportation_trips_per_day': transportation_trips_per_day,
+            'transportation_time_per_trip': transportation_time_per_trip,
+        })
+        names = list(columns)
+        arrays = np.broadcast_arrays(*[np.asarray(columns[name]) for name in names])
+        inputs = {name: np.array(array, dtype=bool if name == 'is_metric' else float).ravel() for name, array in zip(names, arrays)}
+        row_count = inputs['is_metric'].shape[0]
+
+        # Rows are validated before lookup: keys are rounded to INPUT_PRECISION, so an
+        # invalid row such as a slightly negative turnaround time would otherwise match
+        # the stored row of a valid neighbour
+        valid, errors = validate_batch_inputs(inputs)
+        checked = np.flatnonzero(valid)
+        keys = [None] * row_count
+        for row, key in zip(checked, store_keys({name: values[checked] for name, values in inputs.items()})):
+            keys[row] = key
+        stored = self.get_many([keys[row] for row in checked])
+        metric = np.full((row_count, len(RESULT_KEYS)), np.nan)
+        hit = np.zeros(row_count, dtype=bool)
+        hit[checked] = [values is not None for values in stored]
+        if hit.any():
+            metric[hit] = [values for values in stored if values is not None]
+
+        missed = np.flatnonzero(valid & ~hit)
+        if len(missed):
+            # Evaluated as metric so the unrounded results are the ones to store
+            miss_inputs = {name: values[missed] for name, values in inputs.items()}
+            miss_imperial = ~miss_inputs['is_metric']
+            for name, convert in (('machine_width', feet_to_meters), ('machine_speed', mph_to_kmh), ('field_length', feet_to_meters)):
+                miss_inputs[name] = np.where(miss_imperial, convert(miss_inputs[name]), miss_inputs[name])
+            miss_inputs['is_metric'] = np.ones(len(missed), dtype=bool)
+            computed = calculate_coverage_batch(**miss_inputs, round_results=False)
+            metric[missed] = np.column_stack([computed[key] for key in RESULT_KEYS])
+            valid[missed] = computed['valid']
+            errors[missed] = computed['error']
+            stored_rows = missed[computed['valid']]
+            if len(stored_rows):
+                # Duplicate keys within one batch are written once
+                fresh = dict(zip([keys[row] for row in stored_rows], metric[stored_rows].tolist()))
+                self.put_many(list(fresh), list(fresh.values()))
+
+        imperial = ~inputs['is_metric']
+        results = {}
+        for position, (key, ndigits) in enumerate(RESULT_ROUNDING.items()):
+            values = metric[:, position]
+            if AREA_COLUMNS[position]:
+                values = np.where(imperial, hectares_to_acres(values), values)
+            if round_results:
+                values = round_half_even_like_python(values, ndigits)
+            values[~valid] = np.nan
+            results[key] = values
+        results['valid'] = valid
+        results['error'] = errors
+        return results
+
+    def _count_entries(self):
+        # Read-only: unlike _connect(), never creates the file, purges other versions or evicts
+        query = 'SELECT COUNT(*) FROM results WHERE version = ?'
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection.execute(query, (self.version,)).fetchone()[0]
+        if self.path == ':memory:' or not os.path.exists(self.path):
+            return 0
+        connection = sqlite3.connect(f'file:{pathname2url(os.path.abspath(self.path))}?mode=ro', uri=True, timeout=self.timeout)
+        try:
+            return connection.execute(query, (self.version,)).fetchone()[0]
+        except sqlite3.OperationalError as error:
+            # The file exists but no store has created its tables yet
+            if 'no such table' not in str(error):
+                raise
+            return 0
+        finally:
+            connection.close()
+
+    def stats(self):
+        # Reads the entry count without opening the store for writing, so monitoring a
+        # store never changes it
+        with self._lock:
+            entries = self._count_entries()
+            lookups = self.hits + self.misses
+            stats = {
+                'path': self.path,
+                'version': self.version,
+                'entries': entries,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evicted': self.evicted,
+            }
+            for operation, samples in self.latencies.items():
+                seconds = sorted(elapsed for elapsed, _ in samples)
+                rows = sum(count for _, count in samples)
+                stats[f'{operation}_latency_ms'] = {
+                    'calls': len(seconds),
+                    'mean': 1000 * sum(seconds) / len(seconds) if seconds else None,
+                    'p50': 1000 * seconds[len(seconds) // 2] if seconds else None,
+                    'p99': 1000 * seconds[min(len(seconds) - 1, int(0.99 * len(seconds)))] if seconds else None,
+                    'per_row_us': 1e6 * sum(seconds) / rows if rows else None,
+                }
+            return stats
+
+    def clear(self):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute('DELETE FROM results')
+            self.hits = 0
+            self.misses = 0
+            self.evicted = 0
+            for samples in self.latencies.values():
+                samples.clear()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
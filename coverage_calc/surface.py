@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .batch import BATCH_INPUT_COLUMNS, RESULT_ROUNDING, calculate_coverage_batch
+
+# Grid sizes (points per axis) a surface is refined through, coarse to dense
+SURFACE_LEVELS = (16, 32, 64, 128)
+
+SURFACE_CACHE_SIZE = 64
+
+SURFACE_INPUTS = [name for name in BATCH_INPUT_COLUMNS if name != 'is_metric']
+
+class Surface:
+    __slots__ = ('x_name', 'x', 'y_name', 'y', 'output', 'values')
+
+    def __init__(self, x_name, x, y_name, y, output, values):
+        self.x_name = x_name
+        self.x = x
+        self.y_name = y_name
+        self.y = y
+        self.output = output
+        self.values = values  # (len(y), len(x)), NaN where the inputs are invalid
+
+    @property
+    def points(self):
+        return len(self.x)
+
+def evaluate_surface(x_name, x_range, y_name, y_range, fixed, points, output='coverage_per_week'):
+    # output over a points x points grid of two inputs, every other input held at its
+    # value in fixed. One calculate_coverage_batch call evaluates the whole grid.
+    if x_name == y_name:
+        raise ValueError("Surface axes must be two different inputs")
+    for name in (x_name, y_name):
+        if name not in SURFACE_INPUTS:
+            raise ValueError(f"Cannot use {name} as a surface axis; choose from {', '.join(SURFACE_INPUTS)}")
+    if output not in RESULT_ROUNDING:
+        raise ValueError(f"Unknown output: {output}")
+    x = np.linspace(*x_range, points)
+    y = np.linspace(*y_range, points)
+    columns = {name: value for name, value in fixed.items() if name not in (x_name, y_name)}
+    columns[x_name] = x[None, :]
+    columns[y_name] = y[:, None]
+    results = calculate_coverage_batch(**columns, round_results=False)
+    return Surface(x_name, x, y_name, y, output, results[output].reshape(points, points))
+
+class SurfaceCache:
+    # Surfaces keyed by their axes, ranges, output and fixed inputs, shared by every
+    # session of the process. Each entry keeps its densest grid so far. Denser grids are
+    # computed on a background thread and land in the cache even if nobody waits for
+    # them, so returning to a surface starts from its best resolution.
+    def __init__(self, maxsize=SURFACE_CACHE_SIZE, levels=SURFACE_LEVELS):
+        self.maxsize = maxsize
+        self.levels = tuple(sorted(levels))
+        self._surfaces = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._generation = 0
+
+    @staticmethod
+    def key(x_name, x_range, y_name, y_range, fixed, output):
+        fixed_items = tuple(sorted((name, float(value)) for name, value in fixed.items() if name not in (x_name, y_name)))
+        return (x_name, tuple(map(float, x_range)), y_name, tuple(map(float, y_range)), output, fixed_items)
+
+    def get(self, key):
+        with self._lock:
+            surface = self._surfaces.get(key)
+            if surface is not None:
+                self._surfaces.move_to_end(key)
+            return surface
+
+    def _store(self, key, surface, generation):
+        with self._lock:
+            # A grid finishing after clear() belongs to the cache that was cleared
+            if generation != self._generation:
+                return surface
+            current = self._surfaces.get(key)
+            if current is None or current.points < surface.points:
+                self._surfaces[key] = surface
+            self._surfaces.move_to_end(key)
+            while len(self._surfaces) > self.maxsize:
+                self._surfaces.popitem(last=False)
+        return surface
+
+    def _compute(self, key, arguments, points, generation):
+        try:
+            return self._store(key, evaluate_surface(*arguments, points=points, output=key[4]), generation)
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._pending.pop((key, points), None)
+
+    def latest(self, x_name, x_range, y_name, y_range, fixed, output='coverage_per_week'):
+        # The best surface available now (the cached one, or the coarsest level computed
+        # right away) and the futures of the denser levels not yet in the cache. Never
+        # waits for the background thread; callers poll the futures with done().
+        key = self.key(x_name, x_range, y_name, y_range, fixed, output)
+        arguments = (x_name, x_range, y_name, y_range, fixed)
+        surface = self.get(key)
+        if surface is None:
+            surface = self._compute(key, arguments, self.levels[0], self._generation)
+
+        futures = []
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='surface')
+            # A level may have landed since get(); don't submit it again
+            cached = self._surfaces.get(key)
+            best = max(surface.points, cached.points if cached is not None else 0)
+            for points in self.levels:
+                if points <= best:
+                    continue
+                future = self._pending.get((key, points))
+                if future is None:
+                    future = self._executor.submit(self._compute, key, arguments, points, self._generation)
+                    self._pending[(key, points)] = future
+                futures.append(future)
+        return surface, futures
+
+    def surfaces(self, x_name, x_range, y_name, y_range, fixed, output='coverage_per_week'):
+        # Yield the surface at increasing resolution, waiting for each denser level in
+        # turn. For scripts; the app draws latest() and polls instead.
+        surface, futures = self.latest(x_name, x_range, y_name, y_range, fixed, output)
+        yield surface
+        for position, future in enumerate(futures):
+            # Skip levels a denser grid has already overtaken
+            if not any(later.done() for later in futures[position + 1:]):
+                yield future.result()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._surfaces), 'maxsize': self.maxsize, 'pending': len(self._pending)}
+
+    def clear(self):
+        with self._lock:
+            self._surfaces.clear()
+            self._pending.clear()
+            self._generation += 1
+
+surface_cache = SurfaceCache()
@@ -0,0 +1,240 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import BATCH_INPUT_COLUMNS, RESULT_ROUNDING, calculate_coverage_batch
+from .store import PersistentCoverageCache
+
+SWEEP_FORMATS = ['csv', 'jsonl', 'parquet']
+
+DEFAULT_CHUNK_SIZE = 100000
+
+# Inputs not given as an axis are held at these values, matching the UI defaults
+SWEEP_DEFAULTS = {
+    'turn_around_time': 2.0,
+    'operational_hours_per_day': 8.0,
+    'operational_days_per_week': 5,
+    'is_metric': True,
+    'transportation_trips_per_day': 0,
+    'transportation_time_per_trip': 0,
+}
+
+OUTPUT_COLUMNS = BATCH_INPUT_COLUMNS + list(RESULT_ROUNDING) + ['error']
+
+def parse_axis(text):
+    # "6:30:2" is an inclusive range, "5,8,10" a list and "500" a single value
+    if ':' in text:
+        parts = [float(part) for part in text.split(':')]
+        if len(parts) != 3 or parts[2] <= 0:
+            raise ValueError(f"Range must be start:stop:step with a positive step, got {text!r}")
+        start, stop, step = parts
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        if count < 1:
+            raise ValueError(f"Range {text!r} is empty")
+        return (start + step * np.arange(count)).tolist()
+    values = []
+    for part in text.split(','):
+        part = part.strip()
+        if part.lower() in ('true', 'false'):
+            values.append(part.lower() == 'true')
+        else:
+            values.append(float(part))
+    return values
+
+def sweep_axes(axes):
+    # Normalize to an ordered list of (name, values) covering every calculation input
+    unknown = set(axes) - set(BATCH_INPUT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown sweep inputs: {', '.join(sorted(unknown))}")
+    normalized = []
+    for name in BATCH_INPUT_COLUMNS:
+        if name in axes:
+            values = axes[name]
+        elif name in SWEEP_DEFAULTS:
+            values = SWEEP_DEFAULTS[name]
+        else:
+            raise ValueError(f"Missing sweep input: {name}")
+        values = np.atleast_1d(np.asarray(values, dtype=bool if name == 'is_metric' else float))
+        if values.ndim != 1 or values.size == 0:
+            raise ValueError(f"Sweep input {name} must be a non-empty list of values")
+        normalized.append((name, values))
+    return normalized
+
+def sweep_size(axes):
+    return int(np.prod([values.size for _, values in axes], dtype=np.int64))
+
+def sweep_fingerprint(axes, chunk_size, output_format):
+    payload = json.dumps({
+        'axes': [[name, values.tolist()] for name, values in axes],
+        'chunk_size': chunk_size,
+        'format': output_format,
+    })
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# Stores opened by this process, by path; each worker process opens its own connection
+_stores = {}
+
+def open_store(path):
+    if path not in _stores:
+        _stores[path] = PersistentCoverageCache(path)
+    return _stores[path]
+
+def evaluate_sweep_chunk(axes, start, stop, store_path=None):
+    # Rows start..stop of the Cartesian product, decoded from flat indices so
+    # the full grid is never materialized
+    shape = tuple(values.size for _, values in axes)
+    indices = np.unravel_index(np.arange(start, stop, dtype=np.int64), shape)
+    columns = {name: values[index] for (name, values), index in zip(axes, indices)}
+    results = (open_store(store_path).calculate_batch if store_path else calculate_coverage_batch)(**columns)
+    columns.update((key, results[key]) for key in RESULT_ROUNDING)
+    columns['error'] = results['error']
+    return columns
+
+def chunk_frame(columns):
+    import pandas as pd
+    return pd.DataFrame({name: columns[name] for name in OUTPUT_COLUMNS})
+
+class SweepWriter:
+    # CSV and JSONL append to one file; Parquet writes one part file per chunk into a directory.
+    # Either way the writer can report how far it got so an interrupted sweep can resume.
+    def __init__(self, path, output_format, resume_offset=None):
+        self.path = path
+        self.format = output_format
+        if output_format == 'parquet':
+            os.makedirs(path, exist_ok=True)
+            self.handle = None
+        else:
+            self.handle = open(path, 'r+b' if resume_offset is not None else 'wb')
+            self.handle.seek(resume_offset or 0)
+            self.handle.truncate()
+
+    def write(self, chunk_index, columns):
+        frame = chunk_frame(columns)
+        if self.format == 'parquet':
+            frame.to_parquet(os.path.join(self.path, f"part-{chunk_index:06d}.parquet"), index=False)
+            return None
+        if self.format == 'csv':
+            text = frame.to_csv(index=False, header=self.handle.tell() == 0)
+        else:
+            text = frame.to_json(orient='records', lines=True)
+            if not text.endswith('\n'):
+                text += '\n'
+        self.handle.write(text.encode())
+        self.handle.flush()
+        return self.handle.tell()
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+
+def progress_path(output_path):
+    return output_path.rstrip('/\\') + '.progress.json'
+
+def load_progress(output_path, fingerprint):
+    path = progress_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        progress = json.load(handle)
+    if progress.get('fingerprint') != fingerprint:
+        raise ValueError(f"{path} belongs to a different sweep; remove it or write to another output")
+    return progress
+
+def save_progress(output_path, progress):
+    path = progress_path(output_path)
+    with open(path + '.tmp', 'w') as handle:
+        json.dump(progress, handle)
+    os.replace(path + '.tmp', path)
+
+def run_sweep(axes, output_path, output_format='csv', chunk_size=DEFAULT_CHUNK_SIZE, workers=None, resume=False, progress=None, store=None):
+    # store is the path of a PersistentCoverageCache; it does not change the output, so a
+    # sweep can resume with or without it
+    if output_format not in SWEEP_FORMATS:
+        raise ValueError(f"Output format must be one of {', '.join(SWEEP_FORMATS)}")
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be greater than 0")
+    axes = sweep_axes(axes)
+    total_rows = sweep_size(axes)
+    chunk_count = -(-total_rows // chunk_size)
+    fingerprint = sweep_fingerprint(axes, chunk_size, output_format)
+
+    state = load_progress(output_path, fingerprint) if resume else None
+    if state is None:
+        state = {'fingerprint': fingerprint, 'total_rows': total_rows, 'chunks_done': 0, 'offset': 0}
+    writer = SweepWriter(output_path, output_format, state['offset'] if state['chunks_done'] else None)
+
+    def record(chunk_index, columns):
+        offset = writer.write(chunk_index, columns)
+        state['chunks_done'] = chunk_index + 1
+        state['offset'] = offset
+        save_progress(output_path, state)
+        if progress is not None:
+            progress(min(state['chunks_done'] * chunk_size, total_rows), total_rows)
+
+    def chunk_bounds(chunk_index):
+        return chunk_index * chunk_size, min((chunk_index + 1) * chunk_size, total_rows)
+
+    pending_chunks = range(state['chunks_done'], chunk_count)
+    try:
+        if workers == 1:
+            for chunk_index in pending_chunks:
+                record(chunk_index, evaluate_sweep_chunk(axes, *chunk_bounds(chunk_index), store))
+        else:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Keep a bounded window of chunks in flight and write them in order,
+                # so memory stays flat and the output is resumable at any chunk boundary
+                window = 2 * workers
+                in_flight = {}
+                chunks = iter(pending_chunks)
+                for chunk_index in chunks:
+                    in_flight[chunk_index] = executor.submit(evaluate_sweep_chunk, axes, *chunk_bounds(chunk_index), store)
+                    if len(in_flight) >= window:
+                        break
+                next_index = state['chunks_done']
+                while in_flight:
+                    record(next_index, in_flight.pop(next_index).result())
+                    next_index += 1
+                    following = next(chunks, None)
+                    if following is not None:
+                        in_flight[following] = executor.submit(evaluate_sweep_chunk, axes, *chunk_bounds(following), store)
+    finally:
+        writer.close()
+    return state
+
+def print_progress(done_rows, total_rows):
+    print(f"\r{done_rows}/{total_rows} rows ({100 * done_rows / total_rows:.1f}%)", end='' if done_rows < total_rows else '\n', file=sys.stderr, flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Sweep calculate_coverage over the Cartesian product of its inputs.',
+        epilog='Each input takes a single value, a comma-separated list, or an inclusive start:stop:step range.',
+    )
+    for name in BATCH_INPUT_COLUMNS:
+        parser.add_argument('--' + name.replace('_', '-'), dest=name, type=parse_axis, default=None, required=name not in SWEEP_DEFAULTS)
+    parser.add_argument('--output', '-o', required=True, help='Output file (CSV/JSONL) or directory (Parquet)')
+    parser.add_argument('--format', choices=SWEEP_FORMATS, default=None, help='Defaults to the output file extension')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count, 1 runs in-process)')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted sweep into the same output')
+    parser.add_argument('--store', metavar='PATH', help='Reuse and record results in a persistent SQLite result store shared with other runs')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    output_format = args.format or os.path.splitext(args.output.rstrip('/\\'))[1].lstrip('.').lower()
+    if output_format not in SWEEP_FORMATS:
+        parser.error('--format is required when the output extension is not .csv, .jsonl or .parquet')
+    axes = {name: getattr(args, name) for name in BATCH_INPUT_COLUMNS if getattr(args, name) is not None}
+    try:
+        run_sweep(axes, args.output, output_format, args.chunk_size, args.workers, args.resume, None if args.quiet else print_progress, args.store)
+    except ValueError as error:
+        parser.exit(2, f"error: {error}\n")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .montecarlo import Empirical
+from .units import meters_to_feet, kmh_to_mph
+
+EARTH_RADIUS = 6371008.8  # meters
+
+DEFAULT_CHUNK_POINTS = 1000000
+
+# Columns every log needs; time in seconds, lat/lon in degrees, speed in m/s
+TELEMETRY_COLUMNS = ['time', 'lat', 'lon', 'speed']
+
+# Segmentation settings, in metric units
+SEGMENTATION_DEFAULTS = {
+    'min_speed': 0.5,           # m/s; slower points are stopped, not working
+    'max_gap': 10.0,            # s; longer gaps in the log split a pass
+    'heading_window': 5,        # points either side used to measure heading change
+    'max_heading_change': 3.0,  # degrees per point; straighter points are on a pass
+    'min_pass_length': 30.0,    # m; shorter straight runs are not passes
+    'max_turn_time': 300.0,     # s; longer gaps between passes are breaks, not turns
+    'min_turn_angle': 135.0,    # degrees; a headland turn reverses the heading
+}
+
+PASS_FIELDS = ['start_time', 'end_time', 'start_x', 'start_y', 'end_x', 'end_y', 'length']
+
+def project(lat, lon, origin):
+    # Local equirectangular projection around origin (lat, lon) in meters; accurate to
+    # well under a swath width across a farm
+    lat0, lon0 = origin
+    x = np.radians(np.asarray(lon, dtype=float) - lon0) * EARTH_RADIUS * math.cos(math.radians(lat0))
+    y = np.radians(np.asarray(lat, dtype=float) - lat0) * EARTH_RADIUS
+    return x, y
+
+def read_log_chunks(path, chunk_points=DEFAULT_CHUNK_POINTS):
+    # Yield dicts of column arrays. .npy files with a structured dtype are memory-mapped;
+    # CSV files are streamed with pandas. Either way only one chunk is in memory.
+    if path.endswith('.npy'):
+        records = np.load(path, mmap_mode='r')
+        for start in range(0, len(records), chunk_points):
+            window = records[start:start + chunk_points]
+            yield {name: np.asarray(window[name], dtype=float) for name in TELEMETRY_COLUMNS}
+        return
+    import pandas as pd
+    for frame in pd.read_csv(path, usecols=TELEMETRY_COLUMNS, chunksize=chunk_points):
+        time = frame['time']
+        if not pd.api.types.is_numeric_dtype(time):
+            # Timestamp strings; the datetime resolution varies between pandas versions,
+            # so go through a timedelta rather than the raw integer representation
+            time = (pd.to_datetime(time, utc=True) - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+        yield {
+            'time': np.asarray(time, dtype=float),
+            'lat': frame['lat'].to_numpy(dtype=float),
+            'lon': frame['lon'].to_numpy(dtype=float),
+            'speed': frame['speed'].to_numpy(dtype=float),
+        }
+
+class PassSegmenter:
+    # Splits one machine's track into straight passes, chunk by chunk. Points after the
+    # start of a pass that may still be running at the end of a chunk are carried into
+    # the next chunk, so passes that straddle chunk boundaries are found whole.
+    __slots__ = ('origin', 'settings', 'carry', 'lead')
+
+    def __init__(self, origin=None, **settings):
+        unknown = set(settings) - set(SEGMENTATION_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown segmentation settings: {', '.join(sorted(unknown))}")
+        self.origin = origin
+        self.settings = {**SEGMENTATION_DEFAULTS, **settings}
+        self.carry = None
+        self.lead = 0
+
+    def feed(self, chunk):
+        if self.origin is None and len(chunk['time']):
+            self.origin = (float(chunk['lat'][0]), float(chunk['lon'][0]))
+        x, y = project(chunk['lat'], chunk['lon'], self.origin)
+        points = {'time': np.asarray(chunk['time'], dtype=float), 'x': x, 'y': y, 'speed': np.asarray(chunk['speed'], dtype=float)}
+        if self.carry is not None:
+            points = {name: np.concatenate([self.carry[name], points[name]]) for name in points}
+        passes, carry_from = self.segment(points, final=False)
+        self.carry = {name: values[carry_from:] for name, values in points.items()}
+        return passes
+
+    def finish(self):
+        if self.carry is None:
+            return empty_passes()
+        passes, _ = self.segment(self.carry, final=True)
+        self.carry = None
+        self.lead = 0
+        return passes
+
+    def segment(self, points, final):
+        settings = self.settings
+        time, x, y, speed = points['time'], points['x'], points['y'], points['speed']
+        if len(time) < 2:
+            return empty_passes(), 0
+        dt = np.diff(time)
+        dx, dy = np.diff(x), np.diff(y)
+
+        # Heading change at each point between the chords to the points window steps
+        # behind and ahead; chords average out GPS jitter that single steps amplify
+        window = max(1, int(settings['heading_window']))
+        index = np.arange(len(time))
+        behind = np.maximum(index - window, 0)
+        ahead = np.minimum(index + window, len(time) - 1)
+        back_x, back_y = x - x[behind], y - y[behind]
+        front_x, front_y = x[ahead] - x, y[ahead] - y
+        bend = np.degrees(np.abs(np.arctan2(back_x * front_y - back_y * front_x, back_x * front_x + back_y * front_y))) / window
+
+        working = (dt > 0) & (dt <= settings['max_gap']) & (speed[1:] >= settings['min_speed'])
+        straight = working & (np.maximum(bend[:-1], bend[1:]) <= settings['max_heading_change'])
+        # Steps before lead were classified in the previous chunk and are context only
+        straight[:self.lead] = False
+
+        # Runs of consecutive straight steps; step i joins point i to point i + 1
+        edges = np.diff(np.concatenate([[0], straight.astype(np.int8), [0]]))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)  # exclusive step index
+
+        # Steps from settled on still depend on points that have not arrived yet
+        settled = max(0, len(time) - window - 2)
+        resume = settled
+        if not final and len(run_starts) and run_ends[-1] >= settled:
+            # The last run may continue in the next chunk
+            resume = run_starts[-1]
+            run_starts, run_ends = run_starts[:-1], run_ends[:-1]
+        carry_from = max(0, resume - window - 1)
+        self.lead = resume - carry_from
+
+        step_length = np.hypot(dx, dy)
+        cumulative = np.concatenate([[0.0], np.cumsum(step_length)])
+        lengths = cumulative[run_ends] - cumulative[run_starts]
+        keep = lengths >= settings['min_pass_length']
+        run_starts, run_ends, lengths = run_starts[keep], run_ends[keep], lengths[keep]
+        return {
+            'start_time': time[run_starts],
+            'end_time': time[run_ends],
+            'start_x': x[run_starts],
+            'start_y': y[run_starts],
+            'end_x': x[run_ends],
+            'end_y': y[run_ends],
+            'length': lengths,
+        }, carry_from
+
+def empty_passes():
+    return {name: np.zeros(0) for name in PASS_FIELDS}
+
+def concatenate_passes(parts):
+    parts = list(parts)
+    if not parts:
+        return empty_passes()
+    return {name: np.concatenate([part[name] for part in parts]) for name in PASS_FIELDS}
+
+def pair_passes(passes, settings=None):
+    # Consecutive passes joined by a headland turn: reversed heading and a short gap.
+    # Returns the turn durations (s) and the spacing between the two passes (m).
+    settings = {**SEGMENTATION_DEFAULTS, **(settings or {})}
+    if len(passes['length']) < 2:
+        return np.zeros(0), np.zeros(0), np.zeros(0, dtype=int)
+    heading_x = passes['end_x'] - passes['start_x']
+    heading_y = passes['end_y'] - passes['start_y']
+    heading = np.degrees(np.arctan2(heading_y, heading_x))
+    change = np.abs((heading[1:] - heading[:-1] + 180) % 360 - 180)
+    gap = passes['start_time'][1:] - passes['end_time'][:-1]
+    is_turn = (change >= settings['min_turn_angle']) & (gap >= 0) & (gap <= settings['max_turn_time'])
+
+    # Perpendicular distance from the midpoint of the next pass to the line of this one
+    mid_x = (passes['start_x'][1:] + passes['end_x'][1:]) / 2
+    mid_y = (passes['start_y'][1:] + passes['end_y'][1:]) / 2
+    norm = np.hypot(heading_x[:-1], heading_y[:-1])
+    spacing = np.abs((mid_x - passes['start_x'][:-1]) * heading_y[:-1] - (mid_y - passes['start_y'][:-1]) * heading_x[:-1]) / norm
+    index = np.flatnonzero(is_turn)
+    return gap[index], spacing[index], index
+
+def points_in_polygons(x, y, polygons):
+    # Index of the first polygon containing each point (even-odd rule), -1 for none
+    owner = np.full(len(x), -1)
+    for number, polygon in enumerate(polygons):
+        px, py = polygon[:, 0], polygon[:, 1]
+        qx, qy = np.roll(px, -1), np.roll(py, -1)
+        crosses = (py[None, :] > y[:, None]) != (qy[None, :] > y[:, None])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            at = px[None, :] + (y[:, None] - py[None, :]) * (qx - px)[None, :] / (qy - py)[None, :]
+        inside = (crosses & (x[:, None] < at)).sum(axis=1) % 2 == 1
+        owner[(owner == -1) & inside] = number
+    return owner
+
+def analyze_log(path, boundaries=None, chunk_points=DEFAULT_CHUNK_POINTS, **settings):
+    # Per-field samples of pass speed (km/h), turn duration (minutes) and swath
+    # spacing (m) for one machine's log. boundaries maps field names to lists of
+    # (lat, lon) points; without it every pass counts towards the field None.
+    segmenter = PassSegmenter(**settings)
+    passes = concatenate_passes([segmenter.feed(chunk) for chunk in read_log_chunks(path, chunk_points)] + [segmenter.finish()])
+    turn_times, spacings, turn_index = pair_passes(passes, segmenter.settings)
+    speeds = passes['length'] / np.maximum(passes['end_time'] - passes['start_time'], 1e-9) * 3.6
+
+    names = [None]
+    owner = np.zeros(len(speeds), dtype=int)
+    if boundaries:
+        names = list(boundaries)
+        polygons = [np.column_stack(project(*np.asarray(boundaries[name], dtype=float).T, segmenter.origin)) for name in names]
+        owner = points_in_polygons((passes['start_x'] + passes['end_x']) / 2, (passes['start_y'] + passes['end_y']) / 2, polygons)
+
+    samples = {}
+    for number, name in enumerate(names):
+        in_field = owner == number
+        turns_in_field = in_field[turn_index] & in_field[turn_index + 1]
+        if in_field.any():
+            samples[name] = {
+                'pass_speed': speeds[in_field],
+                'turn_time': turn_times[turns_in_field] / 60,
+                'swath_spacing': spacings[turns_in_field],
+            }
+    return samples
+
+def merge_samples(results):
+    merged = {}
+    for result in results:
+        for field, samples in result.items():
+            target = merged.setdefault(field, {name: [] for name in samples})
+            for name, values in samples.items():
+                target[name].append(values)
+    return {field: {name: np.concatenate(values) for name, values in samples.items()} for field, samples in merged.items()}
+
+def ingest_logs(paths, boundaries=None, workers=None, chunk_points=DEFAULT_CHUNK_POINTS, **settings):
+    # Analyze one log per machine across a process pool and pool the samples per field
+    paths = [os.fspath(path) for path in paths]
+    if workers == 1:
+        return merge_samples(analyze_log(path, boundaries, chunk_points, **settings) for path in paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(analyze_log, path, boundaries, chunk_points, **settings) for path in paths]
+        return merge_samples(future.result() for future in futures)
+
+def field_statistics(samples, machine_width=None):
+    # P10/P50/P90 of each sample; with the implement width (m), also the overlap
+    # between neighbouring passes as a fraction of the width
+    statistics = {}
+    for name, values in samples.items():
+        if len(values):
+            statistics[name] = {label: float(np.quantile(values, q)) for label, q in (('p10', 0.1), ('p50', 0.5), ('p90', 0.9))}
+            statistics[name]['count'] = int(len(values))
+    if machine_width and len(samples['swath_spacing']):
+        overlap = 1 - samples['swath_spacing'] / machine_width
+        statistics['overlap'] = {label: float(np.quantile(overlap, q)) for label, q in (('p10', 0.1), ('p50', 0.5), ('p90', 0.9))}
+    return statistics
+
+def calibrated_inputs(samples, is_metric=True):
+    # Median pass speed, turn time and swath spacing as calculate_coverage inputs.
+    # The swath spacing is the width actually gained per pass once overlap is removed.
+    inputs = {}
+    if len(samples['pass_speed']):
+        speed = float(np.median(samples['pass_speed']))
+        inputs['machine_speed'] = speed if is_metric else kmh_to_mph(speed)
+    if len(samples['turn_time']):
+        inputs['turn_around_time'] = float(np.median(samples['turn_time']))
+    if len(samples['swath_spacing']):
+        width = float(np.median(samples['swath_spacing']))
+        inputs['machine_width'] = width if is_metric else meters_to_feet(width)
+    return inputs
+
+def empirical_inputs(samples, is_metric=True):
+    # The same samples as Monte Carlo distributions (see coverage_calc.montecarlo)
+    inputs = {}
+    if len(samples['pass_speed']):
+        inputs['machine_speed'] = Empirical(samples['pass_speed'] if is_metric else kmh_to_mph(samples['pass_speed']))
+    if len(samples['turn_time']):
+        inputs['turn_around_time'] = Empirical(samples['turn_time'])
+    if len(samples['swath_spacing']):
+        inputs['machine_width'] = Empirical(samples['swath_spacing'] if is_metric else meters_to_feet(samples['swath_spacing']))
+    return inputs
@@ -0,0 +1,17 @@
+def feet_to_meters(feet):
+    return feet * 0.3048
+
+def meters_to_feet(meters):
+    return meters / 0.3048
+
+def mph_to_kmh(mph):
+    return mph * 1.60934
+
+def kmh_to_mph(kmh):
+    return kmh / 1.60934
+
+def hectares_to_acres(hectares):
+    return hectares * 2.47105
+
+def acres_to_hectares(acres):
+    return acres / 2.47105
@@ -1,5 +1,31 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
-from app import calculate_coverage
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import StringIO
+from unittest import mock
+import numpy as np
+import pandas as pd
+from coverage_calc import CoverageCache, CoverageModel, calculate_coverage, calculate_coverage_batch, normalize_coverage_inputs
+from coverage_calc.bulk import run_bulk
+from coverage_calc.fleet import Field, Machine, run_replications, simulate_fleet
+from coverage_calc.montecarlo import Empirical, Normal, QuantileSketch, Triangular, run_monte_carlo
+from coverage_calc.solver import solve_inputs
+from coverage_calc import model as model_module
+from coverage_calc import store as store_module
+from coverage_calc.store import PersistentCoverageCache, formula_version, store_key
+from coverage_calc.service import CoverageService
+from coverage_calc.surface import SurfaceCache, evaluate_surface
+from coverage_calc.telemetry import EARTH_RADIUS, TELEMETRY_COLUMNS, analyze_log, calibrated_inputs, ingest_logs
+from coverage_calc.geometry import calculate_field_coverage, plan_passes
+from coverage_calc.sweep import parse_axis, run_sweep
 
 class TestCoverageCalculator(unittest.TestCase):
     def test_calculate_coverage_metric(self):
@@ -111,5 +137,870 @@ class TestCoverageCalculator(unittest.TestCase):
         self.assertEqual(result['coverage_per_day'], 0.0)
         self.assertGreater(result['coverage_lost_per_day'], 0.0)
 
+class TestCoverageBatch(unittest.TestCase):
+    def test_batch_matches_scalar(self):
+        rng = np.random.default_rng(7)
+        size = 500
+        inputs = {
+            'machine_width': rng.uniform(1, 60, size).round(2),
+            'machine_speed': rng.uniform(0.5, 20, size).round(2),
+            'field_length': rng.uniform(50, 3000, size).round(1),
+            'turn_around_time': rng.uniform(0, 5, size).round(1),
+            'operational_hours_per_day': rng.uniform(1, 24, size).round(1),
+            'operational_days_per_week': rng.integers(1, 8, size),
+            'is_metric': rng.integers(0, 2, size).astype(bool),
+            'transportation_trips_per_day': rng.integers(0, 6, size),
+            'transportation_time_per_trip': rng.uniform(0, 120, size).round(0),
+        }
+        batch = calculate_coverage_batch(**inputs)
+
+        for row in range(size):
+            expected = calculate_coverage(**{name: values[row].item() for name, values in inputs.items()})
+            for key, value in expected.items():
+                self.assertEqual(batch[key][row], value, f"{key} differs on row {row}")
+        self.assertTrue(batch['valid'].all())
+
+    def test_batch_reports_errors_per_row(self):
+        batch = calculate_coverage_batch(
+            machine_width=[10, 0, 10, 0],
+            machine_speed=[5, 5, -1, -1],
+            field_length=1000,
+            turn_around_time=2,
+            operational_hours_per_day=8,
+            operational_days_per_week=5,
+            is_metric=True
+        )
+
+        self.assertEqual(batch['valid'].tolist(), [True, False, False, False])
+        self.assertIsNone(batch['error'][0])
+        self.assertEqual(batch['error'][1], "Machine width must be greater than 0")
+        self.assertEqual(batch['error'][2], "Machine speed must be greater than 0")
+        self.assertEqual(batch['error'][3], "Machine width must be greater than 0")
+        self.assertAlmostEqual(batch['coverage_per_hour'][0], 4.29, places=2)
+        self.assertTrue(np.isnan(batch['coverage_per_hour'][1:]).all())
+
+    def test_batch_accepts_dataframe(self):
+        frame = pd.DataFrame({
+            'machine_width': [10, 32.8084],
+            'machine_speed': [5, 3.10686],
+            'field_length': [1000, 3280.84],
+            'turn_around_time': [2, 2],
+            'operational_hours_per_day': [8, 8],
+            'operational_days_per_week': [5, 5],
+            'is_metric': [True, False],
+        })
+        batch = calculate_coverage_batch(data=frame)
+
+        self.assertEqual(batch['coverage_per_week'].tolist(), [171.43, 423.61])
+        self.assertEqual(batch['transportation_time_per_day'].tolist(), [0.0, 0.0])
+
+        with self.assertRaises(ValueError):
+            calculate_coverage_batch(data=frame.drop(columns=['is_metric']))
+
+class TestCoreImport(unittest.TestCase):
+    def test_core_import_skips_ui_and_numpy(self):
+        output = subprocess.run(
+            [sys.executable, '-c', "import sys, coverage_calc; print(sorted(m for m in ('streamlit', 'numpy') if m in sys.modules))"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+
+        self.assertEqual(output, '[]')
+
+class TestSweep(unittest.TestCase):
+    axes = {
+        'machine_width': [6, 12, 18],
+        'machine_speed': parse_axis('4:8:2'),
+        'field_length': [500, 1000],
+        'turn_around_time': [1, 2],
+        'is_metric': [True, False],
+    }
+
+    def test_parse_axis(self):
+        self.assertEqual(parse_axis('6:10:2'), [6.0, 8.0, 10.0])
+        self.assertEqual(parse_axis('5,8'), [5.0, 8.0])
+        self.assertEqual(parse_axis('true'), [True])
+        with self.assertRaises(ValueError):
+            parse_axis('1:5:0')
+
+    def test_sweep_covers_grid(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'sweep.csv')
+            state = run_sweep(self.axes, output, chunk_size=7, workers=1)
+            frame = pd.read_csv(output)
+
+        self.assertEqual(state['chunks_done'], 11)
+        self.assertEqual(len(frame), 72)
+        row = frame.iloc[-1]
+        expected = calculate_coverage(18, 8, 1000, 2, 8, 5, False)
+        self.assertEqual(row['coverage_per_week'], expected['coverage_per_week'])
+
+    def test_sweep_resumes_after_interruption(self):
+        class Interrupted(Exception):
+            pass
+
+        def interrupt(done_rows, total_rows):
+            if done_rows >= 30:
+                raise Interrupted()
+
+        with tempfile.TemporaryDirectory() as directory:
+            complete = os.path.join(directory, 'complete.jsonl')
+            resumed = os.path.join(directory, 'resumed.jsonl')
+            run_sweep(self.axes, complete, 'jsonl', chunk_size=10, workers=1)
+            with self.assertRaises(Interrupted):
+                run_sweep(self.axes, resumed, 'jsonl', chunk_size=10, workers=1, progress=interrupt)
+            state = run_sweep(self.axes, resumed, 'jsonl', chunk_size=10, workers=2, resume=True)
+
+            with open(complete) as expected, open(resumed) as actual:
+                self.assertEqual(actual.read(), expected.read())
+        self.assertEqual(state['chunks_done'], 8)
+
+    def test_sweep_through_store_matches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            plain = os.path.join(directory, 'plain.csv')
+            stored = os.path.join(directory, 'stored.csv')
+            store = os.path.join(directory, 'results.sqlite')
+            run_sweep(self.axes, plain, chunk_size=10, workers=1)
+            run_sweep(self.axes, stored, chunk_size=10, workers=2, store=store)
+            with open(plain) as expected, open(stored) as actual:
+                self.assertEqual(actual.read(), expected.read())
+            self.assertGreater(PersistentCoverageCache(store).stats()['entries'], 0)
+
+class TestCoverageCache(unittest.TestCase):
+    def test_repeated_inputs_hit_cache(self):
+        cache = CoverageCache(maxsize=2)
+        first = cache.calculate(10, 5, 1000, 2, 8, 5, True)
+        first['coverage_per_hour'] = -1
+        second = cache.calculate(10.0000000001, 5, 1000, 2, 8, 5, True)
+
+        self.assertEqual(second, calculate_coverage(10, 5, 1000, 2, 8, 5, True))
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 2})
+
+    def test_cache_is_bounded_lru(self):
+        cache = CoverageCache(maxsize=2)
+        cache.calculate(10, 5, 1000, 2, 8, 5, True)
+        cache.calculate(20, 5, 1000, 2, 8, 5, True)
+        cache.calculate(10, 5, 1000, 2, 8, 5, True)
+        cache.calculate(30, 5, 1000, 2, 8, 5, True)
+        cache.calculate(10, 5, 1000, 2, 8, 5, True)
+
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_get_or_compute_only_computes_misses(self):
+        cache = CoverageCache()
+        inputs = {**TestCoverageModel.INPUTS}
+        model = CoverageModel(**inputs)
+        first = cache.get_or_compute(inputs, model.results)
+        second = cache.get_or_compute(inputs, lambda: self.fail("computed a cached result"))
+
+        self.assertEqual(first, calculate_coverage(**inputs))
+        self.assertEqual(second, first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_invalid_inputs_are_not_cached(self):
+        cache = CoverageCache()
+        with self.assertRaises(ValueError):
+            cache.calculate(0, 5, 1000, 2, 8, 5, True)
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_normalized_inputs_are_metric(self):
+        imperial = normalize_coverage_inputs(32.8084, 3.10686, 3280.84, 2, 8, 5, False)
+        metric = normalize_coverage_inputs(10, 5, 1000, 2, 8, 5, True)
+
+        for imperial_value, metric_value in zip(imperial, metric):
+            self.assertAlmostEqual(imperial_value, metric_value, places=3)
+
+def store_worker(path, seed):
+    # One process of TestPersistentCoverageCache.test_processes_share_the_store
+    rng = np.random.default_rng(seed % 2)
+    store = PersistentCoverageCache(path)
+    results = store.calculate_batch(rng.uniform(3, 40, 300), rng.uniform(2, 20, 300), 1000, 1, 10, 5, True)
+    return results['coverage_per_week'].tolist()
+
+class TestPersistentCoverageCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'results.sqlite')
+
+    def test_imperial_and_metric_share_entries(self):
+        store = PersistentCoverageCache(self.path)
+        metric = store.calculate(10, 5, 1000, 2, 8, 5, True)
+        imperial = store.calculate(10 / 0.3048, 5 / 1.60934, 1000 / 0.3048, 2, 8, 5, False)
+
+        self.assertEqual(metric, calculate_coverage(10, 5, 1000, 2, 8, 5, True))
+        self.assertEqual(imperial['coverage_per_week'], calculate_coverage(10 / 0.3048, 5 / 1.60934, 1000 / 0.3048, 2, 8, 5, False)['coverage_per_week'])
+        stats = PersistentCoverageCache(self.path).stats()
+        self.assertEqual((store.hits, store.misses, stats['entries']), (1, 1, 1))
+        self.assertEqual(store.stats()['hit_rate'], 0.5)
+        with self.assertRaises(ValueError):
+            store.calculate(10, 0, 1000, 2, 8, 5, True)
+
+    def test_batch_matches_engine_and_reuses_rows(self):
+        rng = np.random.default_rng(3)
+        columns = {
+            'machine_width': rng.uniform(-5, 40, 500),
+            'machine_speed': rng.uniform(2, 20, 500),
+            'field_length': rng.uniform(100, 3000, 500),
+            'turn_around_time': 1.5,
+            'operational_hours_per_day': 10,
+            'operational_days_per_week': 6,
+            'is_metric': rng.random(500) < 0.5,
+        }
+        expected = calculate_coverage_batch(**columns)
+        store = PersistentCoverageCache(self.path)
+        for _ in range(2):
+            results = store.calculate_batch(**columns)
+            for key, values in expected.items():
+                if key == 'error':
+                    self.assertEqual(results[key].tolist(), values.tolist())
+                else:
+                    np.testing.assert_array_equal(results[key], values)
+
+        valid = int(expected['valid'].sum())
+        stats = store.stats()
+        # Invalid rows are rejected before lookup, so they count as neither hits nor misses
+        self.assertEqual((stats['entries'], stats['hits'], stats['misses']), (valid, valid, valid))
+        self.assertEqual(stats['get_latency_ms']['calls'], 2)
+
+    def test_invalid_rows_never_match_a_valid_neighbour(self):
+        # Keys round to INPUT_PRECISION, so each invalid row shares a key with a stored valid one
+        store = PersistentCoverageCache(self.path)
+        store.calculate_batch([10, 4e-7], 5, 1000, [0, 2], 8, 5, True)
+        results = store.calculate_batch([10, 0], 5, 1000, [-1e-7, 2], 8, 5, True)
+        expected = calculate_coverage_batch([10, 0], 5, 1000, [-1e-7, 2], 8, 5, True)
+
+        self.assertEqual(results['valid'].tolist(), [False, False])
+        self.assertEqual(results['error'].tolist(), expected['error'].tolist())
+        self.assertEqual(results['error'][0], "Turn around time cannot be negative")
+        self.assertTrue(np.isnan(results['coverage_per_week']).all())
+        # Invalid rows are neither looked up nor written
+        self.assertEqual((store.hits, store.misses, store.stats()['entries']), (0, 2, 2))
+
+    def test_version_change_and_eviction(self):
+        store = PersistentCoverageCache(self.path, max_entries=100, version='a')
+        store.calculate_batch(np.arange(1, 61), 5, 1000, 2, 8, 5, True)
+        store.calculate_batch(np.arange(61, 161), 5, 1000, 2, 8, 5, True)
+        oldest, newest = (store_key(normalize_coverage_inputs(width, 5, 1000, 2, 8, 5, True)) for width in (1, 160))
+
+        self.assertEqual((store.stats()['entries'], store.evicted), (90, 70))
+        self.assertEqual(store.get_many([oldest])[0], None)
+        self.assertIsNotNone(store.get_many([newest])[0])
+        store.close()
+        self.assertEqual(PersistentCoverageCache(self.path, version='b').get_many([newest]), [None])
+        self.assertEqual(PersistentCoverageCache(self.path, version='a').stats()['entries'], 0)
+
+    def test_changed_formula_source_purges_stale_rows(self):
+        PersistentCoverageCache(self.path).calculate(10, 5, 1000, 2, 8, 5, True)
+        getsource = store_module.inspect.getsource
+
+        def edited(module):
+            return getsource(module) + '# edited' if module is model_module else getsource(module)
+
+        with mock.patch.object(store_module.inspect, 'getsource', edited):
+            version = formula_version()
+        self.assertNotEqual(version, formula_version())
+
+        stale = PersistentCoverageCache(self.path)
+        self.assertEqual(stale.stats()['entries'], 1)
+        PersistentCoverageCache(self.path, version=version).get_many([])
+        with sqlite3.connect(self.path) as connection:
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM results').fetchone()[0], 0)
+
+    def test_stats_is_read_only(self):
+        self.assertEqual(PersistentCoverageCache(self.path).stats()['entries'], 0)
+        self.assertFalse(os.path.exists(self.path))
+
+        PersistentCoverageCache(self.path, version='a').calculate(10, 5, 1000, 2, 8, 5, True)
+        # Neither purges the other version's row nor evicts it
+        self.assertEqual(PersistentCoverageCache(self.path, version='b', max_entries=1).stats()['entries'], 0)
+        self.assertEqual(PersistentCoverageCache(self.path, version='a').stats()['entries'], 1)
+
+    def test_model_results_only_evaluate_misses(self):
+        store = PersistentCoverageCache(self.path)
+        model = CoverageModel(10, 5, 1000, 2, 8, 5, False)
+        self.assertEqual(store.model_results(model), calculate_coverage(10, 5, 1000, 2, 8, 5, False))
+        evaluations = model.evaluations
+        other = CoverageModel(10, 5, 1000, 2, 8, 5, False)
+        self.assertEqual(store.model_results(other), calculate_coverage(10, 5, 1000, 2, 8, 5, False))
+        self.assertEqual((other.evaluations, store.hits), (0, 1))
+        model.update(turn_around_time=3)
+        store.model_results(model)
+        self.assertLess(model.evaluations - evaluations, evaluations)
+
+    def test_processes_share_the_store(self):
+        with multiprocessing.get_context('spawn').Pool(2) as pool:
+            outputs = pool.starmap(store_worker, [(self.path, seed) for seed in range(4)])
+
+        self.assertEqual(outputs[0], outputs[2])
+        store = PersistentCoverageCache(self.path)
+        self.assertEqual(store.stats()['entries'], 600)
+        with StringIO() as output:
+            run_bulk(StringIO(TestBulk.scenarios), output, mapping={'machine_width': 'width'}, store=store)
+            run_bulk(StringIO(TestBulk.scenarios), output, mapping={'machine_width': 'width'}, store=store)
+        # The second run finds every valid row of the first; invalid rows are never looked up
+        self.assertEqual((store.hits, store.misses), (4, 4))
+
+class TestBulk(unittest.TestCase):
+    scenarios = (
+        'width,machine_speed,field_length,turn_around_time,operational_hours_per_day,operational_days_per_week,is_metric\n'
+        '10,5,1000,2,8,5,metric\n'
+        '32.8084,3.10686,3280.84,2,8,5,imperial\n'
+        '0,5,1000,2,8,5,metric\n'
+        ',5,1000,2,8,5,metric\n'
+        '10,5,1000,2,8,5,metric\n'
+    )
+
+    def test_bulk_streams_chunks_with_error_column(self):
+        output = StringIO()
+        summary = run_bulk(StringIO(self.scenarios), output, mapping={'machine_width': 'width'}, chunk_size=2)
+        frame = pd.read_csv(StringIO(output.getvalue()))
+
+        self.assertEqual(summary, {'rows': 5, 'invalid': 2})
+        self.assertEqual(frame['coverage_per_week'].tolist()[:2], [171.43, 423.61])
+        self.assertEqual(frame['error'][2], "Machine width must be greater than 0")
+        self.assertEqual(frame['error'][3], "Missing or non-numeric value for machine_width")
+        self.assertEqual(frame['coverage_per_week'][4], 171.43)
+
+    def test_bulk_skips_invalid_rows(self):
+        output = StringIO()
+        errors = StringIO()
+        run_bulk(StringIO(self.scenarios), output, output_format='jsonl', mapping={'machine_width': 'width'}, units='metric', skip_invalid=True, error_handle=errors, chunk_size=2)
+        rows = pd.read_json(StringIO(output.getvalue()), lines=True)
+
+        self.assertEqual(len(rows), 3)
+        self.assertNotIn('error', rows.columns)
+        self.assertEqual(rows['coverage_per_week'][1], calculate_coverage(32.8084, 3.10686, 3280.84, 2, 8, 5, True)['coverage_per_week'])
+        self.assertEqual(errors.getvalue().splitlines(), [
+            'row 3: Machine width must be greater than 0',
+            'row 4: Missing or non-numeric value for machine_width',
+        ])
+
+class TestFieldGeometry(unittest.TestCase):
+    rectangle = [(0, 0), (100, 0), (100, 50), (0, 50)]
+    l_shape = [(0, 0), (200, 0), (200, 100), (100, 100), (100, 300), (0, 300)]
+
+    def test_rectangle_passes(self):
+        plan = plan_passes(self.rectangle, 10, heading=0)
+
+        self.assertEqual(plan['pass_lengths'].tolist(), [100.0] * 5)
+        self.assertEqual(plan['turn_count'], 4)
+        self.assertEqual(plan['swath_lines'][1].tolist(), [[100.0, 15.0], [0.0, 15.0]])
+        self.assertAlmostEqual(plan['field_area'], 5000.0)
+
+    def test_heading_search_minimizes_turns(self):
+        self.assertEqual(plan_passes(self.rectangle, 10)['heading'], 0.0)
+        plan = plan_passes(self.l_shape, 12)
+
+        self.assertEqual(plan['heading'], 90.0)
+        self.assertEqual(plan['pass_count'], 17)
+        self.assertLess(plan['turn_count'], plan_passes(self.l_shape, 12, heading=0)['turn_count'])
+
+    def test_headland_shortens_passes(self):
+        plan = plan_passes(self.rectangle, 10, heading=0, headland_passes=1)
+
+        # Swaths fill the 80 x 30 m inside of the lap, none run through the headland
+        self.assertEqual(plan['pass_lengths'].tolist(), [80.0] * 3)
+        self.assertEqual(plan['headland_lengths'].tolist(), [260.0])
+        self.assertEqual(plan['pass_count'], 4)
+        self.assertAlmostEqual(plan['worked_area'], 5000.0)
+        self.assertEqual(plan_passes(self.rectangle, 10, heading=0, headland_passes=2)['pass_lengths'].tolist(), [60.0])
+
+        triangle = [(0, 0), (120, 0), (0, 90)]
+        for boundary, width in ((self.rectangle, 10), (self.rectangle, 7), (self.l_shape, 12), (triangle, 9)):
+            for headland_passes in (0, 1, 2):
+                plan = plan_passes(boundary, width, headland_passes=headland_passes)
+                longest = max(plan['pass_lengths'].max(initial=0), plan['headland_lengths'].max(initial=0))
+                self.assertLessEqual(plan['worked_area'], plan['field_area'] + width * longest)
+
+    def test_field_coverage_uses_existing_model(self):
+        results, _ = calculate_field_coverage(self.rectangle, 10, 5, 2, 8, 5, True, heading=0)
+        # Five 100 m passes with four turns between them
+        expected = calculate_coverage(10, 5, 100, 2 * 4 / 5, 8, 5, True)
+
+        self.assertEqual(results['coverage_per_hour'], expected['coverage_per_hour'])
+        self.assertEqual(results['field_area'], 0.5)
+        self.assertAlmostEqual(results['field_hours'], (500 / (5000 / 60) + 4 * 2) / 60, places=2)
+
+    def test_invalid_boundary(self):
+        with self.assertRaises(ValueError):
+            plan_passes([(0, 0), (1, 1)], 10)
+
+class TestFleetSimulation(unittest.TestCase):
+    def test_single_machine_matches_pass_schedule(self):
+        # 12 minute passes with 2 minute turns fit 34 passes into an 8 hour shift
+        machine = Machine(10, 5, 2, 8, 5, True)
+        report = simulate_fleet([machine], [Field(1000, 680, True)])
+
+        self.assertEqual(report['machines'][0]['passes'], 68)
+        self.assertEqual(report['fields'][0]['coverage'], 68.0)
+        self.assertEqual(report['fields'][0]['completed_on_day'], 1)
+        self.assertAlmostEqual(report['completed_at_hours'], (24 * 60 + 6 * 60 + 12 + 33 * 14) / 60, places=2)
+
+    def test_machines_move_between_fields(self):
+        machines = [Machine(32.8084, 3.10686, 2, 8, 5, False, 1, 30) for _ in range(3)]
+        fields = [Field(3280.84, 328.084, False, name=name) for name in 'abcd']
+        report = simulate_fleet(machines, fields, is_metric=False)
+
+        self.assertTrue(all(field['completed_at_hours'] is not None for field in report['fields']))
+        self.assertEqual(sum(machine['passes'] for machine in report['machines']), 40)
+        self.assertAlmostEqual(sum(machine['coverage'] for machine in report['machines']), 4 * 24.71, places=1)
+        self.assertGreater(sum(machine['transport_hours'] for machine in report['machines']), 0)
+
+    def test_replications_are_reproducible(self):
+        machines = [Machine(10, 5, 2, 8, 5, True)]
+        fields = [Field(1000, 500, True)]
+        first = run_replications(machines, fields, 3, seed=5, workers=1, speed_cv=0.2)
+        second = run_replications(machines, fields, 3, seed=5, workers=1, speed_cv=0.2)
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first[0]['completed_at_hours'], first[1]['completed_at_hours'])
+
+    def test_pass_longer_than_shift(self):
+        with self.assertRaises(ValueError):
+            simulate_fleet([Machine(10, 1, 2, 1, 5, True)], [Field(5000, 100, True)])
+
+    def test_inputs_fail_like_calculate_coverage(self):
+        for machine_arguments, calculator_arguments in [
+            ((0, 5, 2, 8, 5, True), (0, 5, 1000, 2, 8, 5, True)),
+            ((10, 5, -1, 8, 5, True), (10, 5, 1000, -1, 8, 5, True)),
+            ((10, 5, 2, 8, 0, True, -1), (10, 5, 1000, 2, 8, 0, True, -1)),
+        ]:
+            with self.assertRaises(ValueError) as expected:
+                calculate_coverage(*calculator_arguments)
+            with self.assertRaisesRegex(ValueError, f"^{expected.exception}$"):
+                Machine(*machine_arguments)
+        with self.assertRaisesRegex(ValueError, "Field length must be greater than 0"):
+            Field(0, 100, True)
+        with self.assertRaisesRegex(ValueError, "cannot exceed 24"):
+            Machine(10, 5, 2, 25, 5, True)
+
+class TestMonteCarlo(unittest.TestCase):
+    inputs = {
+        'machine_width': 10,
+        'machine_speed': Normal(5, 0.5, minimum=0.5),
+        'field_length': 1000,
+        'turn_around_time': Triangular(1, 2, 4),
+        'operational_hours_per_day': 8,
+        'operational_days_per_week': 5,
+        'is_metric': True,
+        'transportation_trips_per_day': 1,
+        'transportation_time_per_trip': Empirical([30, 45, 60]),
+    }
+
+    def test_sketch_quantiles_within_relative_accuracy(self):
+        values = np.random.default_rng(3).lognormal(3, 1, 200000)
+        first, second = QuantileSketch(0.01), QuantileSketch(0.01)
+        first.add(values[:50000])
+        second.add(values[50000:])
+        first.merge(second)
+
+        self.assertEqual(first.count, values.size)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            self.assertLess(abs(first.quantile(q) / np.quantile(values, q) - 1), 0.011)
+
+    def test_sketch_reports_constant_exactly(self):
+        sketch = QuantileSketch()
+        sketch.add(np.full(100, 40.0))
+        self.assertEqual(sketch.quantile(0.5), 40.0)
+
+    def test_monte_carlo_quantiles(self):
+        summary = run_monte_carlo(self.inputs, 200000, chunk_size=50000, seed=1)
+        coverage = summary['coverage_per_week']
+        point = calculate_coverage(10, 5, 1000, 2, 8, 5, True, 1, 45)['coverage_per_week']
+
+        self.assertEqual(summary['samples'], 200000)
+        self.assertLess(coverage['p10'], coverage['p50'])
+        self.assertLess(coverage['p50'], coverage['p90'])
+        self.assertLess(abs(coverage['p50'] / point - 1), 0.05)
+
+    def test_monte_carlo_is_reproducible_across_workers(self):
+        serial = run_monte_carlo(self.inputs, 40000, chunk_size=10000, seed=7)
+        parallel = run_monte_carlo(self.inputs, 40000, chunk_size=10000, seed=7, workers=2)
+
+        self.assertEqual(serial['coverage_per_week'], parallel['coverage_per_week'])
+        self.assertEqual(serial['effective_hours_per_week'], parallel['effective_hours_per_week'])
+
+class TestSolver(unittest.TestCase):
+    inputs = {
+        'machine_width': 10,
+        'machine_speed': 5,
+        'field_length': 1000,
+        'turn_around_time': 2,
+        'operational_hours_per_day': 8,
+        'operational_days_per_week': 5,
+        'is_metric': True,
+        'transportation_trips_per_day': 2,
+        'transportation_time_per_trip': 30,
+    }
+
+    def test_each_input_reproduces_target(self):
+        for unknown in ['machine_width', 'machine_speed', 'field_length', 'turn_around_time', 'operational_hours_per_day',
+                        'operational_days_per_week', 'transportation_trips_per_day', 'transportation_time_per_trip']:
+            fixed = {name: value for name, value in self.inputs.items() if name != unknown}
+            solution = solve_inputs({'coverage_per_week': 140}, unknown, fixed)
+
+            self.assertTrue(solution['feasible'], unknown)
+            result = calculate_coverage(**fixed, **{unknown: float(solution[unknown])})
+            if unknown in ('operational_days_per_week', 'transportation_trips_per_day'):
+                # Whole days and trips: the count that reaches the target
+                self.assertEqual(float(solution[unknown]), round(float(solution[unknown])), unknown)
+                self.assertGreaterEqual(result['coverage_per_week'], 140.0, unknown)
+            else:
+                self.assertEqual(result['coverage_per_week'], 140.0, unknown)
+
+    def test_unreachable_target_reports_range(self):
+        fixed = {name: value for name, value in self.inputs.items() if name != 'machine_speed'}
+        solution = solve_inputs({'coverage_per_week': [100, 1000]}, 'machine_speed', fixed)
+        low, high = solution['feasible_range']['coverage_per_week']
+
+        self.assertEqual(solution['feasible'].tolist(), [True, False])
+        self.assertTrue(np.isnan(solution['machine_speed'][1]))
+        # The fastest the solver considers is 200 km/h
+        self.assertAlmostEqual(high[1], calculate_coverage(**fixed, machine_speed=200)['coverage_per_week'], places=2)
+
+    def test_bisection_and_imperial(self):
+        fixed = {name: value for name, value in self.inputs.items() if name != 'operational_hours_per_day'}
+        solution = solve_inputs({'effective_hours_per_week': np.array([20.0, 35.0])}, 'operational_hours_per_day', fixed)
+        np.testing.assert_allclose(solution['operational_hours_per_day'], [5.0, 8.0])
+
+        imperial = {'machine_speed': 3.10686, 'field_length': 3280.84, 'turn_around_time': 2, 'operational_hours_per_day': 8, 'operational_days_per_week': 5, 'is_metric': False}
+        solution = solve_inputs({'coverage_per_week': 423.61}, 'machine_width', imperial)
+        self.assertAlmostEqual(float(solution['machine_width']), 32.8084, places=2)
+
+    def test_two_unknowns(self):
+        fixed = {name: value for name, value in self.inputs.items() if name not in ('machine_width', 'operational_hours_per_day')}
+        solution = solve_inputs({'coverage_per_week': 200, 'effective_hours_per_week': 35}, ['machine_width', 'operational_hours_per_day'], fixed)
+
+        self.assertAlmostEqual(float(solution['operational_hours_per_day']), 8.0)
+        result = calculate_coverage(**fixed, machine_width=float(solution['machine_width']), operational_hours_per_day=8.0)
+        self.assertEqual(result['coverage_per_week'], 200.0)
+
+        with self.assertRaises(ValueError):
+            solve_inputs({'coverage_per_week': 200, 'coverage_per_hour': 5}, ['machine_width', 'machine_speed'], fixed)
+
+    def test_counts_are_whole_numbers(self):
+        fixed = {name: value for name, value in self.inputs.items() if name != 'operational_days_per_week'}
+        # 4.6 days would hit 138 ha exactly; 5 is the fewest whole days that reach it
+        solution = solve_inputs({'coverage_per_week': [138, 150, 1000]}, 'operational_days_per_week', fixed)
+        np.testing.assert_array_equal(solution['operational_days_per_week'], [5.0, 5.0, np.nan])
+        self.assertEqual(solution['feasible'].tolist(), [True, True, False])
+
+        fixed = {name: value for name, value in self.inputs.items() if name != 'transportation_trips_per_day'}
+        solution = solve_inputs({'coverage_per_week': 140}, 'transportation_trips_per_day', fixed)
+        trips = float(solution['transportation_trips_per_day'])
+        self.assertEqual(trips, round(trips))
+        self.assertGreaterEqual(calculate_coverage(**fixed, transportation_trips_per_day=trips)['coverage_per_week'], 140)
+        self.assertLess(calculate_coverage(**fixed, transportation_trips_per_day=trips + 1)['coverage_per_week'], 140)
+
+def synthetic_track(passes=12, pass_length=400.0, spacing=9.5, speed=2.0, turn_seconds=30, lat0=40.0, lon0=-95.0):
+    # 1 Hz boustrophedon log: straight passes joined by semicircular headland turns
+    rng = np.random.default_rng(0)
+    xs, ys = [], []
+    for index in range(passes):
+        along = np.arange(int(pass_length / speed) + 1) * speed
+        xs.append(pass_length - along if index % 2 else along)
+        ys.append(np.full(len(along), index * spacing))
+        if index < passes - 1:
+            angle = np.linspace(0, np.pi, turn_seconds + 1)[1:-1]
+            end, side = (pass_length, 1) if index % 2 == 0 else (0.0, -1)
+            xs.append(end + side * (2.0 + spacing / 2 * np.sin(angle)))
+            ys.append(index * spacing + spacing / 2 * (1 - np.cos(angle)))
+    x = np.concatenate(xs) + rng.normal(0, 0.02, sum(map(len, xs)))
+    y = np.concatenate(ys) + rng.normal(0, 0.02, sum(map(len, ys)))
+    track = np.zeros(len(x), dtype=[(name, 'f8') for name in TELEMETRY_COLUMNS])
+    track['time'] = 1.7e9 + np.arange(len(x))
+    track['lat'] = lat0 + np.degrees(y / EARTH_RADIUS)
+    track['lon'] = lon0 + np.degrees(x / (EARTH_RADIUS * np.cos(np.radians(lat0))))
+    track['speed'] = speed
+    return track
+
+class TestTelemetry(unittest.TestCase):
+    def test_segments_passes_turns_and_spacing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'machine.npy')
+            np.save(path, synthetic_track())
+            whole = analyze_log(path)[None]
+            chunked = analyze_log(path, chunk_points=97)[None]
+
+        self.assertEqual(len(whole['pass_speed']), 12)
+        self.assertEqual(len(whole['turn_time']), 11)
+        self.assertEqual(len(chunked['pass_speed']), 12)
+        np.testing.assert_allclose(chunked['swath_spacing'], whole['swath_spacing'])
+        inputs = calibrated_inputs(whole)
+        self.assertAlmostEqual(inputs['machine_speed'], 7.2, places=1)
+        self.assertAlmostEqual(inputs['machine_width'], 9.5, places=1)
+        self.assertLess(abs(inputs['turn_around_time'] - 0.5), 0.1)
+
+    def test_ingest_pools_fields_across_logs(self):
+        field = [(39.9, -95.1), (39.9, -94.9), (40.1, -94.9), (40.1, -95.1)]
+        elsewhere = [(41.0, -95.1), (41.0, -94.9), (41.1, -94.9)]
+        with tempfile.TemporaryDirectory() as directory:
+            npy_path = os.path.join(directory, 'a.npy')
+            csv_path = os.path.join(directory, 'b.csv')
+            np.save(npy_path, synthetic_track())
+            pd.DataFrame(synthetic_track()).to_csv(csv_path, index=False)
+            samples = ingest_logs([npy_path, csv_path], boundaries={'north 40': field, 'other': elsewhere}, workers=1)
+
+        self.assertEqual(list(samples), ['north 40'])
+        self.assertEqual(len(samples['north 40']['pass_speed']), 24)
+        self.assertEqual(len(samples['north 40']['turn_time']), 22)
+
+    def test_csv_with_iso_timestamps(self):
+        track = synthetic_track()
+        frame = pd.DataFrame(track)
+        frame['time'] = pd.to_datetime(frame['time'], unit='s', utc=True).dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        with tempfile.TemporaryDirectory() as directory:
+            npy_path = os.path.join(directory, 'a.npy')
+            csv_path = os.path.join(directory, 'a.csv')
+            np.save(npy_path, track)
+            frame.to_csv(csv_path, index=False)
+            epochs = analyze_log(npy_path)[None]
+            iso = analyze_log(csv_path, chunk_points=500)[None]
+
+        self.assertEqual(len(iso['turn_time']), 11)
+        for name in ('pass_speed', 'turn_time', 'swath_spacing'):
+            np.testing.assert_allclose(iso[name], epochs[name], err_msg=name)
+        # Passes at 2 m/s (7.2 km/h) with turns of about half a minute; times read 1000x
+        # too small would show up as speeds and turn times off by that factor
+        np.testing.assert_allclose(iso['pass_speed'], 7.2, rtol=0.01)
+        self.assertTrue(np.all((iso['turn_time'] > 0.3) & (iso['turn_time'] < 0.75)))
+
+async def http_json(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+class TestService(unittest.TestCase):
+    INPUTS = {
+        'machine_width': 30,
+        'machine_speed': 5.5,
+        'field_length': 1800,
+        'turn_around_time': 1.5,
+        'operational_hours_per_day': 10,
+        'operational_days_per_week': 6,
+        'is_metric': False,
+        'transportation_trips_per_day': 2,
+        'transportation_time_per_trip': 20,
+    }
+
+    def run_service(self, scenario, **options):
+        async def main():
+            service = await CoverageService(port=0, **options).start()
+            try:
+                return await scenario(service)
+            finally:
+                await service.close()
+        return asyncio.run(main())
+
+    def test_concurrent_requests_share_batches(self):
+        scenarios = [{**self.INPUTS, 'machine_width': 10 + index / 4} for index in range(50)]
+
+        async def scenario(service):
+            responses = await asyncio.gather(*[http_json(service.port, 'POST', '/coverage', inputs) for inputs in scenarios])
+            return responses, await service.metrics()
+
+        responses, metrics = self.run_service(scenario, max_delay=0.02)
+        for inputs, (status, result) in zip(scenarios, responses):
+            self.assertEqual(status, 200)
+            self.assertEqual(result, calculate_coverage(**inputs))
+        self.assertLess(metrics['batches'], len(scenarios))
+        self.assertEqual(metrics['rows'], len(scenarios))
+
+    def test_errors_health_and_backpressure(self):
+        inputs = self.INPUTS
+
+        async def scenario(service):
+            invalid = await http_json(service.port, 'POST', '/coverage', {**inputs, 'machine_speed': 0})
+            missing = await http_json(service.port, 'POST', '/coverage', {'machine_width': 1})
+            health = await http_json(service.port, 'GET', '/health')
+            burst = await asyncio.gather(*[http_json(service.port, 'POST', '/coverage', inputs) for _ in range(10)])
+            metrics = await http_json(service.port, 'GET', '/metrics')
+            return invalid, missing, health, burst, metrics
+
+        invalid, missing, health, burst, metrics = self.run_service(scenario, max_delay=0.05, max_queue=2)
+        self.assertEqual(invalid, (400, {'error': "Machine speed must be greater than 0"}))
+        self.assertEqual(missing[0], 400)
+        self.assertEqual(health, (200, {'status': 'ok', 'queue_depth': 0, 'max_queue': 2}))
+        statuses = sorted(status for status, _ in burst)
+        self.assertIn(200, statuses)
+        self.assertIn(503, statuses)
+        self.assertEqual(metrics[1]['rejected'], statuses.count(503))
+
+    def test_evaluation_failure_answers_500(self):
+        class FailingStore:
+            def calculate_batch(self, **columns):
+                raise sqlite3.OperationalError("database is locked")
+
+            def stats(self):
+                return {}
+
+        async def scenario(service):
+            failed = await http_json(service.port, 'POST', '/coverage', self.INPUTS)
+            health = await http_json(service.port, 'GET', '/health')
+            return failed, health, await service.metrics()
+
+        failed, health, metrics = self.run_service(scenario, store=FailingStore())
+        self.assertEqual(failed, (500, {'error': "Evaluation failed: OperationalError: database is locked"}))
+        self.assertEqual(health[0], 200)
+        self.assertEqual(metrics['errors'], 1)
+
+    def test_health_answers_while_store_is_blocked(self):
+        class BlockedStore:
+            # Holds its lock through a write, like a store waiting on SQLite's busy timeout
+            def __init__(self):
+                self.lock = threading.Lock()
+                self.writing = threading.Event()
+                self.release = threading.Event()
+
+            def calculate_batch(self, **columns):
+                with self.lock:
+                    self.writing.set()
+                    self.release.wait(10)
+                    return calculate_coverage_batch(**columns)
+
+            def stats(self):
+                with self.lock:
+                    return {'entries': 0}
+
+        store = BlockedStore()
+
+        async def scenario(service):
+            loop = asyncio.get_running_loop()
+            coverage = asyncio.create_task(http_json(service.port, 'POST', '/coverage', self.INPUTS))
+            await loop.run_in_executor(None, store.writing.wait, 10)
+            metrics = asyncio.create_task(http_json(service.port, 'GET', '/metrics'))
+            await asyncio.sleep(0.05)
+            health = await asyncio.wait_for(http_json(service.port, 'GET', '/health'), 2)
+            self.assertFalse(metrics.done())
+            store.release.set()
+            return health, await coverage, await metrics
+
+        health, coverage, metrics = self.run_service(scenario, store=store)
+        self.assertEqual(health[0], 200)
+        self.assertEqual(coverage[0], 200)
+        self.assertEqual(metrics[0], 200)
+        self.assertEqual(metrics[1]['store'], {'entries': 0})
+
+class TestCoverageModel(unittest.TestCase):
+    INPUTS = {
+        'machine_width': 20.0,
+        'machine_speed': 0.75,
+        'field_length': 2000.0,
+        'turn_around_time': 2.0,
+        'operational_hours_per_day': 8.0,
+        'operational_days_per_week': 5,
+        'is_metric': False,
+        'transportation_trips_per_day': 2,
+        'transportation_time_per_trip': 30.0,
+    }
+
+    def test_matches_calculate_coverage_after_edits(self):
+        inputs = dict(self.INPUTS)
+        model = CoverageModel(**inputs)
+        self.assertEqual(model.results(), calculate_coverage(**inputs))
+        for name, value in [('machine_width', 35.5), ('is_metric', True), ('transportation_trips_per_day', 0), ('field_length', 640.0), ('is_metric', False)]:
+            inputs[name] = value
+            model.update(**{name: value})
+            self.assertEqual(model.results(), calculate_coverage(**inputs))
+
+    def test_recomputes_only_downstream_nodes(self):
+        model = CoverageModel(**self.INPUTS)
+        model.results()
+        model.update(operational_days_per_week=6)
+        model.results()
+        self.assertEqual(set(model.recomputed), {name for name in calculate_coverage(**self.INPUTS) if name.endswith('_per_week')})
+
+        model.update(operational_days_per_week=6)
+        model.results()
+        self.assertEqual(model.recomputed, [])
+
+        model.update(turn_around_time=1.0)
+        model.results()
+        self.assertNotIn('coverage_per_pass', model.recomputed)
+        self.assertNotIn('effective_hours_per_day', model.recomputed)
+        self.assertIn('coverage_per_week', model.recomputed)
+
+    def test_results_round_nodes_evaluated_through_get(self):
+        inputs = dict(self.INPUTS)
+        model = CoverageModel(**inputs)
+        model.results()
+        for name, value in [('machine_width', 30.0), ('operational_hours_per_day', 8), ('is_metric', True)]:
+            inputs[name] = value
+            model.update(**{name: value})
+            model.get('coverage_per_week')
+            model.get('total_hours_per_day')
+            self.assertEqual(model.results(), calculate_coverage(**inputs), name)
+
+    def test_invalid_update_leaves_model_unchanged(self):
+        model = CoverageModel(**self.INPUTS)
+        before = model.results()
+        with self.assertRaisesRegex(ValueError, "Machine speed must be greater than 0"):
+            model.update(machine_width=30.0, machine_speed=0)
+        self.assertEqual(model.inputs(), self.INPUTS)
+        self.assertEqual(model.results(), before)
+
+class TestSurface(unittest.TestCase):
+    FIXED = {
+        'machine_width': 20.0,
+        'machine_speed': 5.0,
+        'field_length': 2000.0,
+        'turn_around_time': 2.0,
+        'operational_hours_per_day': 8.0,
+        'operational_days_per_week': 5,
+        'is_metric': False,
+        'transportation_trips_per_day': 1,
+        'transportation_time_per_trip': 30.0,
+    }
+
+    def test_grid_matches_scalar(self):
+        surface = evaluate_surface('machine_width', (10, 30), 'field_length', (500, 2500), self.FIXED, 5, output='coverage_per_day')
+        self.assertEqual(surface.values.shape, (5, 5))
+        for row, length in enumerate(surface.y):
+            for column, width in enumerate(surface.x):
+                expected = calculate_coverage(**{**self.FIXED, 'machine_width': width, 'field_length': length})['coverage_per_day']
+                self.assertAlmostEqual(surface.values[row, column], expected, places=2)
+        with self.assertRaises(ValueError):
+            evaluate_surface('is_metric', (0, 1), 'field_length', (500, 2500), self.FIXED, 5)
+
+    def test_refines_and_reuses_cached_surfaces(self):
+        cache = SurfaceCache(levels=(4, 8, 16))
+        arguments = ('turn_around_time', (0.5, 4.0), 'machine_speed', (2.0, 8.0), self.FIXED)
+        sizes = [surface.points for surface in cache.surfaces(*arguments)]
+        self.assertEqual(sizes[0], 4)
+        self.assertEqual(sizes[-1], 16)
+        self.assertEqual(sizes, sorted(sizes))
+        self.assertEqual([surface.points for surface in cache.surfaces(*arguments)], [16])
+
+        # A different non-axis input is a different surface
+        changed = ('turn_around_time', (0.5, 4.0), 'machine_speed', (2.0, 8.0), {**self.FIXED, 'operational_days_per_week': 6})
+        self.assertEqual(next(cache.surfaces(*changed)).points, 4)
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_latest_does_not_wait_and_clear_drops_pending(self):
+        cache = SurfaceCache(levels=(4, 8, 16))
+        # Hold the background thread so the denser levels cannot finish
+        gate = threading.Event()
+        cache._executor = ThreadPoolExecutor(max_workers=1)
+        cache._executor.submit(gate.wait)
+        surface, futures = cache.latest('turn_around_time', (0.5, 4.0), 'machine_speed', (2.0, 8.0), self.FIXED)
+        self.assertEqual(surface.points, 4)
+        self.assertEqual(len(futures), 2)
+        self.assertFalse(any(future.done() for future in futures))
+        self.assertEqual(cache.stats()['pending'], 2)
+
+        cache.clear()
+        self.assertEqual(cache.stats()['pending'], 0)
+        gate.set()
+        wait(futures)
+        # Grids that finish after clear() do not repopulate the cache
+        self.assertEqual(cache.stats()['size'], 0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file